@@ -1,8 +1,8 @@
-from mplsoccer import Sbopen
+from sbcache import CachedSbopen
 import pandas as pd
 
 # Initialize parser
-parser = Sbopen(dataframe=True)
+parser = CachedSbopen()
 
 # Competition and season IDs
 competition_id = 55   # Euro 2024
@@ -1,9 +1,12 @@
-from mplsoccer import Sbopen, Pitch
+from mplsoccer import Pitch
+from sbcache import CachedSbopen
+from event_index import EventIndex
+from zones import zone_aggregate, zone_counts
+from pitch_render import PitchCanvas
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
 
-parser = Sbopen(dataframe=True)
+parser = CachedSbopen()
 
 player_id = 5204
 player_name = "Bruno's"
@@ -39,70 +42,43 @@ pitch_width = pitch.dim.width
 x_bins = [0, pitch_length/3, 2*pitch_length/3, pitch_length]
 y_bins = [0, pitch_width/2, pitch_width]
 
-# Prepare a figure
-fig, ax = pitch.draw(figsize=(14, 10))
+# Prepare a figure: pitch and zone lines are drawn once as the background
+canvas = PitchCanvas(pitch, figsize=(14, 10), x_edges=x_bins, y_edges=y_bins)
 
-# Draw zone lines
-for xb in x_bins[1:-1]:
-    ax.plot([xb, xb], [0, pitch_width], linestyle='--', color='gray')
-for yb in y_bins[1:-1]:
-    ax.plot([0, pitch_length], [yb, yb], linestyle='--', color='gray')
+# Index the events of every match once by (player, event type, match); the
+# player's passes are then a slice of the index instead of a scan per match
+index = EventIndex.from_matches(match_ids, parser=parser,
+                                columns=['player_id', 'type_name', 'x', 'y', 'end_x', 'end_y'])
+passes = index.events(player_id, 'Pass')
 
-# Dictionary to hold counts and arrow info for all matches per zone
-zone_data = {(xz, yz): {} for xz in range(3) for yz in range(2)}
-
-# Dictionary to store summary table
-summary_table = {m_id: [0]*6 for m_id in match_ids}  # 6 zones
+# Counts, average start points and average directions for every match and
+# zone in one vectorized pass
+grid, zone_table = zone_aggregate(passes, nx=3, ny=2, by=['match_id'])
 
-# Process each match
+# Dictionary to hold counts and arrow info for all matches per zone, in the
+# order of match_ids (the index returns the passes sorted by match id)
+zone_data = {(xz, yz): {} for xz in range(3) for yz in range(2)}
+match_zones = dict(tuple(zone_table.groupby('match_id', sort=False)))
 for m_id in match_ids:
-    df, _, _, _ = parser.event(m_id)
-
-    # Match info
-    home = match_info[match_info['match_id'] == m_id]['home_team_name'].values[0]
-    away = match_info[match_info['match_id'] == m_id]['away_team_name'].values[0]
-
-    # Player passes
-    passes = df[(df['player_id'] == player_id) & (df['type_name'] == 'Pass')].copy()
-    if passes.empty:
+    if m_id not in match_zones:
         continue
-
-    # Assign zones
-    passes['x_zone'] = pd.cut(passes['x'], bins=x_bins, labels=False, include_lowest=True)
-    passes['y_zone'] = pd.cut(passes['y'], bins=y_bins, labels=False, include_lowest=True)
-    passes = passes.dropna(subset=['x_zone','y_zone'])
-    passes['x_zone'] = passes['x_zone'].astype(int)
-    passes['y_zone'] = passes['y_zone'].astype(int)
-
-    # Color for this match
-    color = match_colors[m_id]
-
-    # Group by zone
-    grouped = passes.groupby(['x_zone', 'y_zone'])
-    for (xz, yz), group in grouped:
-        if group.empty:
-            continue
-
-        # Save data for this zone and match
-        count = len(group)
-        avg_dx = (group['end_x'] - group['x']).mean()
-        avg_dy = (group['end_y'] - group['y']).mean()
-        avg_start_x = group['x'].mean()
-        avg_start_y = group['y'].mean()
-
-        zone_data[(xz, yz)][m_id] = {
-            'count': count,
-            'start_x': avg_start_x,
-            'start_y': avg_start_y,
-            'dx': avg_dx,
-            'dy': avg_dy
+    for row in match_zones[m_id].itertuples():
+        zone_data[(row.x_zone, row.y_zone)][m_id] = {
+            'count': row.count,
+            'start_x': row.start_x,
+            'start_y': row.start_y,
+            'dx': row.dx,
+            'dy': row.dy
         }
 
-        # Map zone to 1-6 for summary: top-left=1, top-middle=2, ..., bottom-right=6
-        zone_index = yz * 3 + xz  # yz=0(top), 1(bottom); xz=0(left),1,2(right)
-        summary_table[m_id][zone_index] = count
+# Summary table: zones 1-6, top-left=1, top-middle=2, ..., bottom-right=6
+summary_table = {m_id: [0]*6 for m_id in match_ids}
+summary_table.update(zip(grid.groups['match_id'], zone_counts(grid)))
 
-# Plot counts and arrows for each zone and match
+# Collect counts and arrows for each zone and match, then draw them as one
+# arrow layer and one batch of labels
+label_x, label_y, label_text, colors = [], [], [], []
+arrow_start, arrow_end = [], []
 for (xz, yz), matches_info in zone_data.items():
     x0, x1 = x_bins[xz], x_bins[xz+1]
     y0, y1 = y_bins[yz], y_bins[yz+1]
@@ -111,12 +87,17 @@ for (xz, yz), matches_info in zone_data.items():
     # Offset for text to avoid overlap
     offsets = np.linspace(-8, 8, len(matches_info))
     for i, (m_id, data) in enumerate(matches_info.items()):
-        ax.text(xc + offsets[i], yc, str(data['count']),
-                ha='center', va='center', fontsize=12, fontweight='bold',
-                color=match_colors[m_id])
-        pitch.arrows(data['start_x'], data['start_y'],
-                     data['start_x'] + data['dx'], data['start_y'] + data['dy'],
-                     ax=ax, color=match_colors[m_id], width=2, headwidth=5, headlength=5)
+        label_x.append(xc + offsets[i])
+        label_y.append(yc)
+        label_text.append(data['count'])
+        colors.append(match_colors[m_id])
+        arrow_start.append((data['start_x'], data['start_y']))
+        arrow_end.append((data['start_x'] + data['dx'], data['start_y'] + data['dy']))
+
+arrow_start, arrow_end = np.array(arrow_start).reshape(-1, 2), np.array(arrow_end).reshape(-1, 2)
+canvas.labels(label_x, label_y, label_text, colors, fontsize=12, fontweight='bold')
+canvas.arrows('zones', arrow_start[:, 0], arrow_start[:, 1], arrow_end[:, 0], arrow_end[:, 1],
+              color=colors, width=2, headwidth=5, headlength=5)
 
 import matplotlib.lines as mlines
 
@@ -127,13 +108,13 @@ for m_id, color in match_colors.items():
                            markersize=8, label=match_names[m_id])
     legend_handles.append(handle)
 
-ax.legend(handles=legend_handles, loc='upper center', bbox_to_anchor=(0.5, -0.05),
-          ncol=2, fontsize=12)
+canvas.legend(legend_handles, loc='upper center', bbox_to_anchor=(0.5, -0.05),
+              ncol=2, fontsize=12)
 
 # Title
-plt.title(f"{player_name} – Merged pass Pitch Map for EURO 2024\nCounts and Average Pass Directions per Zone",
-          fontsize=16)
-plt.show()
+canvas.title(f"{player_name} – Merged pass Pitch Map for EURO 2024\nCounts and Average Pass Directions per Zone",
+             fontsize=16)
+canvas.show()
 
 # Output summary
 for m_id, counts in summary_table.items():
@@ -1,11 +1,13 @@
-from mplsoccer import Sbopen
+from sbcache import CachedSbopen
+from match_loader import load_matches, print_report
+from assists import resolve_assists
 import pandas as pd
 import matplotlib.pyplot as plt
 
 # -------------------------------------------------------------
 # Setup
 # -------------------------------------------------------------
-parser = Sbopen(dataframe=True)
+parser = CachedSbopen()
 competition_id = 55     # Euro 2024
 season_id = 282
 player_id_focus = 5204
@@ -17,56 +19,45 @@ target_positions = [9, 11, 19]
 matches = parser.match(competition_id=competition_id, season_id=season_id)
 match_ids = matches['match_id'].tolist()
 
-all_assists = []
-
 # -------------------------------------------------------------
 # Helper: compute minutes played from event times
 # -------------------------------------------------------------
-def compute_minutes(df, player_id):
-    pdf = df[df['player_id'] == player_id]
-
-    if pdf.empty:
-        return 0
-
-    return pdf['minute'].max() - pdf['minute'].min()
+def compute_minutes(df):
+    # Last minus first event minute of every player, in one groupby
+    minute = df.groupby('player_id')['minute']
+    return minute.max() - minute.min()
 
 # -------------------------------------------------------------
-# Loop over matches
+# Per-match reduction
 # -------------------------------------------------------------
-for match_id in match_ids:
-
-    df, related, freeze, tactics = parser.event(match_id)
+def match_assists(match_id, df, related, freeze, tactics):
 
     # Compute minutes for each player in the match
-    unique_players = df['player_id'].dropna().unique()
-    minutes = {pid: compute_minutes(df, pid) for pid in unique_players}
+    minutes = compute_minutes(df)
 
-    # Filter passes by target positions
-    position_passes = df[
+    # Passes joined to the shots they assisted (goal = the shot's outcome)
+    resolved = resolve_assists(df)
+    key_passes = df[
         (df['type_name'] == 'Pass') &
-        (df['position_id'].isin(target_positions))
+        (df['position_id'].isin(target_positions)) &
+        resolved['key_pass']
     ]
+    resolved = resolved.loc[key_passes.index]
 
-    # Shot assists
-    shot_assists = position_passes[position_passes['pass_assisted_shot_id'].notna()].copy()
-    shot_assists['outcome'] = 'Shot Assist'
-
-    # Goal assists
-    goal_assists = position_passes[
-        (position_passes['pass_assisted_shot_id'].notna()) &
-        (position_passes['outcome_name'] == 'Goal')
-    ].copy()
-    goal_assists['outcome'] = 'Goal Assist'
-
-    # Combine assists
-    assists = pd.concat([shot_assists, goal_assists], ignore_index=True)
+    # Every key pass counts once, a goal assist once more
+    assists = key_passes[['player_id', 'player_name', 'position_id']].copy()
+    assists['assists'] = resolved['key_pass'].astype(int) + resolved['goal_assist'].astype(int)
     assists['match_id'] = match_id
     assists['minutes_played'] = assists['player_id'].map(minutes)
 
-    all_assists.append(
-        assists[['player_id', 'player_name', 'position_id', 'outcome',
-                 'match_id', 'minutes_played']]
-    )
+    return assists[['player_id', 'player_name', 'position_id', 'assists',
+                    'match_id', 'minutes_played']]
+
+# -------------------------------------------------------------
+# Load and reduce all matches in parallel (results keep match order)
+# -------------------------------------------------------------
+all_assists, report = load_matches(match_ids, match_assists, parser=parser)
+print_report(report)
 
 # -------------------------------------------------------------
 # Combine all matches
@@ -76,7 +67,7 @@ assists_df = pd.concat(all_assists, ignore_index=True)
 # Group by match + minutes
 player_matches = assists_df.groupby(
     ['player_id', 'player_name', 'match_id', 'minutes_played']
-).size().reset_index(name='assists')
+)['assists'].sum().reset_index()
 
 # -------------------------------------------------------------
 # Normalize: assists per 90 minutes
@@ -1,14 +1,20 @@
-from mplsoccer import Sbopen
-import pandas as pd
+from sbcache import CachedSbopen
+from summary_store import POSITION_GROUPS, SummaryStore, write_summaries
 
 # -------------------------------
 # Settings
 # -------------------------------
 COMPETITION_ID = 55   # Euro 2024
 SEASON_ID = 282
-TARGET_POSITIONS = [9, 11, 19]  # Midfield/forward roles
 
-parser = Sbopen(dataframe=True)
+# Minimum total minutes for each table (None keeps every player)
+MINUTES_THRESHOLDS = [360, 367, None]
+
+# Peer groups to summarise: "midfielders" is the original [9, 11, 19] group,
+# see summary_store.POSITION_GROUPS for the others
+GROUPS = POSITION_GROUPS
+
+parser = CachedSbopen()
 
 # -------------------------------
 # Load matches
@@ -17,123 +23,18 @@ matches = parser.match(competition_id=COMPETITION_ID, season_id=SEASON_ID)
 match_ids = matches['match_id'].tolist()
 
 # -------------------------------
-# Helper function
-# -------------------------------
-def timestamp_to_min(ts):
-    if pd.isna(ts):
-        return 0
-    if hasattr(ts, "hour"):
-        return ts.hour*60 + ts.minute + ts.second/60
-    return float(ts)
-
-# -------------------------------
-# Store player stats
-# -------------------------------
-player_stats = {}
-
-# -------------------------------
-# Loop through matches
-# -------------------------------
-for match_id in match_ids:
-    df, related, freeze, tactics = parser.event(match_id)
-
-    # Filter players in target positions
-    players_in_match = df[df['position_id'].isin(TARGET_POSITIONS)]['player_id'].unique()
-
-    for pid in players_in_match:
-        events = df[df['player_id'] == pid].copy()
-        if events.empty:
-            continue
-
-        # Compute match end times
-        p1_end = timestamp_to_min(df[(df.type_name=="Half End") & (df.period==1)].iloc[0].timestamp)
-        p2_end = timestamp_to_min(df[(df.type_name=="Half End") & (df.period==2)].iloc[0].timestamp)
-        total_match_min = p1_end + p2_end
-        half2_offset = p1_end
-
-        # Minute in match
-        events['minute'] = events.apply(
-            lambda row: timestamp_to_min(row.timestamp) + (half2_offset if row.period==2 else 0),
-            axis=1
-        )
-
-        # Starting XI
-        started = False
-        if isinstance(tactics, list):
-            for t in tactics:
-                if "lineup" in t:
-                    for p in t["lineup"]:
-                        if p["player"]["id"] == pid:
-                            started = True
-                            break
-
-        enter_min = 0 if started else None
-        exit_min = total_match_min
-
-        sub_in = events[(events.type_name=="Substitution") & (events.substitution_replacement_id==pid)]
-        sub_out = events[(events.type_name=="Substitution") & (events.player_id==pid)]
-
-        if not sub_in.empty:
-            enter_min = sub_in['minute'].iloc[0]
-        if not sub_out.empty:
-            exit_min = sub_out['minute'].iloc[0]
-
-        # Red card
-        if 'foul_committed_card' in events.columns:
-            red = events[(events.type_name=="Foul Committed") & (events.foul_committed_card=="Red Card")]
-            if not red.empty:
-                exit_min = min(exit_min, red['minute'].iloc[0])
-
-        if enter_min is None:
-            enter_min = 0
-        minutes_played = exit_min - enter_min
-
-        # Passes & assists (using StatsBomb flags)
-        passes = events[events.type_name=="Pass"]
-        shot_assists = passes[passes['pass_shot_assist'] == True] if 'pass_shot_assist' in passes.columns else passes.iloc[0:0]
-        goal_assists = passes[passes['pass_goal_assist'] == True] if 'pass_goal_assist' in passes.columns else passes.iloc[0:0]
-
-        # Aggregate stats
-        if pid not in player_stats:
-            player_stats[pid] = {
-                'player_name': events['player_name'].iloc[0],
-                'matches_played': 0,
-                'total_minutes': 0,
-                'total_passes': 0,
-                'total_shot_assists': 0,
-                'total_goal_assists': 0
-            }
-
-        player_stats[pid]['matches_played'] += 1
-        player_stats[pid]['total_minutes'] += minutes_played
-        player_stats[pid]['total_passes'] += len(passes)
-        player_stats[pid]['total_shot_assists'] += len(shot_assists)
-        player_stats[pid]['total_goal_assists'] += len(goal_assists)
-
-# -------------------------------
-# Build summary dataframe (only players with >360 minutes)
+# Fold new or changed matches into the partial-stats store (single scan)
 # -------------------------------
-summary_df = pd.DataFrame([
-    {
-        'player_id': pid,
-        'player_name': stats['player_name'],
-        'matches_played': stats['matches_played'],
-        'total_minutes_played': round(stats['total_minutes'], 2),
-        'total_passes': stats['total_passes'],
-        'passes_per90': round(stats['total_passes'] / stats['total_minutes'] * 90, 2) 
-            if stats['total_minutes'] > 0 else 0,
-        'total_shot_assists': stats['total_shot_assists'],
-        'total_goal_assists': stats['total_goal_assists'],
-        'shot_assists_per90': round(stats['total_shot_assists'] / stats['total_minutes'] * 90, 2)
-            if stats['total_minutes'] > 0 else 0,
-        'goal_assists_per90': round(stats['total_goal_assists'] / stats['total_minutes'] * 90, 2)
-            if stats['total_minutes'] > 0 else 0
-    }
-    for pid, stats in player_stats.items() if stats['total_minutes'] > 360
-])
+store = SummaryStore()
+pending, updated = store.update(parser, match_ids)
+print(f"Ingested {len(updated)} new or changed matches, "
+      f"{len(match_ids) - len(pending)} already up to date, "
+      f"{len(pending) - len(updated)} failed")
 
 # -------------------------------
-# Save to CSV
+# Build every group x threshold table from the stored partials and save to CSV
+# e.g. euro2024_midfielders_summary_360plus.csv, ..._all_minutes.csv
 # -------------------------------
-summary_df.to_csv("euro2024_midfielders_summary_360plus.csv", index=False)
-print("Data saved to euro2024_midfielders_summary_360plus.csv")
+summaries = store.summaries(thresholds=MINUTES_THRESHOLDS, groups=GROUPS)
+for csv_path in write_summaries(summaries):
+    print(f"Data saved to {csv_path}")
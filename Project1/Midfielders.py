@@ -1,7 +1,8 @@
-from mplsoccer import Sbopen
+from sbcache import CachedSbopen
+from match_loader import load_matches, print_report
 import pandas as pd
 
-parser = Sbopen(dataframe=True)
+parser = CachedSbopen()
 
 competition_id = 55   # Euro 2024
 season_id = 282
@@ -17,11 +18,7 @@ portugal_matches = matches[
 
 match_ids = portugal_matches['match_id'].tolist()
 
-players_list = []
-
-for match_id in match_ids:
-    df, related, freeze, tactics = parser.event(match_id)
-
+def match_players(match_id, df, related, freeze, tactics):
     # Filter only Portugal events
     portugal_events = df[df["team_name"] == "Portugal"]
 
@@ -31,7 +28,11 @@ for match_id in match_ids:
     ].dropna().drop_duplicates()
 
     unique_players["match_id"] = match_id
-    players_list.append(unique_players)
+    return unique_players
+
+# Load and reduce all matches in parallel (results keep match order)
+players_list, report = load_matches(match_ids, match_players, parser=parser)
+print_report(report)
 
 # Combine all matches
 players_df = pd.concat(players_list, ignore_index=True)
@@ -1,11 +1,13 @@
-from mplsoccer import Sbopen
+from sbcache import CachedSbopen
+from match_loader import load_matches, print_report
+from assists import resolve_assists
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mtick
 # -----------------------------
 # Setup
 # -----------------------------
-parser = Sbopen(dataframe=True)
+parser = CachedSbopen()
 competition_id = 55   # Euro 2024
 season_id = 282
 player_id_focus = 5204
@@ -20,29 +22,23 @@ match_ids = matches['match_id'].tolist()
 # -----------------------------
 # Collect assists for target positions in each match
 # -----------------------------
-all_assists = []
+def match_assists(match_id, df, related, freeze, tactics):
+    # Key passes of players in target positions, joined to the shots they assisted
+    resolved = resolve_assists(df)
+    key_passes = df[(df['type_name'] == 'Pass') & (df['position_id'].isin(target_positions))
+                    & resolved['key_pass']]
+    resolved = resolved.loc[key_passes.index]
 
-for match_id in match_ids:
-    df, related, freeze, tactics = parser.event(match_id)
-    
-    # Filter passes of players in target positions
-    position_passes = df[(df['type_name'] == 'Pass') & (df['position_id'].isin(target_positions))]
-    
-    # Shot assists: any pass that assisted a shot
-    shot_assists = position_passes[position_passes['pass_assisted_shot_id'].notna()].copy()
-    shot_assists['outcome'] = 'Shot Assist'
-    
-    # Goal assists: same pass, but the shot resulted in a goal
-    goal_assists = position_passes[
-        (position_passes['pass_assisted_shot_id'].notna()) &
-        (position_passes['outcome_name'] == 'Goal')
-    ].copy()
-    goal_assists['outcome'] = 'Goal Assist'
-        
-    # Combine
-    assists = pd.concat([shot_assists, goal_assists], ignore_index=True)
+    # Shot assist: any pass that assisted a shot; a goal assist (the shot's
+    # outcome was a goal) counts once more
+    assists = key_passes[['player_id', 'player_name', 'position_id']].copy()
+    assists['assists'] = resolved['key_pass'].astype(int) + resolved['goal_assist'].astype(int)
     assists['match_id'] = match_id
-    all_assists.append(assists[['player_id', 'player_name', 'position_id', 'outcome', 'match_id']])
+    return assists[['player_id', 'player_name', 'position_id', 'assists', 'match_id']]
+
+# Load (from the Parquet cache) and reduce all matches in parallel (results keep match order)
+all_assists, report = load_matches(match_ids, match_assists, parser=parser)
+print_report(report)
 
 # Combine all matches
 assists_df = pd.concat(all_assists, ignore_index=True)
@@ -50,7 +46,7 @@ assists_df = pd.concat(all_assists, ignore_index=True)
 # -----------------------------
 # Count assists per player per match
 # -----------------------------
-player_matches = assists_df.groupby(['player_id', 'player_name', 'match_id']).size().reset_index(name='assists')
+player_matches = assists_df.groupby(['player_id', 'player_name', 'match_id'])['assists'].sum().reset_index()
 
 # Compute per-match normalization
 player_totals = player_matches.groupby(['player_id', 'player_name'])['assists'].mean().reset_index()
@@ -1,8 +1,10 @@
-from mplsoccer import Sbopen, Pitch
+from mplsoccer import Pitch
+from sbcache import CachedSbopen
+from assists import resolve_assists
+from pitch_render import PitchCanvas
 import pandas as pd
-import matplotlib.pyplot as plt
 
-parser = Sbopen(dataframe=True)
+parser = CachedSbopen()
 
 player_id = 5204
 player_name = "Player X"
@@ -26,12 +28,13 @@ for m_id in match_ids:
     all_events[m_id] = df
 
 # -----------------------------------------
-# Use HORIZONTAL pitch
+# Use HORIZONTAL pitch, drawn once and re-used for every match
 # -----------------------------------------
 pitch = Pitch(pitch_type='statsbomb', line_color='black')
+canvas = PitchCanvas(pitch, figsize=(12, 8))
 
 # -----------------------------------------
-# Loop for separate plots
+# Loop for separate plots (one PNG per match)
 # -----------------------------------------
 for m_id in match_ids:
 
@@ -54,50 +57,53 @@ for m_id in match_ids:
     player_events = df[df['player_id'] == player_id]
     passes = player_events[player_events['type_name'] == 'Pass']
 
+    # Shot and goal assists, resolved against the shots of the whole match
+    resolved = resolve_assists(df).loc[passes.index]
+
     # Shot assists (key passes)
-    shot_assists = passes[passes['pass_shot_assist'] == True] \
-        if 'pass_shot_assist' in passes.columns else passes.iloc[0:0]
+    shot_assists = passes[resolved['shot_assist']]
 
     # Goal assists
-    goal_assists = passes[passes['pass_goal_assist'] == True] \
-        if 'pass_goal_assist' in passes.columns else passes.iloc[0:0]
+    goal_assists = passes[resolved['goal_assist']]
 
     # -----------------------------
-    # Create pitch figure
+    # Update the arrow layers on the shared pitch
     # -----------------------------
-    fig, ax = pitch.draw(figsize=(12, 8))
+    canvas.clear()
 
     # Normal passes (black)
-    pitch.arrows(
-        passes['x'], passes['y'], passes['end_x'], passes['end_y'],
-        ax=ax, color='black', alpha=0.4, width=1,
+    canvas.arrows(
+        'passes', passes['x'], passes['y'], passes['end_x'], passes['end_y'],
+        color='black', alpha=0.4, width=1,
         headwidth=3, headlength=3, label="Passes"
     )
 
     # Shot assists (green)
-    pitch.arrows(
-        shot_assists['x'], shot_assists['y'],
+    canvas.arrows(
+        'shot_assists', shot_assists['x'], shot_assists['y'],
         shot_assists['end_x'], shot_assists['end_y'],
-        ax=ax, color='green', alpha=1.0, width=2.5,
+        color='green', alpha=1.0, width=2.5,
         headwidth=6, headlength=6, label="Shot Assists"
     )
 
     # Goal assists (red)
-    pitch.arrows(
-        goal_assists['x'], goal_assists['y'],
+    canvas.arrows(
+        'goal_assists', goal_assists['x'], goal_assists['y'],
         goal_assists['end_x'], goal_assists['end_y'],
-        ax=ax, color='red', alpha=1.0, width=3,
+        color='red', alpha=1.0, width=3,
         headwidth=7, headlength=7, label="Goal Assists"
     )
 
     # -----------------------------
     # Title
     # -----------------------------
-    plt.title(
+    canvas.title(
         f"{player_name} – Match {m_id}\n"
         f"Portugal vs {opponent} | Portugal: {portugal_side}",
         fontsize=15
     )
 
-    plt.legend(loc='upper right')
-    plt.show()
+    canvas.legend(loc='upper right')
+    print(f"Saved {canvas.save(f'PlayerPassMap_{m_id}.png')}")
+
+canvas.close()
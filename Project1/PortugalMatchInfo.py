@@ -1,10 +1,11 @@
-from mplsoccer import Sbopen
+from sbcache import CachedSbopen
+from assists import resolve_assists
 import pandas as pd
 
 # -----------------------------
 # Setup
 # -----------------------------
-parser = Sbopen(dataframe=True)
+parser = CachedSbopen()
 
 player_id = 5204
 player_name = "Player X"
@@ -22,13 +23,14 @@ for m_id in match_ids:
     player_events = df[df['player_id'] == player_id]
     passes = player_events[player_events['type_name'] == 'Pass']
     
+    # Shot and goal assists, resolved against the shots of the whole match
+    resolved = resolve_assists(df).loc[passes.index]
+
     # Shot assists
-    shot_assists = passes[passes['pass_shot_assist'] == True] \
-        if 'pass_shot_assist' in passes.columns else passes.iloc[0:0]
+    shot_assists = passes[resolved['shot_assist']]
 
     # Goal assists
-    goal_assists = passes[passes['pass_goal_assist'] == True] \
-        if 'pass_goal_assist' in passes.columns else passes.iloc[0:0]
+    goal_assists = passes[resolved['goal_assist']]
     
     # Store results
     rows.append({
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Assist resolution: passes joined to the shots they assisted.
+
+A pass that led to a shot carries the shot's event id in
+``pass_assisted_shot_id``. Whether it was a goal assist is a property of that
+shot (its ``outcome_name``), not of the pass row, whose ``outcome_name`` is
+the pass outcome (Incomplete, Out, ...). Testing ``outcome_name == 'Goal'`` on
+passes therefore never finds a goal assist.
+
+``resolve_assists`` looks every pass's shot up in one hash join (a
+``pd.Index.get_indexer`` over the shot ids) and returns, aligned with the
+events,
+
+- ``key_pass``: the pass assisted a shot,
+- ``shot_assist``: ... a shot that was not a goal (StatsBomb's
+  ``pass_shot_assist`` convention),
+- ``goal_assist``: ... a shot that was a goal,
+- ``assisted_xg``: the assisted shot's StatsBomb xG (0 for other events).
+
+The minutes/summary store, the metrics engine and the scripts use these
+columns instead of their own flag or outcome tests. ``load_assists`` builds
+the one-row-per-assist table for a whole tournament with a single join over
+the concatenated passes and shots:
+
+    assists = load_assists(match_ids)
+    assists.groupby("player_id")[["goal_assist", "assisted_xg"]].sum()
+"""
+
+import numpy as np
+import pandas as pd
+
+from instrument import count, timer
+from match_loader import load_matches
+
+RESOLVED_COLUMNS = ["key_pass", "shot_assist", "goal_assist", "assisted_xg"]
+ASSIST_COLUMNS = ["match_id", "pass_id", "minute", "team_id", "team_name", "player_id",
+                  "player_name", "position_id", "shot_id", "shooter_id", "shooter_name",
+                  "shot_outcome_name"] + RESOLVED_COLUMNS
+# Columns the join reads from the events (missing ones are treated as empty)
+SOURCE_COLUMNS = ["match_id", "id", "index", "minute", "type_name", "team_id", "team_name",
+                  "player_id", "player_name", "position_id", "outcome_name",
+                  "pass_assisted_shot_id", "pass_shot_assist", "pass_goal_assist",
+                  "shot_statsbomb_xg"]
+
+
+# ---------------------------
+# Join
+# ---------------------------
+def _column(events, name, fill=np.nan):
+    return events[name] if name in events.columns else pd.Series(fill, index=events.index)
+
+
+@timer("assists.resolve_assists")
+def resolve_assists(events):
+    """Key pass, shot assist, goal assist and assisted xG of every event.
+
+    Parameters
+    ----------
+    events : pandas.DataFrame
+        Flattened events of one or many matches (StatsBomb event ids are
+        unique across matches). Needs ``id`` and ``type_name``.
+
+    Returns
+    -------
+    pandas.DataFrame
+        ``RESOLVED_COLUMNS`` with the index of ``events``. A pass whose shot
+        is not among the events (e.g. a filtered frame) keeps the StatsBomb
+        flags and an assisted xG of 0.
+    """
+    is_shot = (events["type_name"] == "Shot").to_numpy()
+    shot_ids = pd.Index(events["id"].to_numpy()[is_shot])
+    shot_goal = (_column(events, "outcome_name") == "Goal").to_numpy()[is_shot]
+    shot_xg = pd.to_numeric(_column(events, "shot_statsbomb_xg"), errors="coerce") \
+        .fillna(0.0).to_numpy(dtype=np.float64)[is_shot]
+
+    assisted = _column(events, "pass_assisted_shot_id")
+    key_pass = assisted.notna().to_numpy()
+    slot = shot_ids.get_indexer(assisted.to_numpy())
+    found = slot >= 0
+    flag_goal = _column(events, "pass_goal_assist").eq(True).to_numpy()
+
+    goal = np.where(found, shot_goal[slot], flag_goal) & key_pass
+    count("rows.assists", int(key_pass.sum()))
+    return pd.DataFrame({
+        "key_pass": key_pass,
+        "shot_assist": key_pass & ~goal,
+        "goal_assist": goal,
+        "assisted_xg": np.where(found, shot_xg[slot], 0.0),
+    }, index=events.index)
+
+
+def with_assists(events):
+    """``events`` with the ``RESOLVED_COLUMNS`` added (existing ones are replaced)."""
+    return events.drop(columns=RESOLVED_COLUMNS, errors="ignore").join(resolve_assists(events))
+
+
+def assist_table(events):
+    """One row per pass that assisted a shot, with ``ASSIST_COLUMNS``."""
+    resolved = resolve_assists(events)
+    passes = events[resolved["key_pass"].to_numpy()]
+    shots = events[events["type_name"] == "Shot"]
+    shooters = pd.DataFrame({
+        "shooter_id": shots["player_id"].to_numpy(),
+        "shooter_name": shots["player_name"].to_numpy(),
+        "shot_outcome_name": _column(shots, "outcome_name").to_numpy(),
+    }, index=shots["id"].to_numpy())
+    table = pd.DataFrame({
+        "match_id": _column(passes, "match_id").to_numpy(),
+        "pass_id": passes["id"].to_numpy(),
+        "shot_id": passes["pass_assisted_shot_id"].to_numpy(),
+    }, index=passes.index)
+    for column in ("minute", "team_id", "team_name", "player_id", "player_name", "position_id"):
+        table[column] = _column(passes, column)
+    table = table.join(shooters, on="shot_id").join(resolved)
+    return table[ASSIST_COLUMNS].reset_index(drop=True)
+
+
+# ---------------------------
+# Tournament
+# ---------------------------
+def _project(match_id, df, related, freeze, tactics):
+    """``load_matches`` reducer: passes and shots with the columns the join needs."""
+    keep = df["type_name"].isin(["Pass", "Shot"])
+    return df.loc[keep].reindex(columns=SOURCE_COLUMNS).assign(match_id=match_id)
+
+
+def load_assists(match_ids, parser=None, **loader_kwargs):
+    """Assist table of many matches, built with one join over all their passes and shots."""
+    results, _ = load_matches(match_ids, _project, parser=parser, **loader_kwargs)
+    if not results:
+        return pd.DataFrame(columns=ASSIST_COLUMNS)
+    return assist_table(pd.concat(results, ignore_index=True))
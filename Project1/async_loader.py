@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Asyncio prefetching loader for StatsBomb open data.
+
+Scripts call ``parser.match()`` and then block on one ``parser.event()`` per
+match. ``AsyncOpenData`` fetches match listings, events and lineups
+concurrently instead:
+
+- at most ``concurrency`` requests are in flight (an ``asyncio.Semaphore``),
+- every worker thread keeps its own ``requests.Session``, so HTTP keep-alive
+  connections are reused across matches,
+- failed requests (connection errors, 429 and 5xx) are retried with
+  exponential backoff, other HTTP errors are raised straight away,
+- ``base_url`` can point at GitHub (default), any mirror or a local HTTP
+  stand-in serving fixture files; ``data_dir`` reads a local open-data
+  checkout instead.
+
+JSON decoding and flattening run in the worker threads too, so the event loop
+only schedules. The worker pool and the semaphore belong to one ``async with``
+block (and so to its event loop); leaving the block shuts the pool down
+without blocking the loop. ``iter_matches`` is an async iterator that keeps a bounded
+window of matches prefetched ahead of the consumer:
+
+    async def main():
+        async with AsyncOpenData() as source:
+            matches = await source.matches(55, 282)
+            async for match_id, (df, related, freeze, tactics) in source.iter_matches(
+                    matches["match_id"]):
+                ...
+
+    asyncio.run(main())
+
+Nothing is written to the ``CachedSbopen`` Parquet cache, so every run fetches
+and flattens again. Scripts that re-read the same tournament keep using
+``match_loader.load_matches`` on a ``CachedSbopen``; this loader is for
+one-off pulls (or for warming a mirror) where cold-start latency dominates.
+"""
+
+import asyncio
+import json
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from sbcache import OPEN_DATA_URL
+
+try:
+    from mplsoccer.soccer.statsbomb import flatten_event, flatten_lineup, flatten_match
+except ImportError:  # older mplsoccer releases keep the parser at the top level
+    from mplsoccer.statsbomb import flatten_event, flatten_lineup, flatten_match
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class AsyncOpenData:
+    """Concurrent, retrying reader of the open-data layout.
+
+    Parameters
+    ----------
+    base_url : str
+        Root URL of the open-data ``data/`` folder (ignored with ``data_dir``).
+    data_dir : str, optional
+        Local open-data checkout; no network is used.
+    concurrency : int
+        Maximum number of requests in flight.
+    retries : int
+        Extra attempts after a retryable failure.
+    backoff : float
+        First retry delay in seconds, doubled on every further attempt.
+    timeout : float
+        Per-request timeout in seconds.
+    """
+
+    def __init__(self, base_url=OPEN_DATA_URL, data_dir=None, concurrency=8, retries=3,
+                 backoff=0.5, timeout=30):
+        self.base_url = base_url if base_url.endswith("/") else base_url + "/"
+        self.data_dir = data_dir
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._executor = None
+        self._semaphore = None
+        self._local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+
+    async def __aenter__(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        # Waiting for in-flight requests happens in a helper thread, not on the loop
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+    def close(self):
+        executor, self._executor, self._semaphore = self._executor, None, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        with self._sessions_lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions.clear()
+
+    # ---------------------------
+    # Raw access
+    # ---------------------------
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    def _read(self, relative):
+        """One attempt; returns (bytes, retryable error or None)."""
+        if self.data_dir is not None:
+            with open(os.path.join(self.data_dir, *relative.split("/")), "rb") as f:
+                return f.read(), None
+        try:
+            resp = self._session().get(self.base_url + relative, timeout=self.timeout)
+        except (requests.ConnectionError, requests.Timeout) as err:
+            return None, err
+        if resp.status_code in RETRY_STATUS:
+            return None, requests.HTTPError(f"{resp.status_code} for {resp.url}", response=resp)
+        resp.raise_for_status()
+        return resp.content, None
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def fetch(self, relative, parse=json.loads):
+        """Fetch a file of the open-data layout and ``parse`` its bytes in a worker thread."""
+        if self._semaphore is None:
+            raise RuntimeError("use 'async with AsyncOpenData(...)' before fetching")
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                raw, error = await self._run(self._read, relative)
+                if error is None:
+                    break
+                if attempt == self.retries:
+                    raise error
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+        return await self._run(parse, raw)
+
+    # ---------------------------
+    # Frames
+    # ---------------------------
+    async def matches(self, competition_id, season_id):
+        """Match listing (same frame as ``Sbopen.match``)."""
+        return await self.fetch(f"matches/{competition_id}/{season_id}.json",
+                                lambda raw: flatten_match(json.loads(raw), dataframe=True))
+
+    async def event(self, match_id):
+        """Events, related, freeze and tactics frames (same as ``Sbopen.event``)."""
+        return await self.fetch(f"events/{match_id}.json",
+                                lambda raw: flatten_event(json.loads(raw), match_id, dataframe=True))
+
+    async def lineup(self, match_id):
+        """Lineup frame (same as ``Sbopen.lineup``)."""
+        return await self.fetch(f"lineups/{match_id}.json",
+                                lambda raw: flatten_lineup(json.loads(raw), match_id, dataframe=True))
+
+    async def _match(self, match_id, lineups):
+        if not lineups:
+            return await self.event(match_id)
+        return await asyncio.gather(self.event(match_id), self.lineup(match_id))
+
+    async def iter_matches(self, match_ids, lineups=False, prefetch=None):
+        """Yield ``(match_id, frames)`` in ``match_ids`` order while later matches download.
+
+        ``frames`` is the ``event`` 4-tuple, or ``(event 4-tuple, lineup frame)``
+        with ``lineups=True``. At most ``prefetch`` matches (default: twice the
+        concurrency) are held ahead of the consumer.
+        """
+        prefetch = 2 * self.concurrency if prefetch is None else prefetch
+        pending = deque()
+        match_ids = iter(match_ids)
+        try:
+            for match_id in match_ids:
+                pending.append((match_id, asyncio.ensure_future(self._match(match_id, lineups))))
+                if len(pending) >= prefetch:
+                    match_id, task = pending.popleft()
+                    yield match_id, await task
+            while pending:
+                match_id, task = pending.popleft()
+                yield match_id, await task
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+
+def fetch_matches(match_ids, base_url=OPEN_DATA_URL, data_dir=None, lineups=False,
+                  **source_kwargs):
+    """Blocking helper: every match's frames as a list, in ``match_ids`` order."""
+    async def collect():
+        async with AsyncOpenData(base_url, data_dir, **source_kwargs) as source:
+            return [frames async for _, frames in source.iter_matches(match_ids, lineups)]
+    return asyncio.run(collect())
@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite for the Project1 aggregation pipelines.
+
+Runs the stages behind ``Midfielders.py``, ``AllMidfielders.py``, the summary
+CSVs and the Streamlit pass map against an offline synthetic tournament
+(``synthetic.write_tournament``), at 1x and 10x the base fixture size by
+default (``--scales`` adds larger multiples such as 100x):
+
+    load       match listing + raw event JSON read from disk
+    parse      cold cache: JSON -> flattened frames -> Parquet (``CachedSbopen.event``)
+    filter     warm cache: target-position passes and player/position pairs
+    minutes    ``minutes.tournament_minutes``
+    aggregate  summary partials + ``summarise`` and the appearance counts
+    render     zone map and pass map of the busiest passer, to PNG
+
+Every stage reports its best wall time over ``--repeat`` runs, throughput in
+its own unit (bytes, events, players, rows, passes per second), the peak of
+traced Python / numpy allocations (one extra run under ``tracemalloc``) and a
+digest of its output. Results are written as JSON; with a stored baseline a
+stage fails when it got slower or hungrier than ``--threshold`` (relative)
+and ``--min-seconds`` / ``--min-mb`` (absolute noise floors), or when its
+output digest changed.
+
+    python benchmark.py --save-baseline           # on the reference commit
+    python benchmark.py                           # later: exit code 1 on regression
+    python benchmark.py --scales 1 10 100 --repeat 3
+"""
+
+import argparse
+import io
+import json
+import os
+import shutil
+import sys
+import time
+import tracemalloc
+
+import matplotlib
+
+matplotlib.use("Agg")  # headless: figures are only rendered to PNG
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from dashboard_bundle import player_passes
+from export_charts import render_pass_map, render_zone_map
+from lineups import appearance_counts, match_appearances
+from match_loader import load_matches
+from minutes import tournament_minutes
+from sbcache import CachedSbopen, atomic_write_json, read_json
+from summary_store import TARGET_POSITIONS, match_partials, summarise
+from synthetic import COMPETITION_ID, write_tournament
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_WORK_DIR = os.path.join(BASE_DIR, ".bench")
+DEFAULT_BASELINE = os.path.join(BASE_DIR, "benchmark_baseline.json")
+BASE_MATCHES = 6
+SCALES = [1, 10]  # 100x takes hours per run, so it is opt-in via --scales
+RENDER_MATCHES = 4
+
+RESULT_COLUMNS = ["scale", "matches", "stage", "seconds", "rows", "unit", "per_second",
+                  "peak_mb", "digest"]
+
+
+# ---------------------------
+# Fixture
+# ---------------------------
+class Fixture:
+    """A synthetic tournament of ``n_matches`` plus its warm cache.
+
+    All scales share one event folder (match ids and content only depend on
+    the seed), and each scale gets its own listing, stored as season ``n_matches``.
+    """
+
+    def __init__(self, work_dir, n_matches, seed=0):
+        self.data_dir = os.path.join(work_dir, f"fixture-{seed}")
+        self.season_id = n_matches
+        self.match_ids = write_tournament(self.data_dir, n_matches, seed=seed,
+                                          season_id=self.season_id)
+        self.cache_root = os.path.join(work_dir, f"cache-{seed}-{n_matches}")
+        self.cache_dir = None  # warm cache, set by the parse stage
+        self.state = {}
+        self._runs = 0
+
+    def parser(self, cache_dir=None):
+        return CachedSbopen(cache_dir=cache_dir or self.cache_dir, data_dir=self.data_dir)
+
+    def scratch_cache(self):
+        """A new, empty cache directory."""
+        self._runs += 1
+        return os.path.join(self.cache_root, f"run-{self._runs}")
+
+    def fresh_cache(self):
+        """A new, empty warm cache; the previous one is removed."""
+        if self.cache_dir is not None:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+        self.cache_dir = self.scratch_cache()
+        return self.cache_dir
+
+
+def _digest(result):
+    """Short, order-sensitive digest of a stage output (None when not comparable)."""
+    if isinstance(result, pd.DataFrame):
+        return format(int(pd.util.hash_pandas_object(result, index=False).sum()) % (1 << 64), "016x")
+    if isinstance(result, (int, float)):
+        return str(result)
+    return None
+
+
+# ---------------------------
+# Stages: fixture -> (rows, output)
+# ---------------------------
+def stage_load(fixture):
+    cache_dir = fixture.scratch_cache()
+    matches = fixture.parser(cache_dir).match(COMPETITION_ID, fixture.season_id)
+    size = 0
+    for m_id in matches["match_id"]:
+        with open(os.path.join(fixture.data_dir, "events", f"{m_id}.json"), "rb") as f:
+            size += len(f.read())
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    return size, size
+
+
+def _event_count(match_id, df, related, freeze, tactics):
+    return len(df)
+
+
+def stage_parse(fixture):
+    parser = fixture.parser(fixture.fresh_cache())
+    parser.match(COMPETITION_ID, fixture.season_id)
+    counts, _ = load_matches(fixture.match_ids, _event_count, parser=parser, on_error="raise")
+    return sum(counts), sum(counts)
+
+
+def _target_passes(match_id, df, related, freeze, tactics):
+    """The ``Midfielders.py`` / ``BrunoVSOthers.py`` per-match filters."""
+    passes = df[(df["type_name"] == "Pass") & df["position_id"].isin(TARGET_POSITIONS)]
+    players = (df[["player_id", "player_name", "position_id", "position_name"]]
+               .dropna().drop_duplicates().assign(match_id=match_id))
+    return len(df), passes[["player_id", "position_id"]], players
+
+
+def stage_filter(fixture):
+    results, _ = load_matches(fixture.match_ids, _target_passes, parser=fixture.parser(),
+                              on_error="raise")
+    scanned = sum(n for n, _, _ in results)
+    passes = pd.concat([p for _, p, _ in results], ignore_index=True)
+    players = pd.concat([pl for _, _, pl in results], ignore_index=True)
+    fixture.state["passes_per_player"] = passes.groupby("player_id").size()
+    return scanned, players.reset_index(drop=True)
+
+
+def stage_minutes(fixture):
+    table = tournament_minutes(fixture.match_ids, parser=fixture.parser(), on_error="raise")
+    return len(table), table
+
+
+def stage_aggregate(fixture):
+    parser = fixture.parser()
+    results, _ = load_matches(fixture.match_ids, match_partials, parser=parser, on_error="raise")
+    partials = pd.concat([partial for partial, _ in results], ignore_index=True)
+    summary = summarise(partials, min_minutes=None)
+    tables, _ = load_matches(fixture.match_ids, match_appearances, parser=parser,
+                             on_error="raise")
+    counts = appearance_counts(pd.concat(tables, ignore_index=True), positions=TARGET_POSITIONS)
+    return len(partials) + len(counts), pd.concat([summary, counts], ignore_index=True)
+
+
+def stage_render(fixture):
+    busiest = fixture.state.get("passes_per_player")
+    if busiest is None:
+        stage_filter(fixture)
+        busiest = fixture.state["passes_per_player"]
+    player_id = int(busiest.idxmax())
+
+    results, _ = load_matches(fixture.match_ids,
+                              lambda m_id, df, *_: player_passes(df, [player_id]).assign(match_id=m_id),
+                              parser=fixture.parser(), on_error="raise")
+    passes = pd.concat([p for p in results if len(p)], ignore_index=True)
+    match_ids = passes["match_id"].drop_duplicates().head(RENDER_MATCHES).tolist()
+    passes = passes[passes["match_id"].isin(match_ids)]
+    names = {m_id: f"Match {m_id}" for m_id in match_ids}
+
+    for render in (render_zone_map, render_pass_map):
+        fig = render(passes, names, f"Player {player_id}")
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", dpi=100)
+        plt.close(fig)
+    # PNG bytes depend on the installed fonts, so the output is not digested
+    return len(passes), None
+
+
+# name -> (function, throughput unit)
+STAGES = {
+    "load": (stage_load, "bytes"),
+    "parse": (stage_parse, "events"),
+    "filter": (stage_filter, "events"),
+    "minutes": (stage_minutes, "players"),
+    "aggregate": (stage_aggregate, "rows"),
+    "render": (stage_render, "passes"),
+}
+
+
+# ---------------------------
+# Running
+# ---------------------------
+def measure(func, fixture, repeat=1, memory=True):
+    """Best wall time over ``repeat`` runs and the traced peak of one extra run."""
+    best, rows, output = float("inf"), 0, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows, output = func(fixture)
+        best = min(best, time.perf_counter() - start)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            func(fixture)
+            peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return best, rows, output, peak
+
+
+def run_benchmarks(scales=SCALES, stages=None, base_matches=BASE_MATCHES, repeat=3,
+                   memory=True, work_dir=DEFAULT_WORK_DIR, seed=0, log=print):
+    """Run ``stages`` (default: all, in pipeline order) at every scale.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per (scale, stage) with ``RESULT_COLUMNS``.
+    """
+    stages = list(STAGES) if stages is None else list(stages)
+    rows = []
+    for scale in scales:
+        n_matches = base_matches * scale
+        log(f"scale {scale}x: {n_matches} matches")
+        fixture = Fixture(work_dir, n_matches, seed)
+        if "parse" not in stages:
+            stage_parse(fixture)  # the other stages need a warm cache
+        for name in stages:
+            func, unit = STAGES[name]
+            seconds, count, output, peak = measure(func, fixture, repeat, memory)
+            rows.append((scale, n_matches, name, seconds, count, unit,
+                         count / seconds if seconds > 0 else float("nan"), peak, _digest(output)))
+            log(f"  {name:<10} {seconds:8.3f}s")
+        shutil.rmtree(fixture.cache_root, ignore_errors=True)
+    return pd.DataFrame(rows, columns=RESULT_COLUMNS)
+
+
+# ---------------------------
+# Baseline
+# ---------------------------
+def save_results(results, path):
+    atomic_write_json(path, {"python": sys.version.split()[0],
+                             "results": json.loads(results.to_json(orient="records"))})
+
+
+def load_baseline(path):
+    data = read_json(path)
+    return None if data is None else pd.DataFrame(data["results"])
+
+
+def compare(results, baseline, threshold=0.25, min_seconds=0.05, min_mb=1.0):
+    """Join ``results`` to ``baseline`` per (scale, stage) and flag regressions.
+
+    A stage regresses when it is both ``threshold`` (relative) and
+    ``min_seconds`` / ``min_mb`` (absolute) worse than the baseline, or when
+    its output digest changed.
+    """
+    merged = results.merge(baseline[["scale", "stage", "seconds", "peak_mb", "digest"]],
+                           on=["scale", "stage"], how="left", suffixes=("", "_base"))
+    slower = ((merged["seconds"] > merged["seconds_base"] * (1 + threshold))
+              & (merged["seconds"] - merged["seconds_base"] > min_seconds))
+    hungrier = ((merged["peak_mb"] > merged["peak_mb_base"] * (1 + threshold))
+                & (merged["peak_mb"] - merged["peak_mb_base"] > min_mb))
+    changed = (merged["digest"].notna() & merged["digest_base"].notna()
+               & (merged["digest"] != merged["digest_base"]))
+    merged["time_ratio"] = (merged["seconds"] / merged["seconds_base"]).round(2)
+    merged["status"] = "ok"
+    merged.loc[merged["seconds_base"].isna(), "status"] = "new"
+    merged.loc[hungrier, "status"] = "memory"
+    merged.loc[slower, "status"] = "slower"
+    merged.loc[changed, "status"] = "output changed"
+    return merged
+
+
+def print_results(results):
+    table = results.copy()
+    table["per_second"] = table["per_second"].map(lambda v: f"{v:,.0f}")
+    table["seconds"] = table["seconds"].map(lambda v: f"{v:.3f}")
+    table["peak_mb"] = table["peak_mb"].map(lambda v: "-" if pd.isna(v) else f"{v:.1f}")
+    columns = [c for c in ["scale", "matches", "stage", "seconds", "rows", "unit", "per_second",
+                           "peak_mb", "time_ratio", "status"] if c in table.columns]
+    print(table[columns].to_string(index=False))
+
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description="Benchmark the Project1 pipelines offline.")
+    cli.add_argument("--scales", type=int, nargs="+", default=SCALES,
+                     help="multiples of the base fixture size, e.g. 1 10 100")
+    cli.add_argument("--stages", nargs="+", default=None, choices=list(STAGES))
+    cli.add_argument("--base-matches", type=int, default=BASE_MATCHES)
+    cli.add_argument("--repeat", type=int, default=3, help="timed runs per stage (best is kept)")
+    cli.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run")
+    cli.add_argument("--seed", type=int, default=0)
+    cli.add_argument("--work-dir", default=DEFAULT_WORK_DIR)
+    cli.add_argument("--out", default=None, help="write the results as JSON")
+    cli.add_argument("--baseline", default=DEFAULT_BASELINE)
+    cli.add_argument("--save-baseline", action="store_true",
+                     help="store these results as the new baseline instead of comparing")
+    cli.add_argument("--threshold", type=float, default=0.25,
+                     help="allowed relative slowdown / memory growth")
+    cli.add_argument("--min-seconds", type=float, default=0.05)
+    cli.add_argument("--min-mb", type=float, default=1.0)
+    args = cli.parse_args()
+
+    results = run_benchmarks(args.scales, args.stages, args.base_matches, args.repeat,
+                             not args.no_memory, args.work_dir, args.seed)
+    if args.out:
+        save_results(results, args.out)
+    if args.save_baseline:
+        save_results(results, args.baseline)
+        print_results(results)
+        print(f"Saved baseline to {args.baseline}")
+        sys.exit(0)
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print_results(results)
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        sys.exit(0)
+    report = compare(results, baseline, args.threshold, args.min_seconds, args.min_mb)
+    print_results(report)
+    failed = report[~report["status"].isin(["ok", "new"])]
+    if not failed.empty:
+        print(f"{len(failed)} stage(s) regressed against {args.baseline}")
+        sys.exit(1)
+    print("No regressions")
@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Compact, array-backed event schema.
+
+The flattened ``Sbopen`` frames carry every name as an object / string column
+(``type_name``, ``team_name``, ``player_name``, ``position_name``,
+``outcome_name``, ...) next to the matching StatsBomb id, plus 36-character
+event UUIDs, so a concatenated tournament is mostly repeated strings. The
+compact form keeps
+
+- the StatsBomb ids as small integers, with the names moved to side lookup
+  tables (id -> name) that are shared by all matches,
+- coordinates, xG and the period clock as ``float32``,
+- StatsBomb flags (shot / goal assist, under pressure, ...) as nullable
+  ``Int8`` (1 or <NA>, so ``.eq(True)`` and ``.sum()`` work as before),
+- links between events (assisted shot, key pass) as the linked event's
+  ``index`` within the match instead of its UUID,
+
+and only the columns an analysis asks for. StatsBomb ids are global, so
+matches from different competitions concatenate without re-coding; only the
+lookup tables are merged. ``COMPACT_SCHEMA`` documents every column and
+``describe_schema()`` returns it as a table.
+
+    compact = load_compact(match_ids, columns=["match_id", "type_id", "player_id", "x", "y"])
+    passes = compact.events[compact.events["type_id"] == compact.id_of("type", "Pass")]
+    wide = compact.decode()    # names restored, e.g. for existing scripts
+"""
+
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from match_loader import load_matches
+from minutes import period_seconds
+
+# ---------------------------
+# Schema
+# ---------------------------
+# (column, dtype, lookup table, description)
+COMPACT_SCHEMA = [
+    ("match_id", "int32", None, "StatsBomb match id"),
+    ("index", "int32", None, "event number within the match (1-based)"),
+    ("period", "int8", None, "1, 2 = halves, 3, 4 = extra time, 5 = shoot-out"),
+    ("period_seconds", "float32", None, "seconds since the start of the period"),
+    ("minute", "int16", None, "match minute as published"),
+    ("second", "int8", None, "second within the minute"),
+    ("possession", "int16", None, "possession sequence number"),
+    ("type_id", "int16", "type", "event type"),
+    ("play_pattern_id", "int8", "play_pattern", "play pattern of the possession"),
+    ("possession_team_id", "int32", "team", "team in possession"),
+    ("team_id", "int32", "team", "team of the event"),
+    ("player_id", "Int32", "player", "player of the event"),
+    ("position_id", "Int8", "position", "position of the player at the time"),
+    ("x", "float32", None, "start x (0-120)"),
+    ("y", "float32", None, "start y (0-80)"),
+    ("end_x", "float32", None, "end x of passes, carries and shots"),
+    ("end_y", "float32", None, "end y of passes, carries and shots"),
+    ("outcome_id", "Int16", "outcome", "outcome of any event type"),
+    ("pass_recipient_id", "Int32", "player", "intended pass recipient"),
+    ("pass_assisted_shot_index", "Int32", None, "index of the shot a pass assisted"),
+    ("pass_shot_assist", "Int8", None, "flag: pass led to a shot"),
+    ("pass_goal_assist", "Int8", None, "flag: pass led to a goal"),
+    ("shot_key_pass_index", "Int32", None, "index of the pass that assisted a shot"),
+    ("shot_statsbomb_xg", "float32", None, "StatsBomb expected goals"),
+    ("under_pressure", "Int8", None, "flag: event under pressure"),
+    ("substitution_replacement_id", "Int32", "player", "player coming on"),
+    ("foul_committed_card_id", "Int16", "card", "card for a foul"),
+    ("bad_behaviour_card_id", "Int16", "card", "card for bad behaviour"),
+]
+COMPACT_COLUMNS = [column for column, _, _, _ in COMPACT_SCHEMA]
+COMPACT_DTYPES = {column: dtype for column, dtype, _, _ in COMPACT_SCHEMA}
+LOOKUP_OF = {column: lookup for column, _, lookup, _ in COMPACT_SCHEMA if lookup}
+FLAG_COLUMNS = [column for column, dtype, _, description in COMPACT_SCHEMA
+                if description.startswith("flag:")]
+
+# Compact column -> wide name column it replaces
+NAME_COLUMNS = {column: column[:-len("_id")] + "_name" for column in LOOKUP_OF}
+# Compact index link -> wide UUID column
+LINK_COLUMNS = {"pass_assisted_shot_index": "pass_assisted_shot_id",
+                "shot_key_pass_index": "shot_key_pass_id"}
+
+
+def describe_schema():
+    """``COMPACT_SCHEMA`` as a DataFrame."""
+    return pd.DataFrame(COMPACT_SCHEMA, columns=["column", "dtype", "lookup", "description"])
+
+
+# ---------------------------
+# Conversion
+# ---------------------------
+def _compact_column(df, column):
+    if column == "period_seconds":
+        return period_seconds(df["timestamp"])
+    if column in LINK_COLUMNS:
+        index_of = pd.Series(df["index"].to_numpy(), index=df["id"].to_numpy())
+        return df[LINK_COLUMNS[column]].map(index_of)
+    if column in FLAG_COLUMNS:
+        return df[column].eq(True).astype("Int8").where(df[column].notna())
+    return df[column]
+
+
+def compact_events(df, match_id=None, columns=None):
+    """Compact one match's flattened event frame.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Events as returned by ``Sbopen.event`` / ``CachedSbopen.event``.
+    match_id : int, optional
+        Stored in ``match_id`` when the frame has no such column.
+    columns : list of str, optional
+        Subset of ``COMPACT_COLUMNS`` to keep (default: all).
+
+    Returns
+    -------
+    CompactEvents
+    """
+    columns = COMPACT_COLUMNS if columns is None else [c for c in COMPACT_COLUMNS if c in columns]
+    sources = {"period_seconds": "timestamp", **LINK_COLUMNS}
+
+    data = {}
+    for column in columns:
+        if column == "match_id" and match_id is not None:
+            data[column] = np.full(len(df), match_id)
+        elif sources.get(column, column) in df.columns:
+            data[column] = _compact_column(df, column)
+        else:
+            data[column] = pd.Series(np.nan, index=df.index)
+    events = (pd.DataFrame(data, index=df.index).reset_index(drop=True)
+              .astype({column: COMPACT_DTYPES[column] for column in columns}))
+
+    lookups = {}
+    for column in columns:
+        lookup, name = LOOKUP_OF.get(column), NAME_COLUMNS.get(column)
+        if lookup is None or column not in df.columns or name not in df.columns:
+            continue
+        pairs = df[[column, name]].dropna().drop_duplicates(column)
+        table = pd.Series(pairs[name].to_numpy(dtype=object),
+                          index=pairs[column].to_numpy(dtype=np.int64), name=lookup)
+        lookups[lookup] = table if lookup not in lookups else \
+            lookups[lookup].combine_first(table)
+    return CompactEvents(events, lookups)
+
+
+class CompactEvents:
+    """Compact event table plus its id -> name lookup tables.
+
+    Attributes
+    ----------
+    events : pandas.DataFrame
+        Columns and dtypes from ``COMPACT_SCHEMA``.
+    lookups : dict
+        Lookup name (``"type"``, ``"player"``, ...) -> Series of names indexed by id.
+    """
+
+    def __init__(self, events, lookups=None):
+        self.events = events
+        self.lookups = lookups or {}
+
+    def __len__(self):
+        return len(self.events)
+
+    @classmethod
+    def concat(cls, parts):
+        """One table from many (matches, competitions); lookup tables are merged."""
+        parts = list(parts)
+        if not parts:
+            return cls(pd.DataFrame({c: pd.Series(dtype=COMPACT_DTYPES[c])
+                                     for c in COMPACT_COLUMNS}))
+        events = pd.concat([part.events for part in parts], ignore_index=True)
+        lookups = {}
+        for part in parts:
+            for name, table in part.lookups.items():
+                lookups[name] = table if name not in lookups else lookups[name].combine_first(table)
+        return cls(events, lookups)
+
+    def id_of(self, lookup, name):
+        """StatsBomb id of a name in a lookup table, e.g. ``id_of("type", "Pass")``."""
+        table = self.lookups[lookup]
+        matches = table.index[table == name]
+        if len(matches) == 0:
+            raise KeyError(f"{name!r} not in the {lookup!r} lookup")
+        return int(matches[0])
+
+    def names(self, column):
+        """Names for an id column (``names("player_id")`` -> player names)."""
+        return self.events[column].map(self.lookups.get(LOOKUP_OF[column], pd.Series(dtype=object)))
+
+    def decode(self, columns=None):
+        """Wide frame with the ``*_name`` columns restored next to the ids.
+
+        Index links stay as event indices; flags stay ``Int8``.
+        """
+        events = self.events if columns is None else self.events[columns]
+        wide = events.copy()
+        for column in events.columns:
+            if column in LOOKUP_OF:
+                wide[NAME_COLUMNS[column]] = self.names(column)
+        return wide
+
+    def memory_usage(self):
+        """Bytes used by the events and the lookup tables."""
+        return int(self.events.memory_usage(deep=True).sum()
+                   + sum(table.memory_usage(deep=True) for table in self.lookups.values()))
+
+
+# ---------------------------
+# Loading
+# ---------------------------
+def _compact_match(columns, match_id, df, related, freeze, tactics):
+    return compact_events(df, match_id, columns)
+
+
+def load_compact(match_ids, parser=None, columns=None, **loader_kwargs):
+    """Compact events of many matches; each match is compacted as soon as it is loaded.
+
+    Only one flattened frame per worker is alive at a time, so peak memory is
+    the compact tournament plus a few wide matches. Keyword arguments go to
+    ``load_matches``.
+    """
+    parts, _ = load_matches(match_ids, partial(_compact_match, columns), parser=parser,
+                            **loader_kwargs)
+    return CompactEvents.concat(parts)
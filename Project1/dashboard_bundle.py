@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Prebuilt, versioned data bundle for the Streamlit dashboard.
+
+The app used to call ``Sbopen`` at import time and rebuild its frames on every
+widget interaction. This module precomputes everything the page shows:
+
+    matches.parquet   match id + team names of the focus matches
+    passes.parquet    passes of the focus players in those matches
+    summary.parquet   the peer summary table, with the ``highlight`` column
+    manifest.json     schema number, content version, match and player ids
+
+Build it from the Project1 directory with
+
+    python dashboard_bundle.py
+
+and the app loads it once per version behind ``st.cache_resource``.
+"""
+
+import argparse
+import datetime
+import hashlib
+import os
+
+import pandas as pd
+
+from assists import RESOLVED_COLUMNS, resolve_assists
+from sbcache import CachedSbopen, atomic_write_json, atomic_write_parquet, read_json
+
+# ---------------------------
+# Constants
+# ---------------------------
+BUNDLE_SCHEMA = 2  # 2: resolved assist columns instead of the raw StatsBomb flags
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BUNDLE_DIR = os.path.join(BASE_DIR, "..", "Streamlit", "bundle")
+DEFAULT_SUMMARY_CSV = os.path.join(BASE_DIR, "euro2024_midfielders_summary_360plus.csv")
+
+COMPETITION_ID = 55   # Euro 2024
+SEASON_ID = 282
+BRUNO_ID = 5204
+DEBRUYNE_ID = 3089
+FOCUS_MATCH_IDS = [3942349, 3941020, 3930174, 3930166]
+FOCUS_PLAYER_IDS = [BRUNO_ID]
+HIGHLIGHTS = {BRUNO_ID: "Bruno", DEBRUYNE_ID: "De Bruyne"}
+
+MATCH_COLUMNS = ["match_id", "home_team_name", "away_team_name"]
+PASS_COLUMNS = ["match_id", "player_id", "player_name", "x", "y", "end_x", "end_y",
+                "outcome_name", "pass_recipient_id", "pass_assisted_shot_id"] + RESOLVED_COLUMNS
+BUNDLE_FILES = ("matches", "passes", "summary")
+
+
+# ---------------------------
+# Building
+# ---------------------------
+def highlight_column(player_ids):
+    """"Bruno" / "De Bruyne" / "Peer" label used for the bar-chart colours."""
+    return player_ids.map(HIGHLIGHTS).fillna("Peer")
+
+
+def player_passes(df, player_ids):
+    """Passes of ``player_ids`` from one match's event frame, projected to ``PASS_COLUMNS``.
+
+    The assist columns are resolved against the shots of the whole match
+    (``assists.resolve_assists``), before the other players' events are dropped.
+    """
+    keep = (df["type_name"] == "Pass") & df["player_id"].isin(player_ids)
+    passes = df[keep].drop(columns=RESOLVED_COLUMNS, errors="ignore")
+    return passes.join(resolve_assists(df)[keep]).reindex(columns=PASS_COLUMNS)
+
+
+def build_bundle(parser=None, out_dir=DEFAULT_BUNDLE_DIR, summary_csv=DEFAULT_SUMMARY_CSV,
+                 match_ids=FOCUS_MATCH_IDS, player_ids=FOCUS_PLAYER_IDS,
+                 competition_id=COMPETITION_ID, season_id=SEASON_ID):
+    """Write the bundle and return its manifest."""
+    parser = CachedSbopen() if parser is None else parser
+    os.makedirs(out_dir, exist_ok=True)
+
+    matches = parser.match(competition_id, season_id)
+    matches = matches[matches["match_id"].isin(match_ids)][MATCH_COLUMNS].reset_index(drop=True)
+
+    passes = pd.concat(
+        [player_passes(parser.event(m_id)[0], player_ids).assign(match_id=m_id)
+         for m_id in match_ids],
+        ignore_index=True,
+    )
+
+    summary = pd.read_csv(summary_csv)
+    summary["highlight"] = highlight_column(summary["player_id"])
+
+    digest = hashlib.sha256()
+    for name, frame in zip(BUNDLE_FILES, (matches, passes, summary)):
+        path = os.path.join(out_dir, f"{name}.parquet")
+        atomic_write_parquet(frame, path)
+        with open(path, "rb") as f:
+            digest.update(f.read())
+
+    manifest = {
+        "schema": BUNDLE_SCHEMA,
+        "version": digest.hexdigest()[:16],
+        "built": datetime.datetime.now().isoformat(timespec="seconds"),
+        "match_ids": [int(m_id) for m_id in match_ids],
+        "player_ids": [int(pid) for pid in player_ids],
+    }
+    atomic_write_json(os.path.join(out_dir, "manifest.json"), manifest)
+    return manifest
+
+
+# ---------------------------
+# Loading
+# ---------------------------
+def bundle_version(bundle_dir=DEFAULT_BUNDLE_DIR):
+    """Version string of the bundle on disk, or None if there is no usable bundle.
+
+    Only reads the small manifest, so it is cheap enough to call on every rerun
+    and use as the cache key.
+    """
+    manifest = read_json(os.path.join(bundle_dir, "manifest.json"))
+    if manifest is None or manifest.get("schema") != BUNDLE_SCHEMA:
+        return None
+    return manifest["version"]
+
+
+def load_bundle(bundle_dir=DEFAULT_BUNDLE_DIR):
+    """All bundle frames plus the manifest as a dict, or None if there is no usable bundle."""
+    manifest = read_json(os.path.join(bundle_dir, "manifest.json"))
+    if manifest is None or manifest.get("schema") != BUNDLE_SCHEMA:
+        return None
+    bundle = {name: pd.read_parquet(os.path.join(bundle_dir, f"{name}.parquet"))
+              for name in BUNDLE_FILES}
+    bundle["manifest"] = manifest
+    return bundle
+
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description="Build the Streamlit data bundle.")
+    cli.add_argument("--out", default=DEFAULT_BUNDLE_DIR, help="bundle directory")
+    cli.add_argument("--summary-csv", default=DEFAULT_SUMMARY_CSV)
+    cli.add_argument("--data-dir", default=None,
+                     help="local StatsBomb open-data checkout (default: download)")
+    args = cli.parse_args()
+
+    built = build_bundle(CachedSbopen(data_dir=args.data_dir), args.out, args.summary_csv)
+    print(f"Bundle {built['version']} written to {os.path.abspath(args.out)}")
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+Memory-mapped columnar event archive for many competitions.
+
+The archive stores the compact event table (see ``compact_events``) one column
+per file, as raw little-endian arrays that are opened with ``np.memmap``:
+
+    <archive>/manifest.json        schema number, row count, column dtypes
+    <archive>/partitions.parquet   competition_id, season_id, match_id, start, stop
+    <archive>/lookups.json         id -> name tables (type, player, team, ...)
+    <archive>/columns/<name>.bin   column values
+    <archive>/columns/<name>.mask.bin
+                                   missing-value mask of nullable columns
+
+Opening an archive only reads the manifest, the partition index and the
+lookups; a query maps the requested columns and slices the row ranges of the
+requested competitions / seasons / matches, so the OS only pages in what is
+read. Each match is one contiguous block of rows.
+
+    python event_archive.py --season 55 282 --season 43 106 --out ../archive
+
+    archive = EventArchive("../archive")
+    passes = archive.read(["match_id", "player_id", "type_id", "x", "y"], competition_id=55)
+
+New seasons (or matches) are appended in place; matches that are already in
+the partition index are skipped.
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from compact_events import COMPACT_COLUMNS, COMPACT_DTYPES, CompactEvents, load_compact
+from sbcache import CachedSbopen, atomic_write_json, atomic_write_parquet, read_json
+
+ARCHIVE_SCHEMA = 1
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ARCHIVE_DIR = os.path.join(BASE_DIR, "..", "archive")
+PARTITION_COLUMNS = ["competition_id", "season_id", "match_id", "start", "stop"]
+
+
+def _numpy_dtype(dtype):
+    """Storage dtype of a compact dtype (nullable ``Int32`` -> ``int32`` plus a mask)."""
+    return np.dtype(dtype.lower()).newbyteorder("<")
+
+
+def _is_nullable(dtype):
+    return dtype.startswith("Int")
+
+
+# ---------------------------
+# Reading
+# ---------------------------
+class EventArchive:
+    """Read side of an archive directory.
+
+    Parameters
+    ----------
+    path : str
+        Archive directory written by ``build_archive``.
+
+    Attributes
+    ----------
+    partitions : pandas.DataFrame
+        One row per match with its ``start`` / ``stop`` row.
+    lookups : dict
+        Lookup name -> Series of names indexed by StatsBomb id.
+    """
+
+    def __init__(self, path=DEFAULT_ARCHIVE_DIR):
+        self.path = path
+        manifest = read_json(os.path.join(path, "manifest.json"))
+        if manifest is None or manifest.get("schema") != ARCHIVE_SCHEMA:
+            raise FileNotFoundError(f"no archive (schema {ARCHIVE_SCHEMA}) in {path}")
+        self.rows = manifest["rows"]
+        self.dtypes = manifest["columns"]
+        self.partitions = pd.read_parquet(os.path.join(path, "partitions.parquet"))
+        lookups = read_json(os.path.join(path, "lookups.json")) or {}
+        self.lookups = {name: pd.Series(table, dtype=object).rename(lambda key: int(key))
+                        for name, table in lookups.items()}
+        self._maps = {}
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def columns(self):
+        return list(self.dtypes)
+
+    def _map(self, file_name, dtype):
+        if file_name not in self._maps:
+            path = os.path.join(self.path, "columns", file_name)
+            # np.memmap cannot map an empty file
+            self._maps[file_name] = (np.memmap(path, dtype=dtype, mode="r", shape=(self.rows,))
+                                     if self.rows else np.zeros(0, dtype=dtype))
+        return self._maps[file_name]
+
+    def column(self, name):
+        """Memory-mapped values of a column (and its missing mask, or None)."""
+        dtype = self.dtypes[name]
+        values = self._map(f"{name}.bin", _numpy_dtype(dtype))
+        mask = self._map(f"{name}.mask.bin", np.bool_) if _is_nullable(dtype) else None
+        return values, mask
+
+    def select(self, competition_id=None, season_id=None, match_ids=None):
+        """Partition rows of a selection (the partition index only)."""
+        parts = self.partitions
+        if competition_id is not None:
+            parts = parts[parts["competition_id"] == competition_id]
+        if season_id is not None:
+            parts = parts[parts["season_id"] == season_id]
+        if match_ids is not None:
+            parts = parts[parts["match_id"].isin(match_ids)]
+        return parts
+
+    def _row_slices(self, parts):
+        """Merge adjacent partitions into as few (start, stop) slices as possible."""
+        slices = []
+        for start, stop in zip(parts["start"], parts["stop"]):
+            if slices and slices[-1][1] == start:
+                slices[-1] = (slices[-1][0], stop)
+            else:
+                slices.append((start, stop))
+        return slices
+
+    def read(self, columns=None, competition_id=None, season_id=None, match_ids=None):
+        """Events of a selection as a DataFrame with the compact dtypes.
+
+        Only the requested columns are mapped and only the selected row ranges
+        are copied out of the maps.
+        """
+        columns = self.columns if columns is None else list(columns)
+        slices = self._row_slices(self.select(competition_id, season_id, match_ids))
+
+        data = {}
+        for name in columns:
+            values, mask = self.column(name)
+            values = np.concatenate([values[a:b] for a, b in slices]) if slices else values[:0]
+            if mask is None:
+                data[name] = values
+            else:
+                mask = np.concatenate([mask[a:b] for a, b in slices]) if slices else mask[:0]
+                data[name] = pd.arrays.IntegerArray(np.asarray(values), np.asarray(mask))
+        return pd.DataFrame(data, columns=columns)
+
+    def compact(self, columns=None, **selection):
+        """A selection as ``CompactEvents`` (events plus the archive's lookups)."""
+        return CompactEvents(self.read(columns, **selection), dict(self.lookups))
+
+
+# ---------------------------
+# Writing
+# ---------------------------
+def append_compact(path, compact, competition_id, season_id):
+    """Append one season's compact events to the archive at ``path`` (created if needed).
+
+    Column files are appended first; the partition index and the manifest are
+    written last, so an interrupted append leaves the previous archive intact
+    (trailing bytes beyond the manifest row count are truncated next time).
+    """
+    os.makedirs(os.path.join(path, "columns"), exist_ok=True)
+    manifest = read_json(os.path.join(path, "manifest.json")) or {
+        "schema": ARCHIVE_SCHEMA, "rows": 0,
+        "columns": {name: COMPACT_DTYPES[name] for name in compact.events.columns},
+    }
+    rows = manifest["rows"]
+    partitions_path = os.path.join(path, "partitions.parquet")
+    partitions = (pd.read_parquet(partitions_path) if os.path.exists(partitions_path)
+                  else pd.DataFrame(columns=PARTITION_COLUMNS))
+
+    # Rows of one match must be contiguous
+    events = compact.events.sort_values("match_id", kind="stable").reset_index(drop=True)
+    missing = set(manifest["columns"]) - set(events.columns)
+    if missing:
+        raise ValueError(f"archive columns missing from the new events: {sorted(missing)}")
+
+    for name, dtype in manifest["columns"].items():
+        series = events[name]
+        files = [(f"{name}.bin", _numpy_dtype(dtype))]
+        if _is_nullable(dtype):
+            files.append((f"{name}.mask.bin", np.dtype(np.bool_)))
+        for file_name, storage in files:
+            file_path = os.path.join(path, "columns", file_name)
+            with open(file_path, "ab") as f:
+                f.truncate(rows * storage.itemsize)
+                if file_name.endswith(".mask.bin"):
+                    array = series.isna().to_numpy()
+                elif _is_nullable(dtype):
+                    array = series.to_numpy(dtype=storage, na_value=0)
+                else:
+                    array = series.to_numpy(dtype=storage)
+                f.write(np.ascontiguousarray(array, dtype=storage).tobytes())
+
+    match_ids = events["match_id"].to_numpy()
+    starts = np.flatnonzero(np.r_[True, match_ids[1:] != match_ids[:-1]]) if len(events) else \
+        np.zeros(0, dtype=np.int64)
+    stops = np.r_[starts[1:], len(events)]
+    new_parts = pd.DataFrame({
+        "competition_id": competition_id, "season_id": season_id,
+        "match_id": match_ids[starts], "start": starts + rows, "stop": stops + rows,
+    }, columns=PARTITION_COLUMNS)
+    partitions = pd.concat([partitions, new_parts], ignore_index=True).astype("int64")
+
+    lookups = read_json(os.path.join(path, "lookups.json")) or {}
+    for name, table in compact.lookups.items():
+        merged = lookups.setdefault(name, {})
+        merged.update({str(key): value for key, value in table.items()
+                       if str(key) not in merged})
+
+    atomic_write_parquet(partitions, partitions_path)
+    atomic_write_json(os.path.join(path, "lookups.json"), lookups)
+    manifest["rows"] = rows + len(events)
+    atomic_write_json(os.path.join(path, "manifest.json"), manifest)
+    return new_parts
+
+
+def build_archive(path, seasons, parser=None, columns=None, **loader_kwargs):
+    """Archive every match of ``seasons`` [(competition_id, season_id), ...].
+
+    Matches already in the partition index are skipped, so re-running with
+    more seasons (or after a matchday) only loads the new matches. ``columns``
+    picks the compact columns of a new archive; an existing archive keeps its
+    own. Returns the partition rows that were added.
+    """
+    parser = CachedSbopen() if parser is None else parser
+    manifest = read_json(os.path.join(path, "manifest.json"))
+    if manifest is not None:
+        columns = list(manifest["columns"])
+    elif columns is not None and "match_id" not in columns:
+        columns = ["match_id"] + list(columns)  # needed for the partition index
+    done = set(EventArchive(path).partitions["match_id"]) if manifest is not None else set()
+
+    added = []
+    for competition_id, season_id in seasons:
+        matches = parser.match(competition_id, season_id)
+        match_ids = [m_id for m_id in matches["match_id"] if m_id not in done]
+        if not match_ids:
+            continue
+        compact = load_compact(match_ids, parser=parser, columns=columns or COMPACT_COLUMNS,
+                               **loader_kwargs)
+        added.append(append_compact(path, compact, competition_id, season_id))
+    return pd.concat(added, ignore_index=True) if added else pd.DataFrame(columns=PARTITION_COLUMNS)
+
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description="Build or extend the memory-mapped event archive.")
+    cli.add_argument("--season", nargs=2, type=int, action="append", required=True,
+                     metavar=("COMPETITION_ID", "SEASON_ID"))
+    cli.add_argument("--out", default=DEFAULT_ARCHIVE_DIR, help="archive directory")
+    cli.add_argument("--columns", nargs="+", default=None, choices=COMPACT_COLUMNS)
+    cli.add_argument("--data-dir", default=None,
+                     help="local StatsBomb open-data checkout (default: download)")
+    args = cli.parse_args()
+
+    added = build_archive(args.out, args.season, CachedSbopen(data_dir=args.data_dir), args.columns)
+    archive = EventArchive(args.out)
+    print(f"Added {len(added)} matches; archive holds {len(archive.partitions)} matches, "
+          f"{len(archive)} events in {os.path.abspath(args.out)}")
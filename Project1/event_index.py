@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Tournament event store with a (player, event type, match) offset index.
+
+Scripts used to answer "passes of player X" with boolean masks such as
+``df[(df['player_id'] == pid) & (df['type_name'] == 'Pass')]``; inside a loop
+over players every lookup scans the whole frame again. ``EventIndex`` sorts the
+events once by (player_id, type_name, match_id) and keeps the start / stop row
+of every key, so
+
+    index = EventIndex(load_events(match_ids))
+    passes = index.events(5204, "Pass")                     # slice, no scan
+    passes = index.events(5204, "Pass", match_ids=[3942349])
+
+return row slices of the sorted frame. A selection that is one contiguous
+block (a player, a player and event type, or a player / type / single match)
+is an ``iloc`` slice and shares memory with the store; several blocks (e.g.
+a subset of matches) are gathered with one ``take``.
+"""
+
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from match_loader import load_matches
+
+INDEX_KEYS = ["player_id", "type_name", "match_id"]
+OFFSET_COLUMNS = INDEX_KEYS + ["start", "stop"]
+
+
+# ---------------------------
+# Loading
+# ---------------------------
+def _project(columns, match_id, df, related, freeze, tactics):
+    df = df if columns is None else df.reindex(columns=columns)
+    return df.assign(match_id=match_id)
+
+
+def load_events(match_ids, parser=None, columns=None, **loader_kwargs):
+    """Events of many matches in one frame, with a ``match_id`` column.
+
+    ``columns`` keeps only the listed event columns (``match_id`` is always
+    added); other keyword arguments go to ``load_matches``.
+    """
+    results, _ = load_matches(match_ids, partial(_project, columns), parser=parser,
+                              **loader_kwargs)
+    if not results:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(results, ignore_index=True)
+
+
+def _block_bounds(*keys):
+    """Start / stop of each run of equal consecutive keys."""
+    n = len(keys[0])
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    change = np.zeros(n - 1, dtype=bool)
+    for key in keys:
+        change |= key[1:] != key[:-1]
+    starts = np.flatnonzero(np.r_[True, change])
+    return starts, np.r_[starts[1:], n]
+
+
+# ---------------------------
+# Index
+# ---------------------------
+class EventIndex:
+    """Events sorted by (player_id, type_name, match_id) plus an offset table.
+
+    Parameters
+    ----------
+    events : pandas.DataFrame
+        Needs ``player_id``, ``type_name`` and ``match_id``; rows without a
+        player (e.g. Half Start) are not indexed. Within a key the original
+        row order is kept.
+
+    Attributes
+    ----------
+    frame : pandas.DataFrame
+        The sorted store (``RangeIndex``).
+    offsets : pandas.DataFrame
+        One row per (player_id, type_name, match_id) with its ``start`` /
+        ``stop`` row in ``frame``, in the same order.
+    """
+
+    def __init__(self, events):
+        events = events[events["player_id"].notna()]
+        player = events["player_id"].to_numpy(dtype=np.int64)
+        type_code, type_names = pd.factorize(events["type_name"], sort=True)
+        match = events["match_id"].to_numpy(dtype=np.int64)
+
+        # lexsort is stable and sorts by the last key first
+        order = np.lexsort((match, type_code, player))
+        self.frame = events.iloc[order].reset_index(drop=True)
+        player, type_code, match = player[order], type_code[order], match[order]
+
+        starts, stops = _block_bounds(player, type_code, match)
+        self.offsets = pd.DataFrame({
+            "player_id": player[starts],
+            "type_name": np.asarray(type_names, dtype=object)[type_code[starts]],
+            "match_id": match[starts],
+            "start": starts,
+            "stop": stops,
+        })[OFFSET_COLUMNS]
+
+        # Offset-table row ranges per player and per (player, type)
+        keys = (player[starts], type_code[starts])
+        row_starts, row_stops = _block_bounds(keys[0])
+        self._player_rows = dict(zip(keys[0][row_starts].tolist(),
+                                     zip(row_starts.tolist(), row_stops.tolist())))
+        row_starts, row_stops = _block_bounds(*keys)
+        self._pair_rows = dict(zip(
+            zip(keys[0][row_starts].tolist(),
+                np.asarray(type_names, dtype=object)[keys[1][row_starts]].tolist()),
+            zip(row_starts.tolist(), row_stops.tolist())))
+
+    @classmethod
+    def from_matches(cls, match_ids, parser=None, columns=None, **loader_kwargs):
+        """Build the store straight from ``load_events``."""
+        return cls(load_events(match_ids, parser=parser, columns=columns, **loader_kwargs))
+
+    def __len__(self):
+        return len(self.frame)
+
+    # ---------------------------
+    # Lookups
+    # ---------------------------
+    def blocks(self, player_id, type_name=None, match_ids=None):
+        """Offset rows for a selection (no event rows are touched)."""
+        if type_name is None:
+            rows = self._player_rows.get(int(player_id))
+        else:
+            rows = self._pair_rows.get((int(player_id), type_name))
+        if rows is None:
+            return self.offsets.iloc[0:0]
+        blocks = self.offsets.iloc[rows[0]:rows[1]]
+        if match_ids is not None:
+            blocks = blocks[blocks["match_id"].isin(match_ids)]
+        return blocks
+
+    def events_for(self, blocks):
+        """Event rows of offset rows: a slice when they are contiguous, else one take."""
+        if blocks.empty:
+            return self.frame.iloc[0:0]
+        starts, stops = blocks["start"].to_numpy(), blocks["stop"].to_numpy()
+        if (starts[1:] == stops[:-1]).all():
+            return self.frame.iloc[starts[0]:stops[-1]]
+        rows = np.concatenate([np.arange(a, b) for a, b in zip(starts, stops)])
+        return self.frame.take(rows)
+
+    def events(self, player_id, type_name=None, match_ids=None):
+        """Events of a player, optionally of one type and / or in some matches."""
+        return self.events_for(self.blocks(player_id, type_name, match_ids))
+
+    def count(self, player_id, type_name=None, match_ids=None):
+        """Number of matching events, from the offsets alone."""
+        blocks = self.blocks(player_id, type_name, match_ids)
+        return int((blocks["stop"] - blocks["start"]).sum())
+
+    def players(self, type_name=None):
+        """Indexed player ids (with at least one event of ``type_name`` if given)."""
+        if type_name is None:
+            return list(self._player_rows)
+        return [pid for pid, name in self._pair_rows if name == type_name]
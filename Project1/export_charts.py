@@ -0,0 +1,374 @@
+# -*- coding: utf-8 -*-
+"""
+Headless bulk export of the report charts.
+
+The report images used to come from interactive ``plt.show()`` runs that were
+saved by hand and then stitched together by ``JoinTheBarGraphs.py``. This
+module renders every chart for any player / match set on the Agg backend:
+
+    PassesPitchMap        all passes of the player, coloured by match
+    FinalZonePitchMap     3x2 zone counts and average pass directions per match
+    PassesPer90           peer bar charts from the summary CSV
+    ShotAssistsPer90
+    GoalAssistsPer90
+    Combined_BarGraphs    the three bar charts side by side, composed in memory
+
+Charts are rendered on a process pool and written as PNG and/or SVG. The
+input data of every chart is hashed; ``export_manifest.json`` in the output
+directory remembers the hash each file was rendered from, so charts whose
+inputs did not change are skipped on the next run.
+
+    python export_charts.py --player-id 5204 --matches 3942349 3941020 --formats png svg
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+import traceback
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.lines as mlines
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from dashboard_bundle import (BASE_DIR, BRUNO_ID, COMPETITION_ID, DEBRUYNE_ID,
+                              DEFAULT_SUMMARY_CSV, FOCUS_MATCH_IDS, SEASON_ID, player_passes)
+from match_loader import load_matches, print_report
+from panels import compose_panel
+from pitch_render import PitchCanvas
+from sbcache import CachedSbopen, atomic_write_json, read_json
+from zones import zone_aggregate
+
+# ---------------------------
+# Constants
+# ---------------------------
+EXPORT_VERSION = 1  # bump when a renderer changes so every chart is redrawn
+DEFAULT_EXPORT_DIR = os.path.join(BASE_DIR, "exports")
+MANIFEST_NAME = "export_manifest.json"
+FORMATS = ("png", "svg")
+RASTER_FORMATS = ("png",)
+
+BAR_METRICS = {
+    "PassesPer90": ("passes_per90", "Passes Per90"),
+    "ShotAssistsPer90": ("shot_assists_per90", "Shot Assists Per90"),
+    "GoalAssistsPer90": ("goal_assists_per90", "Goal Assists Per90"),
+}
+CHART_NAMES = ["PassesPitchMap", "FinalZonePitchMap", *BAR_METRICS, "Combined_BarGraphs"]
+
+PASS_MAP_COLORS = ["blue", "lime", "magenta", "darkorange", "cyan", "saddlebrown", "olive", "navy"]
+ZONE_MAP_COLORS = ["darkgreen", "darkred", "darkblue", "purple", "darkorange", "teal",
+                   "saddlebrown", "black"]
+PEER_COLOR = "blue"
+
+ChartJob = namedtuple("ChartJob", ["name", "renderer", "inputs", "formats"])
+ChartJob.__doc__ = """One chart to export: ``renderer(**inputs)`` written once per format."""
+
+
+# ---------------------------
+# Renderers (module level so the process pool can pickle them)
+# ---------------------------
+def render_pass_map(passes, match_names, title):
+    """Every pass coloured by match, shot assists in red and goal assists in yellow.
+
+    The assist layers read the resolved ``shot_assist`` / ``goal_assist``
+    columns of ``dashboard_bundle.player_passes``.
+    """
+    canvas = PitchCanvas(figsize=(14.6, 10.4))
+    for i, (m_id, name) in enumerate(match_names.items()):
+        match_passes = passes[passes["match_id"] == m_id]
+        canvas.arrows(f"match_{m_id}", match_passes["x"], match_passes["y"],
+                      match_passes["end_x"], match_passes["end_y"],
+                      color=PASS_MAP_COLORS[i % len(PASS_MAP_COLORS)], width=1.5,
+                      headwidth=5, headlength=5, label=f"{name} — Passes: {len(match_passes)}")
+
+    for column, layer, color, width in (("shot_assist", "Shot Assists", "red", 3),
+                                        ("goal_assist", "Goal Assists", "yellow", 3)):
+        flagged = passes[passes[column].eq(True)]
+        canvas.arrows(layer, flagged["x"], flagged["y"], flagged["end_x"], flagged["end_y"],
+                      color=color, width=width, headwidth=5, headlength=5,
+                      label=f"{layer}: {len(flagged)}")
+
+    canvas.legend(loc="lower left", fontsize=9)
+    canvas.title(title, fontsize=16)
+    return canvas.fig
+
+
+def render_zone_map(passes, match_names, title, nx=3, ny=2):
+    """Zone counts and average pass directions per match (the Bruno'sPass.py map)."""
+    grid, table = zone_aggregate(passes, nx=nx, ny=ny, by=["match_id"])
+    canvas = PitchCanvas(figsize=(14, 10), x_edges=grid.x_edges, y_edges=grid.y_edges)
+    colors = {m_id: ZONE_MAP_COLORS[i % len(ZONE_MAP_COLORS)]
+              for i, m_id in enumerate(match_names)}
+    order = {m_id: i for i, m_id in enumerate(match_names)}
+
+    table = table[table["match_id"].isin(list(order))]
+    table = table.assign(order=table["match_id"].map(order)).sort_values(["x_zone", "y_zone", "order"])
+    # Spread the labels of one zone over [-8, 8] like np.linspace(-8, 8, n)
+    zone = table.groupby(["x_zone", "y_zone"])
+    n = zone["match_id"].transform("size").to_numpy()
+    offsets = -8 + 16 * zone.cumcount().to_numpy() / np.maximum(n - 1, 1)
+    xz, yz = table["x_zone"].to_numpy(), table["y_zone"].to_numpy()
+    xc = (grid.x_edges[xz] + grid.x_edges[xz + 1]) / 2
+    yc = (grid.y_edges[yz] + grid.y_edges[yz + 1]) / 2
+
+    match_colors = table["match_id"].map(colors).tolist()
+    canvas.labels(xc + offsets, yc, table["count"], match_colors, fontsize=12, fontweight="bold")
+    canvas.arrows("zones", table["start_x"], table["start_y"],
+                  table["start_x"] + table["dx"], table["start_y"] + table["dy"],
+                  color=match_colors, width=2, headwidth=5, headlength=5)
+
+    handles = [mlines.Line2D([], [], color=colors[m_id], marker="o", linestyle="None",
+                             markersize=8, label=name)
+               for m_id, name in match_names.items()]
+    canvas.legend(handles, loc="upper center", bbox_to_anchor=(0.5, -0.05), ncol=2, fontsize=12)
+    canvas.title(title, fontsize=16)
+    return canvas.fig
+
+
+def render_bar(summary, metric, label, highlights):
+    """Horizontal peer bar chart, largest value on top, highlighted players coloured."""
+    data = summary.sort_values(metric, kind="stable")
+    fig, ax = plt.subplots(figsize=(12.44, max(6, len(data) * 0.25)))
+    rows = np.arange(len(data))
+    ax.barh(rows, data[metric], height=0.4,
+            color=data["player_id"].map(highlights).fillna(PEER_COLOR).tolist())
+    ax.set_yticks(rows, data["player_name"], fontweight="bold")
+    ax.set_xlabel(label)
+    ax.set_ylabel("Players")
+    ax.spines[["top", "right"]].set_visible(False)
+    fig.tight_layout()
+    return fig
+
+
+def render_combined(summary, metrics, highlights):
+    """The bar charts of ``metrics`` side by side as one image, without temporary files."""
+    images = []
+    for metric, label in metrics:
+        fig = render_bar(summary, metric, label, highlights)
+        images.append(figure_image(fig))
+        plt.close(fig)
+    return compose_panel(images)
+
+
+RENDERERS = {
+    "pass_map": render_pass_map,
+    "zone_map": render_zone_map,
+    "bar": render_bar,
+    "combined": render_combined,
+}
+
+
+# ---------------------------
+# Images
+# ---------------------------
+def figure_image(fig):
+    """Render a figure with its canvas and return it as an RGB PIL image."""
+    fig.canvas.draw()
+    return Image.fromarray(np.asarray(fig.canvas.buffer_rgba())).convert("RGB")
+
+
+def _save(output, path):
+    if isinstance(output, Image.Image):
+        output.save(path)
+    else:
+        output.savefig(path, facecolor="white")
+
+
+# ---------------------------
+# Jobs
+# ---------------------------
+def input_hash(job):
+    """SHA-256 over the renderer, its inputs and ``EXPORT_VERSION``."""
+    digest = hashlib.sha256(f"{EXPORT_VERSION}|{job.renderer}".encode())
+    for key in sorted(job.inputs):
+        value = job.inputs[key]
+        digest.update(key.encode())
+        if isinstance(value, pd.DataFrame):
+            digest.update(",".join(map(str, value.columns)).encode())
+            digest.update(pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes())
+        else:
+            digest.update(json.dumps(value, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def output_paths(job, out_dir):
+    return [os.path.join(out_dir, f"{job.name}.{fmt}") for fmt in job.formats]
+
+
+def build_jobs(passes, summary, match_names, player_id, player_name,
+               charts=None, formats=("png",)):
+    """One ``ChartJob`` per requested chart; inputs are trimmed to what each chart reads."""
+    charts = CHART_NAMES if charts is None else charts
+    highlights = {DEBRUYNE_ID: "orange", player_id: "red"}
+    raster = [fmt for fmt in formats if fmt in RASTER_FORMATS] or ["png"]
+
+    jobs = []
+    for name in charts:
+        if name == "PassesPitchMap":
+            jobs.append(ChartJob(name, "pass_map", {
+                "passes": passes[["match_id", "x", "y", "end_x", "end_y",
+                                  "shot_assist", "goal_assist"]],
+                "match_names": match_names,
+                "title": f"{player_name}: Pass Map (attacking left to right)",
+            }, list(formats)))
+        elif name == "FinalZonePitchMap":
+            jobs.append(ChartJob(name, "zone_map", {
+                "passes": passes[["match_id", "x", "y", "end_x", "end_y"]],
+                "match_names": match_names,
+                "title": f"{player_name} – Merged pass Pitch Map\n"
+                         f"Counts and Average Pass Directions per Zone",
+            }, list(formats)))
+        elif name in BAR_METRICS:
+            metric, label = BAR_METRICS[name]
+            jobs.append(ChartJob(name, "bar", {
+                "summary": summary[["player_id", "player_name", metric]],
+                "metric": metric,
+                "label": label,
+                "highlights": highlights,
+            }, list(formats)))
+        elif name == "Combined_BarGraphs":
+            metrics = [list(value) for value in BAR_METRICS.values()]
+            jobs.append(ChartJob(name, "combined", {
+                "summary": summary[["player_id", "player_name"] + [m for m, _ in metrics]],
+                "metrics": metrics,
+                "highlights": highlights,
+            }, raster))  # composed raster image, so PNG only
+        else:
+            raise ValueError(f"unknown chart {name!r}, expected one of {CHART_NAMES}")
+    return jobs
+
+
+def _export_one(job, out_dir):
+    """Render and write one chart; never raises so one bad chart cannot sink the pool."""
+    start = time.perf_counter()
+    try:
+        output = RENDERERS[job.renderer](**job.inputs)
+        paths = output_paths(job, out_dir)
+        for path in paths:
+            _save(output, path)
+        if not isinstance(output, Image.Image):
+            plt.close(output)
+        return job.name, paths, time.perf_counter() - start, None
+    except Exception:
+        return job.name, [], time.perf_counter() - start, traceback.format_exc()
+
+
+def export_charts(jobs, out_dir, max_workers=None, force=False):
+    """Render every job whose input hash changed (or whose files are missing).
+
+    Parameters
+    ----------
+    jobs : list of ChartJob
+    out_dir : str
+    max_workers : int, optional
+        Process pool size; ``1`` renders in the calling process.
+    force : bool
+        Ignore the manifest and render everything.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Per-chart ``status`` (written / skipped / failed), ``seconds``, ``paths``
+        and ``error``.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    manifest = read_json(manifest_path) or {}
+
+    hashes = {job.name: input_hash(job) for job in jobs}
+    todo, rows = [], []
+    for job in jobs:
+        fresh = (manifest.get(job.name) == hashes[job.name]
+                 and all(os.path.exists(path) for path in output_paths(job, out_dir)))
+        if fresh and not force:
+            rows.append((job.name, "skipped", 0.0, output_paths(job, out_dir), None))
+        else:
+            todo.append(job)
+
+    if max_workers == 1 or len(todo) <= 1:
+        outcomes = [_export_one(job, out_dir) for job in todo]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(_export_one, job, out_dir) for job in todo]
+            outcomes = [future.result() for future in futures]
+
+    for name, paths, seconds, error in outcomes:
+        rows.append((name, "written" if error is None else "failed", seconds, paths, error))
+        if error is None:
+            manifest[name] = hashes[name]
+        else:
+            manifest.pop(name, None)
+    atomic_write_json(manifest_path, manifest)
+
+    order = {job.name: i for i, job in enumerate(jobs)}
+    report = pd.DataFrame(rows, columns=["chart", "status", "seconds", "paths", "error"])
+    return report.sort_values("chart", key=lambda names: names.map(order)).reset_index(drop=True)
+
+
+# ---------------------------
+# Inputs
+# ---------------------------
+def load_inputs(parser, player_id, match_ids, summary_csv=DEFAULT_SUMMARY_CSV,
+                competition_id=COMPETITION_ID, season_id=SEASON_ID):
+    """Passes of the player, match names and the peer summary table."""
+    matches = parser.match(competition_id, season_id).set_index("match_id")
+    match_names = {int(m_id): f"{matches.at[m_id, 'home_team_name']} vs "
+                              f"{matches.at[m_id, 'away_team_name']}"
+                   for m_id in match_ids}
+
+    def reduce(match_id, df, related, freeze, tactics):
+        return player_passes(df, [player_id]).assign(match_id=match_id)
+
+    results, report = load_matches(match_ids, reduce, parser=parser)
+    print_report(report)
+    passes = pd.concat(results, ignore_index=True)
+    summary = pd.read_csv(summary_csv)
+    return passes, match_names, summary
+
+
+def print_export_report(report):
+    counts = report["status"].value_counts()
+    print(f"{counts.get('written', 0)} charts written, {counts.get('skipped', 0)} unchanged, "
+          f"{counts.get('failed', 0)} failed in {report['seconds'].sum():.2f}s of work")
+    for _, row in report.iterrows():
+        if row["status"] == "failed":
+            print(f"  {row['chart']} failed: {row['error'].strip().splitlines()[-1]}")
+        else:
+            print(f"  {row['chart']}: {row['status']} {', '.join(row['paths'])}")
+
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description="Export the report charts without a display.")
+    cli.add_argument("--player-id", type=int, default=BRUNO_ID)
+    cli.add_argument("--player-name", default=None, help="title name (default: from events)")
+    cli.add_argument("--matches", type=int, nargs="+", default=FOCUS_MATCH_IDS)
+    cli.add_argument("--competition-id", type=int, default=COMPETITION_ID)
+    cli.add_argument("--season-id", type=int, default=SEASON_ID)
+    cli.add_argument("--summary-csv", default=DEFAULT_SUMMARY_CSV)
+    cli.add_argument("--charts", nargs="+", choices=CHART_NAMES, default=CHART_NAMES)
+    cli.add_argument("--formats", nargs="+", choices=FORMATS, default=["png"])
+    cli.add_argument("--out", default=None, help="output directory (default: exports/<player id>)")
+    cli.add_argument("--workers", type=int, default=None, help="process pool size")
+    cli.add_argument("--force", action="store_true", help="re-render unchanged charts")
+    cli.add_argument("--data-dir", default=None,
+                     help="local StatsBomb open-data checkout (default: download)")
+    args = cli.parse_args()
+
+    passes, match_names, summary = load_inputs(
+        CachedSbopen(data_dir=args.data_dir), args.player_id, args.matches,
+        args.summary_csv, args.competition_id, args.season_id)
+    player_name = args.player_name or (passes["player_name"].dropna().iloc[0]
+                                       if passes["player_name"].notna().any()
+                                       else str(args.player_id))
+    out_dir = args.out or os.path.join(DEFAULT_EXPORT_DIR, str(args.player_id))
+
+    jobs = build_jobs(passes, summary, match_names, args.player_id, player_name,
+                      charts=args.charts, formats=args.formats)
+    print_export_report(export_charts(jobs, out_dir, max_workers=args.workers, force=args.force))
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in timing, counters and profiling for the data-access and aggregation code.
+
+Stages are wrapped in ``timer`` (a context manager and a decorator) and report
+volumes with ``count``:
+
+    @timer("minutes.compute_minutes_played")
+    def compute_minutes_played(events, tactics): ...
+
+    with timer("sbcache.parse", match_id=match_id):
+        frames = flatten_event(...)
+    count("rows.events", len(frames[0]))
+    count("cache.misses")
+
+Nothing is recorded until tracing is enabled, and a disabled ``timer`` only
+checks one flag. Enable it from code (``enable()`` ... ``write_trace(path)``)
+or for a whole script run with environment variables:
+
+    PROJECT1_TRACE=trace.json      write the JSON trace when the process exits
+    PROJECT1_PROFILE=run.prof      also run cProfile and dump its stats there
+
+The trace holds every span (name, start, seconds, thread, depth, parent,
+fields and the counters incremented inside it), the counter totals and a
+per-name summary. ``.prof`` dumps open in ``snakeviz`` / ``flameprof`` as a
+flame graph (cProfile only sees the thread that enabled it, so the worker
+threads show up as waits). There is one trace per process: spans from ``load_matches``
+worker threads are collected, spans in process-pool workers are not.
+
+``recording()`` scopes a trace to a block instead of the process, e.g. one
+Streamlit page run: inside it (and in ``load_matches`` worker threads started
+from it) spans and counters go to the block's trace, everywhere else to the
+process trace, and the previous state is restored when the block exits:
+
+    with recording() as trace:
+        build_page()
+    trace.summary()
+"""
+
+import atexit
+import cProfile
+import contextvars
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+import pandas as pd
+
+TRACE_ENV = "PROJECT1_TRACE"
+PROFILE_ENV = "PROJECT1_PROFILE"
+SUMMARY_COLUMNS = ["name", "calls", "total_seconds", "mean_seconds", "max_seconds"]
+
+
+class Trace:
+    """Spans and counters recorded while tracing is enabled."""
+
+    def __init__(self):
+        self.started = datetime.datetime.now().isoformat(timespec="seconds")
+        self.origin = time.perf_counter()
+        self.spans = []
+        self.counters = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def add_span(self, record):
+        with self._lock:
+            self.spans.append(record)
+
+    def add_count(self, name, value):
+        with self._lock:
+            self.counters[name] += value
+
+    def summary(self):
+        """Calls and seconds per span name, slowest total first."""
+        if not self.spans:
+            return pd.DataFrame(columns=SUMMARY_COLUMNS)
+        spans = pd.DataFrame(self.spans)
+        grouped = spans.groupby("name")["seconds"]
+        table = pd.DataFrame({"calls": grouped.size(), "total_seconds": grouped.sum(),
+                              "mean_seconds": grouped.mean(), "max_seconds": grouped.max()})
+        table = table.reset_index().sort_values("total_seconds", ascending=False)
+        return table[SUMMARY_COLUMNS].round(6).reset_index(drop=True)
+
+    def to_dict(self):
+        with self._lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+        return {
+            "started": self.started,
+            "wall_seconds": round(time.perf_counter() - self.origin, 6),
+            "counters": {name: int(v) if float(v).is_integer() else v
+                         for name, v in sorted(counters.items())},
+            "summary": self.summary().to_dict(orient="records"),
+            "spans": spans,
+        }
+
+
+_state = threading.local()
+_trace = None
+_scoped = contextvars.ContextVar("project1_trace", default=None)
+
+
+def _active():
+    # A ``recording`` block overrides the process-wide trace
+    scoped = _scoped.get()
+    return _trace if scoped is None else scoped
+
+
+def enabled():
+    return _active() is not None
+
+
+def enable(trace=None):
+    """Start recording into ``trace`` (a new ``Trace`` by default) and return it."""
+    global _trace
+    _trace = Trace() if trace is None else trace
+    return _trace
+
+
+def disable():
+    """Stop recording and return the trace that was being recorded (or None)."""
+    global _trace
+    trace, _trace = _trace, None
+    return trace
+
+
+def current_trace():
+    return _active()
+
+
+class recording:
+    """Record into ``trace`` (a new ``Trace`` by default) for the current context only.
+
+    Unlike ``enable``, other threads and sessions are not affected; the trace
+    is returned by ``__enter__``.
+    """
+
+    def __init__(self, trace=None):
+        self.trace = Trace() if trace is None else trace
+        self._token = None
+
+    def __enter__(self):
+        self._token = _scoped.set(self.trace)
+        return self.trace
+
+    def __exit__(self, *exc):
+        _scoped.reset(self._token)
+        return False
+
+
+def in_current_context(func):
+    """``func`` bound to a copy of the caller's context, for running it in a worker thread."""
+    return functools.partial(contextvars.copy_context().run, func)
+
+
+def _stack():
+    stack = getattr(_state, "stack", None)
+    if stack is None:
+        stack = _state.stack = []
+    return stack
+
+
+# ---------------------------
+# Timers and counters
+# ---------------------------
+class timer:
+    """Time a block (``with timer(name):``) or every call of a function (``@timer(name)``).
+
+    Keyword arguments are stored with the span, e.g. ``match_id``. Spans
+    nest per thread; the record keeps the depth and the parent span's name.
+    """
+
+    def __init__(self, name, **fields):
+        self.name = name
+        self.fields = fields
+        self._trace = None
+
+    def __enter__(self):
+        self._trace = _active()
+        if self._trace is not None:
+            stack = _stack()
+            self._parent = stack[-1].name if stack else None
+            self._depth = len(stack)
+            self._counters = {}
+            stack.append(self)
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self._trace is None:
+            return False
+        end = time.perf_counter()
+        _stack().pop()
+        record = {"name": self.name, "start": round(self._start - self._trace.origin, 6),
+                  "seconds": round(end - self._start, 6), "thread": threading.current_thread().name,
+                  "depth": self._depth, "parent": self._parent}
+        if exc[0] is not None:
+            record["error"] = exc[0].__name__
+        if self.fields:
+            record["fields"] = self.fields
+        if self._counters:
+            record["counters"] = self._counters
+        self._trace.add_span(record)
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active() is None:
+                return func(*args, **kwargs)
+            with timer(self.name, **self.fields):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def count(name, value=1):
+    """Add ``value`` to a counter (and to the innermost open span of this thread)."""
+    trace = _active()
+    if trace is None:
+        return
+    trace.add_count(name, value)
+    stack = _stack()
+    if stack:
+        counters = stack[-1]._counters
+        counters[name] = counters.get(name, 0) + value
+
+
+# ---------------------------
+# Output
+# ---------------------------
+def write_trace(path, trace=None):
+    """Write ``trace`` (default: the current one) as JSON and return the path."""
+    trace = _active() if trace is None else trace
+    if trace is None:
+        raise RuntimeError("tracing is not enabled")
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(trace.to_dict(), f, indent=1, default=str)
+    os.replace(tmp, path)
+    return path
+
+
+class profiled:
+    """Run a block under ``cProfile`` and dump the stats to ``path`` (a no-op for None)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._profile = None
+
+    def __enter__(self):
+        if self.path:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self.path)
+        return False
+
+
+def _from_environment():
+    """Honour ``PROJECT1_TRACE`` / ``PROJECT1_PROFILE`` for the whole process."""
+    trace_path, profile_path = os.environ.get(TRACE_ENV), os.environ.get(PROFILE_ENV)
+    if not trace_path and not profile_path:
+        return
+    trace = enable()
+    profile = profiled(profile_path).__enter__()
+
+    def finish():
+        profile.__exit__(None, None, None)
+        if trace_path:
+            write_trace(trace_path, trace)
+
+    atexit.register(finish)
+
+
+_from_environment()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Per-match lineup / appearance table.
+
+``AllMidfielders.py`` used to guess the team of every tactics row with
+``len(tactics) // 2`` and walk the frame with ``iterrows``. The tactics frame
+holds the lineups of *every* Starting XI and Tactical Shift event of a match,
+so that split is wrong as soon as a team changes shape. Here the team comes
+from the lineup event itself (joined on the event ``id``), and one vectorized
+pass builds, per match and player:
+
+    team, home flag, position and jersey number on entry,
+    started / came on, entry and exit minute, minutes played
+
+Starters take their Starting XI position; substitutes take the position of
+the player they replaced (the ``position_id`` of the Substitution event),
+falling back to the position of their own first event. Minutes come from
+``minutes.compute_minutes_played``.
+
+The table is cached next to the events with ``CachedSbopen.derived``, so
+tournament-wide appearance counts are a groupby over a stored table.
+"""
+
+import pandas as pd
+
+from instrument import timer
+from match_loader import load_matches
+from minutes import STARTING_XI, SUBSTITUTION, compute_minutes_played, match_clock
+
+TACTICAL_SHIFT = "Tactical Shift"
+LINEUP_EVENTS = (STARTING_XI, TACTICAL_SHIFT)
+APPEARANCES_VERSION = 1  # bump when the table layout or rules change
+
+LINEUP_COLUMNS = ["id", "type_name", "team_id", "team_name", "minute", "player_id",
+                  "player_name", "position_id", "position_name", "jersey_number"]
+APPEARANCE_COLUMNS = ["match_id", "team_id", "team_name", "home", "player_id", "player_name",
+                      "position_id", "position_name", "jersey_number", "started",
+                      "entry_minute", "exit_minute", "minutes_played"]
+
+
+def lineup_entries(events, tactics, clock=None):
+    """Every lineup entry of the Starting XI and Tactical Shift events, in match order.
+
+    ``minute`` is the elapsed match clock (``minutes.match_clock``) of the
+    lineup event, not the published minute.
+    """
+    if clock is None:
+        clock, _ = match_clock(events)
+    lineup_events = events.loc[events["type_name"].isin(LINEUP_EVENTS),
+                               ["id", "type_name", "team_id", "team_name"]]
+    lineup_events = lineup_events.assign(minute=clock[lineup_events.index])
+    if tactics is None or "id" not in tactics.columns:
+        return pd.DataFrame(columns=LINEUP_COLUMNS)
+    entries = tactics.reindex(columns=["id", "player_id", "player_name", "position_id",
+                                       "position_name", "jersey_number"])
+    entries = entries.merge(lineup_events, on="id")
+    return entries.sort_values("minute", kind="stable")[LINEUP_COLUMNS].reset_index(drop=True)
+
+
+@timer("lineups.compute_appearances")
+def compute_appearances(events, tactics, home_team_id=None):
+    """One row per player who took part in the match, with ``APPEARANCE_COLUMNS``.
+
+    ``home_team_id`` defaults to the team of the first Starting XI event (the
+    home team in StatsBomb data).
+    """
+    minutes = compute_minutes_played(events, tactics)
+    entries = lineup_entries(events, tactics)
+
+    # Position on entry: Starting XI, else the replaced player's position, else own first event
+    starting = entries.loc[entries["type_name"] == STARTING_XI,
+                           ["player_id", "position_id", "position_name"]]
+    replaced = (events.loc[events["type_name"] == SUBSTITUTION]
+                .reindex(columns=["substitution_replacement_id", "position_id", "position_name"])
+                .rename(columns={"substitution_replacement_id": "player_id"}))
+    on_ball = events.loc[events["player_id"].notna() & events["position_id"].notna(),
+                         ["player_id", "position_id", "position_name"]]
+    positions = (pd.concat([starting, replaced.dropna(subset=["player_id", "position_id"]), on_ball])
+                 .drop_duplicates("player_id")
+                 .set_index("player_id"))
+    jerseys = entries.drop_duplicates("player_id").set_index("player_id")["jersey_number"]
+
+    if home_team_id is None:
+        xi_teams = events.loc[events["type_name"] == STARTING_XI, "team_id"]
+        home_team_id = xi_teams.iloc[0] if len(xi_teams) else None
+
+    appearances = minutes.assign(
+        home=minutes["team_id"] == home_team_id,
+        position_id=minutes["player_id"].map(positions["position_id"]).astype("Int64"),
+        position_name=minutes["player_id"].map(positions["position_name"]),
+        jersey_number=minutes["player_id"].map(jerseys).astype("Int64"),
+    )
+    return appearances[APPEARANCE_COLUMNS]
+
+
+def match_appearances(match_id, df, related, freeze, tactics):
+    """``load_matches`` / ``CachedSbopen.derived`` builder: the appearance table of one match."""
+    return compute_appearances(df, tactics)
+
+
+def cached_appearances(parser, match_id):
+    """Appearance table of one match, cached next to its events."""
+    return parser.derived(match_id, "appearances", match_appearances, version=APPEARANCES_VERSION)
+
+
+def tournament_appearances(match_ids, parser=None, home_team_ids=None, **loader_kwargs):
+    """Appearance tables of many matches in one frame (``match_ids`` order).
+
+    The cached tables are read through ``load_matches`` (other keyword
+    arguments go there). ``home_team_ids`` (match id -> home team id, e.g.
+    from the match listing) overrides the Starting XI rule for the ``home`` flag.
+    """
+    tables, _ = load_matches(match_ids, match_appearances, parser=parser,
+                             cache_as="appearances", version=APPEARANCES_VERSION,
+                             **loader_kwargs)
+    if not tables:
+        return pd.DataFrame(columns=APPEARANCE_COLUMNS)
+    appearances = pd.concat(tables, ignore_index=True)
+    if home_team_ids is not None:
+        home = appearances["match_id"].map(home_team_ids)
+        appearances["home"] = appearances["home"].where(home.isna(),
+                                                        appearances["team_id"] == home)
+    return appearances
+
+
+def appearance_counts(appearances, positions=None):
+    """Matches per (player, position on entry), most appearances first."""
+    if positions is not None:
+        appearances = appearances[appearances["position_id"].isin(positions)]
+    counts = (appearances.groupby(["player_id", "player_name", "position_id", "position_name"])
+              .size().reset_index(name="appearances"))
+    return counts.sort_values("appearances", ascending=False, kind="stable").reset_index(drop=True)
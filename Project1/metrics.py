@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+"""
+Declarative per-90 metrics engine.
+
+The summary scripts count passes, shot assists and goal assists with one
+hand-written expression each and turn them into per-90 rates one column at a
+time. Here a metric is a registry entry: a name, a description and a
+function of the match events returning one value per event (a boolean mask
+counts events, a float array sums e.g. xG):
+
+    @metric("passes_into_box", "completed passes ending in the penalty area")
+    def _passes_into_box(ev):
+        return ev.completed_pass & ev.end_in_box & ~ev.start_in_box
+
+Metric functions read shared per-event arrays from an ``EventFeatures``
+object (pass / carry masks, distances to goal, box entries, resolved assists, ...)
+which computes each of them once, on first use. ``evaluate`` stacks every
+requested metric into one (events x metrics) matrix and ``aggregate`` sums it
+with a single groupby, so adding a metric adds a column, not another scan over
+the events:
+
+    partials = load_metrics(match_ids)                 # per (match, player)
+    table = metric_summary(partials, min_minutes=360)  # totals and per 90
+    table = metric_summary(partials, by=["competition_id", "season_id", "player_id"])
+"""
+
+import argparse
+from collections import namedtuple
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from assists import resolve_assists
+from instrument import count, timer
+from match_loader import load_matches
+from minutes import compute_minutes_played
+from sbcache import CachedSbopen
+from summary_store import POSITION_GROUPS, per90
+
+GOAL_X, GOAL_Y = 120.0, 40.0  # centre of the attacked goal on the StatsBomb pitch
+FINAL_THIRD_X = 80.0
+BOX_X, BOX_Y = 102.0, (18.0, 62.0)
+PROGRESSIVE_SHARE = 0.25  # a progressive action ends 25% closer to goal
+PROGRESSIVE_MIN_X = 60.0  # ... and ends in the opponent half
+PARTIAL_KEYS = ["match_id", "player_id", "player_name", "team_name", "position_id",
+                "minutes_played"]
+
+Metric = namedtuple("Metric", ["name", "description", "value"])
+METRICS = {}
+
+
+def metric(name, description=""):
+    """Register ``value(features)`` (per-event values) as metric ``name``."""
+    def register(value):
+        METRICS[name] = Metric(name, description, value)
+        return value
+    return register
+
+
+def describe_metrics():
+    """The metric registry as a DataFrame."""
+    return pd.DataFrame([(m.name, m.description) for m in METRICS.values()],
+                        columns=["metric", "description"])
+
+
+# ---------------------------
+# Shared per-event features
+# ---------------------------
+class EventFeatures:
+    """Per-event arrays shared by all metrics, each computed on first use.
+
+    Parameters
+    ----------
+    events : pandas.DataFrame
+        Flattened events (``parser.event(match_id)[0]``), one or many matches.
+        Missing optional columns (e.g. no shots in a match) read as empty.
+    """
+
+    def __init__(self, events):
+        self.events = events
+        self._cache = {}
+
+    def __getattr__(self, name):
+        builder = getattr(type(self), "_" + name, None)
+        if builder is None:
+            raise AttributeError(name)
+        if name not in self._cache:
+            self._cache[name] = builder(self)
+        return self._cache[name]
+
+    def column(self, name, dtype=np.float64):
+        """``events[name]`` as a NumPy array, NaN / False where the column is missing."""
+        if name not in self.events.columns:
+            return np.full(len(self.events), np.nan if dtype == np.float64 else False)
+        if dtype == bool:
+            return self.events[name].eq(True).to_numpy()
+        return pd.to_numeric(self.events[name], errors="coerce").to_numpy(dtype=np.float64)
+
+    def type_is(self, type_name):
+        key = "type:" + type_name
+        if key not in self._cache:
+            self._cache[key] = (self.events["type_name"] == type_name).to_numpy()
+        return self._cache[key]
+
+    # Builders behind the attributes of the same name without the underscore
+    def _is_pass(self):
+        return self.type_is("Pass")
+
+    def _is_carry(self):
+        return self.type_is("Carry")
+
+    def _is_shot(self):
+        return self.type_is("Shot")
+
+    def _completed_pass(self):
+        # StatsBomb leaves the pass outcome empty when the pass found a team mate
+        return self.is_pass & self.events["outcome_name"].isna().to_numpy()
+
+    def _penalty(self):
+        return (self.events["sub_type_name"] == "Penalty").to_numpy() \
+            if "sub_type_name" in self.events.columns else np.zeros(len(self.events), bool)
+
+    def _start_distance(self):
+        return np.hypot(GOAL_X - self.column("x"), GOAL_Y - self.column("y"))
+
+    def _end_distance(self):
+        return np.hypot(GOAL_X - self.column("end_x"), GOAL_Y - self.column("end_y"))
+
+    def _progressive(self):
+        # NaN distances (no end location) compare False
+        return ((self.end_distance <= (1 - PROGRESSIVE_SHARE) * self.start_distance)
+                & (self.column("end_x") >= PROGRESSIVE_MIN_X))
+
+    def _start_in_box(self):
+        return _in_box(self.column("x"), self.column("y"))
+
+    def _end_in_box(self):
+        return _in_box(self.column("end_x"), self.column("end_y"))
+
+    def _into_final_third(self):
+        return (self.column("x") < FINAL_THIRD_X) & (self.column("end_x") >= FINAL_THIRD_X)
+
+    def _xg(self):
+        return np.nan_to_num(self.column("shot_statsbomb_xg"))
+
+    def _assists(self):
+        """``assists.resolve_assists``: passes joined to the shots they assisted."""
+        return resolve_assists(self.events)
+
+
+def _in_box(x, y):
+    return (x >= BOX_X) & (y >= BOX_Y[0]) & (y <= BOX_Y[1])
+
+
+# ---------------------------
+# Metric definitions
+# ---------------------------
+@metric("passes", "passes attempted")
+def _passes(ev):
+    return ev.is_pass
+
+
+@metric("completed_passes", "passes that found a team mate")
+def _completed_passes(ev):
+    return ev.completed_pass
+
+
+@metric("progressive_passes", "completed passes ending 25% closer to goal, in the opponent half")
+def _progressive_passes(ev):
+    return ev.completed_pass & ev.progressive
+
+
+@metric("passes_into_final_third", "completed passes from outside into the final third")
+def _passes_into_final_third(ev):
+    return ev.completed_pass & ev.into_final_third
+
+
+@metric("passes_into_box", "completed passes from outside into the penalty area")
+def _passes_into_box(ev):
+    return ev.completed_pass & ev.end_in_box & ~ev.start_in_box
+
+
+@metric("carries", "carries")
+def _carries(ev):
+    return ev.is_carry
+
+
+@metric("progressive_carries", "carries ending 25% closer to goal, in the opponent half")
+def _progressive_carries(ev):
+    return ev.is_carry & ev.progressive
+
+
+@metric("box_entries", "completed passes and carries from outside into the penalty area")
+def _box_entries(ev):
+    return (ev.completed_pass | ev.is_carry) & ev.end_in_box & ~ev.start_in_box
+
+
+@metric("key_passes", "passes that led to a shot, goal or not")
+def _key_passes(ev):
+    return ev.assists["key_pass"].to_numpy()
+
+
+@metric("shot_assists", "passes that led to a shot that was not a goal")
+def _shot_assists(ev):
+    return ev.assists["shot_assist"].to_numpy()
+
+
+@metric("goal_assists", "passes that led to a goal")
+def _goal_assists(ev):
+    return ev.assists["goal_assist"].to_numpy()
+
+
+@metric("xa", "expected assists: xG of the shots a player's passes assisted")
+def _xa(ev):
+    return ev.assists["assisted_xg"].to_numpy()
+
+
+@metric("shots", "shots")
+def _shots(ev):
+    return ev.is_shot
+
+
+@metric("goals", "goals from shots (own goals excluded)")
+def _goals(ev):
+    return ev.is_shot & (ev.events["outcome_name"] == "Goal").to_numpy()
+
+
+@metric("xg", "StatsBomb expected goals")
+def _xg(ev):
+    return ev.xg
+
+
+@metric("npxg", "non-penalty expected goals")
+def _npxg(ev):
+    return np.where(ev.penalty, 0.0, ev.xg)
+
+
+# ---------------------------
+# Evaluation
+# ---------------------------
+def _resolve(metrics):
+    names = list(METRICS) if metrics is None else list(metrics)
+    unknown = [name for name in names if name not in METRICS]
+    if unknown:
+        raise KeyError(f"unknown metrics {unknown}; registered: {sorted(METRICS)}")
+    return names
+
+
+@timer("metrics.evaluate")
+def evaluate(events, metrics=None):
+    """Per-event metric values, one float64 column per metric (same index as ``events``)."""
+    names = _resolve(metrics)
+    features = EventFeatures(events)
+    values = np.empty((len(events), len(names)), dtype=np.float64)
+    for i, name in enumerate(names):
+        values[:, i] = METRICS[name].value(features)
+    return pd.DataFrame(values, index=events.index, columns=names)
+
+
+def aggregate(events, keys=("player_id",), metrics=None):
+    """Metric totals per ``keys`` (event columns) in one groupby over all metrics."""
+    keys = list(keys)
+    values = evaluate(events, metrics)
+    return values.groupby([events[key] for key in keys]).sum()
+
+
+def _main_position(events):
+    """Position each player had on most of their events (ties: the lowest id)."""
+    played = events[["player_id", "position_id"]].dropna()
+    if played.empty:
+        return pd.Series(dtype="Int64")
+    sizes = played.groupby(["player_id", "position_id"]).size().rename("n").reset_index()
+    sizes = sizes.sort_values(["player_id", "n", "position_id"], ascending=[True, False, True])
+    return sizes.drop_duplicates("player_id").set_index("player_id")["position_id"]
+
+
+@timer("metrics.match_metrics")
+def match_metrics(metrics, match_id, df, related, freeze, tactics):
+    """``load_matches`` reducer: metric totals and minutes per player of one match.
+
+    Everyone who played is included (zero totals for players without events),
+    with ``PARTIAL_KEYS`` followed by one column per metric.
+    """
+    names = _resolve(metrics)
+    minutes = compute_minutes_played(df, tactics).set_index("player_id")
+    on_ball = df[df["player_id"].notna()]
+    totals = aggregate(on_ball, ["player_id"], names)
+    totals.index = totals.index.astype("int64")
+
+    players = minutes.index.union(totals.index)
+    names_of = on_ball.groupby("player_id")[["player_name", "team_name"]].first()
+    names_of.index = names_of.index.astype("int64")
+    partials = pd.DataFrame({
+        "player_name": names_of["player_name"].combine_first(minutes["player_name"]),
+        "team_name": names_of["team_name"].combine_first(minutes["team_name"]),
+        "position_id": _main_position(on_ball).astype("Int64"),
+        "minutes_played": minutes["minutes_played"],
+    }, index=players)
+    partials = partials.join(totals.reindex(players, fill_value=0.0))
+    partials["minutes_played"] = partials["minutes_played"].fillna(0.0)
+    partials = partials.rename_axis("player_id").reset_index()
+    partials["match_id"] = match_id
+    count("rows.players", len(partials))
+    return partials[PARTIAL_KEYS + names]
+
+
+def load_metrics(match_ids, parser=None, metrics=None, **loader_kwargs):
+    """Per-(match, player) metric partials for many matches (see ``match_metrics``)."""
+    names = _resolve(metrics)
+    results, _ = load_matches(match_ids, partial(match_metrics, names), parser=parser,
+                              **loader_kwargs)
+    if not results:
+        return pd.DataFrame(columns=PARTIAL_KEYS + names)
+    return pd.concat(results, ignore_index=True)
+
+
+def season_metrics(seasons, parser=None, metrics=None, **loader_kwargs):
+    """``load_metrics`` over several (competition_id, season_id) pairs, labelled with both ids."""
+    parser = CachedSbopen() if parser is None else parser
+    frames = []
+    for competition_id, season_id in seasons:
+        match_ids = parser.match(competition_id, season_id)["match_id"].tolist()
+        partials = load_metrics(match_ids, parser=parser, metrics=metrics, **loader_kwargs)
+        frames.append(partials.assign(competition_id=competition_id, season_id=season_id))
+    return pd.concat(frames, ignore_index=True)
+
+
+# ---------------------------
+# Per-90 tables
+# ---------------------------
+def metric_summary(partials, metrics=None, by=("player_id",), positions=None, min_minutes=None):
+    """Totals and per-90 rates of every metric per ``by`` group.
+
+    Parameters
+    ----------
+    partials : pandas.DataFrame
+        ``load_metrics`` / ``season_metrics`` output.
+    metrics : list of str, optional
+        Metric columns to summarise (default: every registered metric present).
+    by : list of str
+        Grouping columns, e.g. ``["competition_id", "season_id", "player_id"]``.
+    positions : list of int or str, optional
+        Keep only matches where the player's main position is in these StatsBomb
+        position ids, or the name of a ``summary_store.POSITION_GROUPS`` group.
+    min_minutes : float, optional
+        Keep groups with more than this many minutes in total.
+
+    Returns
+    -------
+    pandas.DataFrame
+        ``by``, player_name, matches_played, total_minutes_played, then
+        ``total_<metric>`` and ``<metric>_per90`` for every metric.
+    """
+    by = list(by)
+    names = [name for name in (METRICS if metrics is None else metrics) if name in partials.columns]
+    if isinstance(positions, str):
+        positions = POSITION_GROUPS[positions]
+    if positions is not None:
+        partials = partials[partials["position_id"].isin(positions)]
+
+    grouped = partials.groupby(by, sort=False)
+    table = grouped[names].sum().add_prefix("total_")
+    table.insert(0, "total_minutes", grouped["minutes_played"].sum())
+    table.insert(0, "matches_played", grouped.size())
+    if "player_name" not in by:
+        table.insert(0, "player_name", grouped["player_name"].first())
+    table = table.reset_index()
+    if min_minutes is not None:
+        table = table[table["total_minutes"] > min_minutes]
+
+    minutes = table["total_minutes"]
+    for name in names:
+        total = table["total_" + name]
+        if np.allclose(total, total.round()):
+            table["total_" + name] = total.round().astype("int64")
+        else:
+            table["total_" + name] = total.round(2)
+        table[name + "_per90"] = per90(total, minutes)
+    table.insert(table.columns.get_loc("total_minutes"), "total_minutes_played", minutes.round(2))
+    table = table.drop(columns="total_minutes")
+    return table.sort_values("total_minutes_played", ascending=False, kind="stable") \
+        .reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description="Totals and per-90 rates of registered metrics.")
+    cli.add_argument("--season", type=int, nargs=2, action="append", metavar=("COMPETITION", "SEASON"),
+                     help="competition and season id, repeatable (default: 55 282)")
+    cli.add_argument("--metrics", nargs="+", choices=sorted(METRICS))
+    cli.add_argument("--positions", default=None,
+                     help=f"position group: {', '.join(POSITION_GROUPS)}")
+    cli.add_argument("--min-minutes", type=float, default=360)
+    cli.add_argument("--out", default="player_metrics_per90.csv")
+    cli.add_argument("--list", action="store_true", help="print the metric registry and exit")
+    args = cli.parse_args()
+
+    if args.list:
+        print(describe_metrics().to_string(index=False))
+        raise SystemExit(0)
+    seasons = args.season or [(55, 282)]
+    partials = season_metrics(seasons, metrics=args.metrics)
+    by = ["player_id"] if len(seasons) == 1 else ["competition_id", "season_id", "player_id"]
+    table = metric_summary(partials, metrics=args.metrics, by=by, positions=args.positions,
+                           min_minutes=args.min_minutes)
+    table.to_csv(args.out, index=False)
+    print(table.head(20).to_string(index=False))
+    print(f"Saved {len(table)} rows to '{args.out}'")
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized minutes-played engine.
+
+``compute_minutes_played(events, tactics)`` works out when every player in a
+match came on and went off in one pass over the Starting XI, Substitution and
+red-card events, instead of filtering the match frame once per player and
+converting timestamps row by row with ``apply(axis=1)``.
+
+The match clock chains the periods end to end: period 2 starts where period 1
+ended (including stoppage time), extra time (periods 3 and 4) continues from
+there, and the penalty shoot-out (period 5) adds no minutes.
+"""
+
+import numpy as np
+import pandas as pd
+
+from instrument import count, timer
+from match_loader import load_matches
+
+STARTING_XI = "Starting XI"
+SUBSTITUTION = "Substitution"
+RED_CARDS = ("Red Card", "Second Yellow")
+CARD_COLUMNS = ("foul_committed_card_name", "bad_behaviour_card_name")
+LAST_PLAYED_PERIOD = 4
+
+MINUTES_COLUMNS = ["match_id", "team_id", "team_name", "player_id", "player_name",
+                   "started", "entry_minute", "exit_minute", "minutes_played"]
+
+
+# ---------------------------
+# Match clock
+# ---------------------------
+def period_seconds(timestamp):
+    """Seconds since the start of the period for a column of event timestamps."""
+    return pd.to_timedelta(timestamp.astype(str)).dt.total_seconds()
+
+
+def match_clock(events):
+    """Elapsed match minutes of every event and the total match length in minutes.
+
+    Period lengths come from the last event of each period (the Half End), so
+    stoppage time is included.
+    """
+    seconds = period_seconds(events["timestamp"])
+    period = events["period"]
+    played = period <= LAST_PLAYED_PERIOD
+    lengths = seconds[played].groupby(period[played]).max()
+    offsets = lengths.cumsum().shift(fill_value=0.0)
+    total = lengths.sum()
+    clock = np.where(played, seconds + period.map(offsets).fillna(0.0), total)
+    return pd.Series(clock / 60, index=events.index), total / 60
+
+
+# ---------------------------
+# Minutes played
+# ---------------------------
+@timer("minutes.compute_minutes_played")
+def compute_minutes_played(events, tactics):
+    """Entry/exit minute and minutes played for every player who took part in a match.
+
+    Parameters
+    ----------
+    events, tactics : pandas.DataFrame
+        The first and last frame returned by ``parser.event(match_id)``.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per player with ``MINUTES_COLUMNS``.
+    """
+    clock, total = match_clock(events)
+    match_id = events["match_id"].iloc[0]
+    type_name = events["type_name"]
+
+    # Starters: the tactics frame only knows the Starting XI event id, the team
+    # comes from the event itself
+    xi = events.loc[type_name == STARTING_XI, ["id", "team_id", "team_name"]]
+    if "id" in tactics.columns:
+        starters = tactics[["id", "player_id", "player_name"]].merge(xi, on="id")
+    else:
+        starters = pd.DataFrame(columns=["id", "player_id", "player_name", "team_id", "team_name"])
+    starters = starters.drop(columns="id").assign(started=True, entry_minute=0.0)
+
+    subs = type_name == SUBSTITUTION
+    subs_on = (events.loc[subs]
+               .reindex(columns=["substitution_replacement_id", "substitution_replacement_name",
+                                 "team_id", "team_name"])
+               .rename(columns={"substitution_replacement_id": "player_id",
+                                "substitution_replacement_name": "player_name"})
+               .assign(started=False, entry_minute=clock[subs]))
+    appearances = pd.concat([starters, subs_on], ignore_index=True)
+    appearances = (appearances.sort_values("entry_minute", kind="stable")
+                   .drop_duplicates("player_id"))
+
+    # Exits: substituted off or sent off, whichever came first
+    sent_off = pd.Series(False, index=events.index)
+    for col in CARD_COLUMNS:
+        if col in events.columns:
+            sent_off |= events[col].isin(RED_CARDS)
+    leaving = subs | sent_off
+    exits = clock[leaving].groupby(events.loc[leaving, "player_id"]).min()
+
+    appearances["exit_minute"] = appearances["player_id"].map(exits).fillna(total)
+    appearances["minutes_played"] = (appearances["exit_minute"]
+                                     - appearances["entry_minute"]).clip(lower=0.0)
+    appearances["match_id"] = match_id
+    appearances["player_id"] = appearances["player_id"].astype("int64")
+    appearances["started"] = appearances["started"].astype(bool)
+    count("rows.players", len(appearances))
+    return appearances[MINUTES_COLUMNS].reset_index(drop=True)
+
+
+def match_minutes(match_id, df, related, freeze, tactics):
+    """``load_matches`` reducer: the minutes table of one match."""
+    return compute_minutes_played(df, tactics)
+
+
+def tournament_minutes(match_ids, parser=None, **loader_kwargs):
+    """Minutes table for many matches, built with ``match_loader.load_matches``."""
+    tables, _ = load_matches(match_ids, match_minutes, parser=parser, **loader_kwargs)
+    if not tables:
+        return pd.DataFrame(columns=MINUTES_COLUMNS)
+    return pd.concat(tables, ignore_index=True)
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+Side-by-side image panels (the combined bar-chart figure of the report).
+
+Only needs Pillow, so ``JoinTheBarGraphs.py`` can stitch saved PNGs without
+importing the export pipeline (matplotlib, pandas, the data loaders), and
+``export_charts.py`` composes its in-memory charts with the same function.
+"""
+
+from PIL import Image
+
+COMBINED_GAP = 20         # pixels between the bar charts
+COMBINED_MAX_WIDTH = 2000
+
+
+def compose_panel(images, gap=COMBINED_GAP, max_width=COMBINED_MAX_WIDTH):
+    """Paste images side by side on white, scaled down to ``max_width`` if needed."""
+    total_width = sum(img.width for img in images) + gap * (len(images) - 1)
+    if total_width > max_width:
+        scale = max_width / total_width
+        images = [img.resize((int(img.width * scale), int(img.height * scale)),
+                             Image.Resampling.LANCZOS)
+                  for img in images]
+        total_width = sum(img.width for img in images) + gap * (len(images) - 1)
+
+    panel = Image.new("RGB", (total_width, max(img.height for img in images)),
+                      color=(255, 255, 255))
+    x_offset = 0
+    for img in images:
+        panel.paste(img, (x_offset, 0))
+        x_offset += img.width + gap
+    return panel
@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+"""
+Pass networks: who passes to whom, per team and match or over a tournament.
+
+A match is reduced once to its pass edges: one row per (team, passer,
+recipient) with the number of completed passes and the sums of their start
+and end coordinates. Edges are additive, so a tournament network is a
+groupby-sum of cached match edges (``CachedSbopen.derived``) and never
+re-reads events:
+
+    edges, report = load_pass_edges(match_ids)
+    networks = build_networks(edges, by=["match_id", "team_id"])   # per match
+    portugal = build_networks(edges[edges["team_name"] == "Portugal"], by=["team_id"])
+
+Each ``PassNetwork`` holds a node table (players, average positions, passes
+made / received) and a ``scipy.sparse`` CSR adjacency matrix whose entry
+(i, j) is the number of completed passes from node i to node j. A node's
+average position is the mean of the start of its passes and the end of the
+passes it received.
+
+``centrality`` adds weighted degree, betweenness (shortest paths with
+distance 1 / passes, Brandes' algorithm) and PageRank (transition weights
+proportional to passes) per player; ``render_network`` draws a network on a
+``pitch_render.PitchCanvas``, so one figure serves every match.
+"""
+
+import argparse
+import heapq
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from instrument import timer
+from match_loader import load_matches, print_report
+from minutes import SUBSTITUTION
+from sbcache import CachedSbopen
+
+PASS_NETWORK_VERSION = 1  # bump when the edge layout or rules change
+EDGE_COLUMNS = ["match_id", "team_id", "team_name", "player_id", "player_name", "recipient_id",
+                "recipient_name", "passes", "x_sum", "y_sum", "end_x_sum", "end_y_sum"]
+NODE_COLUMNS = ["player_id", "player_name", "x", "y", "passes_made", "passes_received"]
+CENTRALITY_COLUMNS = ["player_id", "player_name", "out_degree", "in_degree", "degree",
+                      "betweenness", "pagerank"]
+PAGERANK_DAMPING = 0.85
+
+PassNetwork = namedtuple("PassNetwork", ["key", "team_name", "nodes", "adjacency"])
+
+
+# ---------------------------
+# Edges
+# ---------------------------
+@timer("pass_network.pass_edges")
+def pass_edges(events, until_first_sub=False):
+    """Completed-pass edges per (team, passer, recipient) of one or many matches.
+
+    Parameters
+    ----------
+    events : pandas.DataFrame
+        Flattened events with a ``match_id`` column.
+    until_first_sub : bool
+        Only count passes before each team's first substitution (the classic
+        pass-network view of a starting XI).
+
+    Returns
+    -------
+    pandas.DataFrame
+        ``EDGE_COLUMNS``, one row per edge.
+    """
+    passes = events[(events["type_name"] == "Pass") & events["outcome_name"].isna()
+                    & events["pass_recipient_id"].notna()]
+    if until_first_sub:
+        subs = events[events["type_name"] == SUBSTITUTION]
+        first = subs.groupby(["match_id", "team_id"])["index"].min()
+        cutoff = first.reindex(pd.MultiIndex.from_frame(passes[["match_id", "team_id"]]))
+        passes = passes[~(passes["index"].to_numpy() >= cutoff.to_numpy(dtype=np.float64))]
+
+    keys = ["match_id", "team_id", "team_name", "player_id", "player_name", "pass_recipient_id",
+            "pass_recipient_name"]
+    edges = (passes.groupby(keys, sort=True)
+             .agg(passes=("id", "size"), x_sum=("x", "sum"), y_sum=("y", "sum"),
+                  end_x_sum=("end_x", "sum"), end_y_sum=("end_y", "sum"))
+             .reset_index()
+             .rename(columns={"pass_recipient_id": "recipient_id",
+                              "pass_recipient_name": "recipient_name"}))
+    return edges.astype({"match_id": "int64", "team_id": "int64", "player_id": "int64",
+                         "recipient_id": "int64", "passes": "int64"})[EDGE_COLUMNS]
+
+
+def match_pass_edges(match_id, df, related, freeze, tactics):
+    """``load_matches`` / ``CachedSbopen.derived`` builder: the pass edges of one match."""
+    if "match_id" not in df.columns:
+        df = df.assign(match_id=match_id)
+    return pass_edges(df)
+
+
+def cached_pass_edges(parser, match_id):
+    """Pass edges of one match, cached next to its events."""
+    return parser.derived(match_id, "pass_edges", match_pass_edges, version=PASS_NETWORK_VERSION)
+
+
+def load_pass_edges(match_ids, parser=None, **loader_kwargs):
+    """Cached pass edges of many matches in one frame (``match_ids`` order).
+
+    The tables are read through ``load_matches`` (other keyword arguments go
+    there); returns ``(edges, report)`` with its per-match report.
+    """
+    tables, report = load_matches(match_ids, match_pass_edges, parser=parser,
+                                  cache_as="pass_edges", version=PASS_NETWORK_VERSION,
+                                  **loader_kwargs)
+    if not tables:
+        return pd.DataFrame(columns=EDGE_COLUMNS), report
+    return pd.concat(tables, ignore_index=True), report
+
+
+# ---------------------------
+# Networks
+# ---------------------------
+@timer("pass_network.build_networks")
+def build_networks(edges, by=("match_id", "team_id"), min_passes=1):
+    """One ``PassNetwork`` per ``by`` group, from (possibly many matches of) edges.
+
+    Edges of the same (passer, recipient) within a group are summed first, so
+    ``by=["team_id"]`` gives tournament networks. Nodes are every player with
+    at least one completed pass made or received; edges with fewer than
+    ``min_passes`` passes are left out of the adjacency matrix.
+
+    Returns
+    -------
+    dict
+        Group key (a tuple of the ``by`` values) -> ``PassNetwork``.
+    """
+    by = list(by)
+    edges = (edges.groupby(by + ["team_name", "player_id", "player_name", "recipient_id",
+                                 "recipient_name"], sort=True)
+             [["passes", "x_sum", "y_sum", "end_x_sum", "end_y_sum"]].sum().reset_index())
+
+    # Node statistics from both ends of every edge, for all groups at once
+    made = edges[by + ["player_id", "player_name", "passes", "x_sum", "y_sum"]] \
+        .rename(columns={"passes": "passes_made"})
+    received = edges[by + ["recipient_id", "recipient_name", "passes", "end_x_sum", "end_y_sum"]] \
+        .rename(columns={"recipient_id": "player_id", "recipient_name": "player_name",
+                         "passes": "passes_received", "end_x_sum": "x_sum", "end_y_sum": "y_sum"})
+    nodes = (pd.concat([made, received], ignore_index=True)
+             .fillna({"passes_made": 0, "passes_received": 0})
+             .groupby(by + ["player_id"], sort=True)
+             .agg(player_name=("player_name", "first"), passes_made=("passes_made", "sum"),
+                  passes_received=("passes_received", "sum"), x_sum=("x_sum", "sum"),
+                  y_sum=("y_sum", "sum"))
+             .reset_index())
+    touches = nodes["passes_made"] + nodes["passes_received"]
+    nodes["x"] = nodes["x_sum"] / touches
+    nodes["y"] = nodes["y_sum"] / touches
+    nodes = nodes.astype({"passes_made": "int64", "passes_received": "int64"})
+    # Node number within its group, looked up for both ends of every edge
+    nodes["node"] = nodes.groupby(by, sort=False).cumcount()
+    node_of = nodes.set_index(by + ["player_id"])["node"]
+    edges["source"] = node_of.reindex(pd.MultiIndex.from_frame(edges[by + ["player_id"]])).to_numpy()
+    edges["target"] = node_of.reindex(pd.MultiIndex.from_frame(
+        edges[by + ["recipient_id"]].rename(columns={"recipient_id": "player_id"}))).to_numpy()
+    team_names = _by_key(edges.groupby(by, sort=False)["team_name"].first().items())
+    edges = edges[edges["passes"] >= min_passes]
+
+    edge_groups = _by_key(edges.groupby(by, sort=False).indices.items())
+    networks = {}
+    for key, rows in _by_key(nodes.groupby(by, sort=True).indices.items()).items():
+        group_nodes = nodes.iloc[rows].reset_index(drop=True)
+        n = len(group_nodes)
+        group_edges = edges.iloc[edge_groups.get(key, [])]
+        adjacency = sparse.csr_matrix(
+            (group_edges["passes"].to_numpy(dtype=np.float64),
+             (group_edges["source"].to_numpy(), group_edges["target"].to_numpy())), shape=(n, n))
+        networks[key] = PassNetwork(key, team_names.get(key), group_nodes[NODE_COLUMNS], adjacency)
+    return networks
+
+
+def _by_key(items):
+    """Groupby results keyed by tuples, also for a single grouping column."""
+    return {key if isinstance(key, tuple) else (key,): value for key, value in items}
+
+
+# ---------------------------
+# Centrality
+# ---------------------------
+def _betweenness(adjacency):
+    """Weighted betweenness (distance = 1 / passes), Brandes' algorithm, normalised to [0, 1]."""
+    n = adjacency.shape[0]
+    indptr, indices, data = adjacency.indptr, adjacency.indices, 1.0 / adjacency.data
+    score = np.zeros(n)
+    for source in range(n):
+        order, preds = [], [[] for _ in range(n)]
+        paths = np.zeros(n)
+        paths[source] = 1.0
+        dist = np.full(n, np.inf)
+        dist[source] = 0.0
+        heap = [(0.0, source)]
+        done = np.zeros(n, dtype=bool)
+        while heap:
+            d, v = heapq.heappop(heap)
+            if done[v]:
+                continue
+            done[v] = True
+            order.append(v)
+            for w, length in zip(indices[indptr[v]:indptr[v + 1]], data[indptr[v]:indptr[v + 1]]):
+                alt = d + length
+                if alt < dist[w] - 1e-12:
+                    dist[w], paths[w], preds[w] = alt, paths[v], [v]
+                    heapq.heappush(heap, (alt, w))
+                elif abs(alt - dist[w]) <= 1e-12:
+                    paths[w] += paths[v]
+                    preds[w].append(v)
+        dependency = np.zeros(n)
+        for w in reversed(order):
+            for v in preds[w]:
+                dependency[v] += paths[v] / paths[w] * (1.0 + dependency[w])
+            if w != source:
+                score[w] += dependency[w]
+    return score / ((n - 1) * (n - 2)) if n > 2 else score
+
+
+def _pagerank(adjacency, damping=PAGERANK_DAMPING, tol=1e-10, max_iter=200):
+    """PageRank with transition probabilities proportional to passes; dangling nodes jump uniformly."""
+    n = adjacency.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    out = np.asarray(adjacency.sum(axis=1)).ravel()
+    dangling = out == 0
+    transition = sparse.diags(np.divide(1.0, out, out=np.zeros(n), where=~dangling)) @ adjacency
+    transition = transition.T.tocsr()
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        new = damping * (transition @ rank + rank[dangling].sum() / n) + (1 - damping) / n
+        if np.abs(new - rank).sum() < tol:
+            return new
+        rank = new
+    return rank
+
+
+@timer("pass_network.centrality")
+def centrality(network):
+    """Weighted degree, betweenness and PageRank of every player in a ``PassNetwork``."""
+    adjacency = network.adjacency
+    nodes = network.nodes
+    out_degree = np.asarray(adjacency.sum(axis=1)).ravel()
+    in_degree = np.asarray(adjacency.sum(axis=0)).ravel()
+    table = pd.DataFrame({
+        "player_id": nodes["player_id"].to_numpy(),
+        "player_name": nodes["player_name"].to_numpy(),
+        "out_degree": out_degree.astype("int64"),
+        "in_degree": in_degree.astype("int64"),
+        "degree": (out_degree + in_degree).astype("int64"),
+        "betweenness": _betweenness(adjacency),
+        "pagerank": _pagerank(adjacency),
+    })
+    return table[CENTRALITY_COLUMNS]
+
+
+def player_centrality(networks, player_id):
+    """Centrality of one player in every network they appear in, one row per network key."""
+    rows = []
+    for key, network in networks.items():
+        table = centrality(network)
+        row = table[table["player_id"] == player_id]
+        if not row.empty:
+            rows.append(row.assign(key=[key], team_name=network.team_name))
+    if not rows:
+        return pd.DataFrame(columns=["key", "team_name"] + CENTRALITY_COLUMNS)
+    return pd.concat(rows, ignore_index=True)[["key", "team_name"] + CENTRALITY_COLUMNS]
+
+
+# ---------------------------
+# Rendering
+# ---------------------------
+def _short_name(name):
+    parts = str(name).split()
+    return parts[-1] if parts else ""
+
+
+def render_network(canvas, network, title=None, min_passes=3, color="#1A78CF",
+                   highlight=None, highlight_color="red"):
+    """Draw ``network`` on a ``PitchCanvas`` (edge width ~ passes, node size ~ passes made).
+
+    Only edges with at least ``min_passes`` passes in either direction are
+    drawn; ``highlight`` is a player id drawn in ``highlight_color``.
+    """
+    nodes = network.nodes
+    pairs = (network.adjacency + network.adjacency.T).tocoo()
+    keep = (pairs.row < pairs.col) & (pairs.data >= min_passes)
+    source, target, weight = pairs.row[keep], pairs.col[keep], pairs.data[keep]
+    x, y = nodes["x"].to_numpy(), nodes["y"].to_numpy()
+    widths = 1 + 9 * weight / weight.max() if len(weight) else []
+
+    colors = np.where(nodes["player_id"].to_numpy() == highlight, highlight_color, color)
+    made = nodes["passes_made"].to_numpy(dtype=np.float64)
+    sizes = 200 + 1000 * made / max(made.max(), 1)
+
+    canvas.clear()
+    canvas.lines("edges", x[source], y[source], x[target], y[target], widths=widths,
+                 color="#555555", alpha=0.6, capstyle="round")
+    canvas.points("nodes", x, y, sizes=sizes, color=colors.tolist(), edgecolors="black",
+                  linewidths=1.5)
+    canvas.labels(x, y, nodes["player_name"].map(_short_name), colors="white",
+                  fontsize=9, fontweight="bold")
+    canvas.title(title or f"{network.team_name} pass network", fontsize=15)
+    return canvas
+
+
+def export_networks(networks, out_dir, titles=None, highlight=None, min_passes=3):
+    """Save every network as ``<key>.png`` with a single canvas; returns the paths."""
+    from pitch_render import PitchCanvas
+
+    os.makedirs(out_dir, exist_ok=True)
+    canvas = PitchCanvas(figsize=(12, 8))
+    paths = []
+    try:
+        for key, network in networks.items():
+            title = (titles or {}).get(key)
+            render_network(canvas, network, title=title, highlight=highlight, min_passes=min_passes)
+            name = "_".join(str(part) for part in key)
+            paths.append(canvas.save(os.path.join(out_dir, f"{name}.png")))
+    finally:
+        canvas.close()
+    return paths
+
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description="Pass networks and centrality of a team.")
+    cli.add_argument("--competition", type=int, default=55)
+    cli.add_argument("--season", type=int, default=282)
+    cli.add_argument("--team", default="Portugal")
+    cli.add_argument("--player", type=int, default=5204, help="player to report centrality for")
+    cli.add_argument("--min-passes", type=int, default=3, help="fewest passes for a drawn edge")
+    cli.add_argument("--out-dir", default="pass_networks", help="where to save the network maps")
+    args = cli.parse_args()
+
+    parser = CachedSbopen()
+    matches = parser.match(args.competition, args.season)
+    team_matches = matches[(matches["home_team_name"] == args.team)
+                           | (matches["away_team_name"] == args.team)]
+    edges, load_report = load_pass_edges(team_matches["match_id"].tolist(), parser=parser)
+    print_report(load_report)
+    edges = edges[edges["team_name"] == args.team]
+
+    per_match = build_networks(edges, by=["match_id", "team_id"])
+    tournament = build_networks(edges, by=["team_id"])
+    report = pd.concat([player_centrality(per_match, args.player),
+                        player_centrality(tournament, args.player)], ignore_index=True)
+    print(report.round(3).to_string(index=False))
+
+    names = {row.match_id: f"{row.home_team_name} vs {row.away_team_name}"
+             for row in team_matches.itertuples()}
+    titles = {key: f"{args.team} pass network: {names[key[0]]}" for key in per_match}
+    titles.update({key: f"{args.team} pass network: whole tournament" for key in tournament})
+    paths = export_networks({**per_match, **tournament}, args.out_dir, titles=titles,
+                            highlight=args.player, min_passes=args.min_passes)
+    print(f"Saved {len(paths)} pass networks to '{args.out_dir}'")
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+"""
+Batched pitch rendering with a cached background.
+
+Drawing a fresh ``pitch.draw()`` figure per match and calling
+``pitch.arrows`` / ``ax.text`` once per zone per match creates hundreds of
+artists and figures. ``PitchCanvas`` instead
+
+- draws the pitch (and optional zone lines) once and caches the rendered
+  pixels with ``copy_from_bbox``,
+- keeps one ``Quiver`` per named arrow layer and updates it in place
+  (``set_offsets`` / ``set_UVC``), so each layer is a single artist whatever
+  the number of arrows or colours,
+- keeps one collection per named point / line layer (pass-network nodes and
+  edges) and updates offsets, sizes, segments and widths in place,
+- recycles a pool of ``Text`` artists for labels,
+- renders a map by restoring the cached background and blitting only the
+  dynamic artists.
+
+One canvas can therefore produce a whole tournament's worth of per-match maps
+with a single figure alive.
+"""
+
+import os
+
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from mplsoccer import Pitch, VerticalPitch
+from PIL import Image
+
+from instrument import timer
+
+RASTER_FORMATS = (".png", ".jpg", ".jpeg", ".webp", ".bmp", ".tif", ".tiff")
+
+
+class PitchCanvas:
+    """A pitch figure that is drawn once and re-used for many maps.
+
+    Parameters
+    ----------
+    pitch : mplsoccer.Pitch, optional
+        Defaults to a horizontal StatsBomb pitch with black lines.
+    figsize : tuple
+    x_edges, y_edges : array-like, optional
+        Zone boundaries to draw as dashed lines in the background.
+    pyplot : bool
+        Keep the figure registered with pyplot (needed for ``show``). ``False``
+        gives it its own Agg canvas instead, so ``plt.close('all')`` (which
+        Streamlit runs after every rerun) does not invalidate a canvas that is
+        kept between reruns.
+    """
+
+    def __init__(self, pitch=None, figsize=(12, 8), x_edges=None, y_edges=None, pyplot=True):
+        self.pitch = Pitch(pitch_type='statsbomb', line_color='black') if pitch is None else pitch
+        self.vertical = isinstance(self.pitch, VerticalPitch)
+        self.fig, self.ax = self.pitch.draw(figsize=figsize)
+        if not pyplot:
+            plt.close(self.fig)
+            FigureCanvasAgg(self.fig)
+        # Leave room above the pitch for a two-line title
+        self.fig.set_layout_engine('none')
+        self.fig.subplots_adjust(top=0.9)
+
+        # Inner zone lines: one collection per direction instead of one line each
+        length, width = self.pitch.dim.length, self.pitch.dim.width
+        across, along = (self.ax.hlines, self.ax.vlines) if self.vertical \
+            else (self.ax.vlines, self.ax.hlines)
+        if x_edges is not None and len(x_edges) > 2:
+            across(x_edges[1:-1], 0, width, linestyle='--', color='gray')
+        if y_edges is not None and len(y_edges) > 2:
+            along(y_edges[1:-1], 0, length, linestyle='--', color='gray')
+
+        # Cache the static background before any dynamic artist exists
+        self.fig.canvas.draw()
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+
+        self._layers = {}
+        self._collections = {}
+        self._texts = []
+        self._n_texts = 0
+        self._title = self.ax.text(0.5, 1.01, "", transform=self.ax.transAxes,
+                                   ha='center', va='bottom', fontsize=15)
+        self._legend = None
+
+    # ---------------------------
+    # Dynamic content
+    # ---------------------------
+    def arrows(self, layer, xstart, ystart, xend, yend, color='black', **style):
+        """Set the arrows of a layer (one Quiver per layer, updated in place).
+
+        ``color`` may be a single colour or one colour per arrow. Style keywords
+        (width, headwidth, alpha, label, ...) are only applied when the layer is
+        created or its arrow count changes.
+        """
+        xstart, ystart = np.ravel(xstart).astype(float), np.ravel(ystart).astype(float)
+        xend, yend = np.ravel(xend).astype(float), np.ravel(yend).astype(float)
+        quiver = self._layers.get(layer)
+
+        if quiver is not None and quiver.N == len(xstart) and len(xstart) > 0:
+            u, v = xend - xstart, yend - ystart
+            offsets = np.column_stack([xstart, ystart])
+            if self.vertical:
+                u, v, offsets = v, u, offsets[:, ::-1]
+            quiver.set_offsets(offsets)
+            quiver.set_UVC(u, v)
+            quiver.set_color(color)
+            quiver.set_visible(True)
+            return quiver
+
+        if quiver is not None:
+            quiver.remove()
+            self._layers.pop(layer)
+        if len(xstart) == 0:
+            return None
+        quiver = self.pitch.arrows(xstart, ystart, xend, yend, ax=self.ax, color=color, **style)
+        self._layers[layer] = quiver
+        return quiver
+
+    def points(self, layer, x, y, sizes=100, color='black', **style):
+        """Set the markers of a point layer (one PathCollection, updated in place).
+
+        ``sizes`` and ``color`` may be scalars or one value per point; other
+        style keywords (edgecolors, zorder, ...) apply when the layer is created.
+        """
+        x, y = np.ravel(x).astype(float), np.ravel(y).astype(float)
+        offsets = np.column_stack([y, x] if self.vertical else [x, y])
+        collection = self._collections.get(layer)
+        if collection is None:
+            collection = self.ax.scatter(offsets[:, 0], offsets[:, 1], s=sizes, c=color, **style)
+            self._collections[layer] = collection
+        else:
+            collection.set_offsets(offsets)
+            collection.set_sizes(np.broadcast_to(sizes, len(x)))
+            collection.set_facecolor(color)
+        collection.set_visible(len(x) > 0)
+        return collection
+
+    def lines(self, layer, xstart, ystart, xend, yend, widths=1, color='black', **style):
+        """Set the segments of a line layer (one LineCollection, updated in place)."""
+        xstart, ystart = np.ravel(xstart).astype(float), np.ravel(ystart).astype(float)
+        xend, yend = np.ravel(xend).astype(float), np.ravel(yend).astype(float)
+        if self.vertical:
+            xstart, ystart, xend, yend = ystart, xstart, yend, xend
+        segments = np.stack([np.column_stack([xstart, ystart]),
+                             np.column_stack([xend, yend])], axis=1)
+        collection = self._collections.get(layer)
+        if collection is None:
+            collection = LineCollection(segments, linewidths=widths, colors=color, **style)
+            self.ax.add_collection(collection, autolim=False)
+            self._collections[layer] = collection
+        else:
+            collection.set_segments(segments)
+            collection.set_linewidths(widths)
+            collection.set_color(color)
+        collection.set_visible(len(segments) > 0)
+        return collection
+
+    def hide_layer(self, layer):
+        """Hide a layer without dropping its artist."""
+        if layer in self._layers:
+            self._layers[layer].set_visible(False)
+        if layer in self._collections:
+            self._collections[layer].set_visible(False)
+
+    def labels(self, x, y, strings, colors='black', **style):
+        """Show text labels, re-using previously created Text artists."""
+        x, y = np.ravel(x), np.ravel(y)
+        strings = [str(s) for s in strings]
+        colors = [colors] * len(strings) if isinstance(colors, str) else list(colors)
+        if self.vertical:
+            x, y = y, x
+        while len(self._texts) < len(strings):
+            self._texts.append(self.ax.text(0, 0, "", ha='center', va='center'))
+        for text, xi, yi, s, c in zip(self._texts, x, y, strings, colors):
+            text.set_position((xi, yi))
+            text.set_text(s)
+            text.set_color(c)
+            text.update(style)
+            text.set_visible(True)
+        for text in self._texts[len(strings):]:
+            text.set_visible(False)
+        self._n_texts = len(strings)
+
+    def title(self, text, **style):
+        self._title.set_text(text)
+        self._title.update(style)
+
+    def legend(self, handles=None, **kwargs):
+        """(Re)build the legend; without handles it uses the labelled arrow layers."""
+        if self._legend is not None:
+            self._legend.remove()
+        if handles is None:
+            handles = [q for q in self._layers.values() if q.get_visible() and q.get_label()
+                       and not q.get_label().startswith('_')]
+        self._legend = self.ax.legend(handles=handles, **kwargs)
+        return self._legend
+
+    def clear(self):
+        """Hide every dynamic artist so the next map starts from the bare pitch."""
+        for quiver in self._layers.values():
+            quiver.set_visible(False)
+        for collection in self._collections.values():
+            collection.set_visible(False)
+        self.labels([], [], [])
+        self._title.set_text("")
+        if self._legend is not None:
+            self._legend.set_visible(False)
+
+    # ---------------------------
+    # Output
+    # ---------------------------
+    def _dynamic_artists(self):
+        artists = (list(self._collections.values()) + list(self._layers.values())
+                   + self._texts[:self._n_texts] + [self._title])
+        if self._legend is not None:
+            artists.append(self._legend)
+        return [a for a in artists if a.get_visible()]
+
+    @timer("pitch_render.render")
+    def render(self):
+        """Blit the dynamic artists onto the cached background; returns an RGBA array."""
+        canvas = self.fig.canvas
+        canvas.restore_region(self._background)
+        for artist in self._dynamic_artists():
+            self.ax.draw_artist(artist)
+        return np.asarray(canvas.buffer_rgba()).copy()
+
+    @timer("pitch_render.save")
+    def save(self, path):
+        """Save the current map; raster formats use the blitted buffer, others a full savefig."""
+        if os.path.splitext(path)[1].lower() in RASTER_FORMATS:
+            Image.fromarray(self.render()).convert('RGB').save(path, dpi=(self.fig.dpi,) * 2)
+        else:
+            self.fig.savefig(path)
+        return path
+
+    def show(self):
+        plt.show()
+
+    def close(self):
+        plt.close(self.fig)
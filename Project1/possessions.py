@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+Possession-chain index for build-up analysis.
+
+StatsBomb numbers every possession within a match (``possession``) and names
+the team in control (``possession_team_id``). ``PossessionIndex`` sorts a
+tournament's events by (match, event index) once and stores
+
+- ``chains``: one row per (match, possession) with its ``start`` / ``stop``
+  row in ``frame`` plus per-chain totals computed with ``np.*.reduceat`` over
+  those offsets (events, passes, shots, xG, goal, start / furthest x,
+  duration),
+- a player -> chain membership array: the chains each player of the team in
+  possession took part in, sorted by player with its own offsets, and per
+  membership whether the player took a shot or played the key pass.
+
+Queries read the offsets instead of scanning events:
+
+    index = PossessionIndex.from_matches(match_ids)
+    chains = index.chains_for(5204, shot=True)    # Bruno's chains ending in a shot
+    index.chain_events(chains["chain"].iloc[0])   # the events of one chain
+    index.xg_chain()                              # xGChain / xGBuildup per player
+
+xGChain credits every player in a chain with the xG of the chain's shots;
+xGBuildup does the same but leaves out the chains where the player took a
+shot or played the key pass, i.e. it measures involvement earlier in the move.
+Only events of the team in possession count as involvement.
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from assists import resolve_assists
+from event_index import _block_bounds, load_events
+from instrument import timer
+from minutes import tournament_minutes
+from sbcache import CachedSbopen
+from summary_store import per90
+
+POSSESSION_COLUMNS = ["id", "index", "match_id", "period", "minute", "second", "possession",
+                      "possession_team_id", "possession_team_name", "team_id", "type_name",
+                      "player_id", "player_name", "x", "y", "outcome_name", "shot_statsbomb_xg",
+                      "pass_assisted_shot_id"]
+CHAIN_COLUMNS = ["chain", "match_id", "possession", "team_id", "team_name", "start", "stop",
+                 "events", "passes", "shots", "xg", "goal", "start_x", "max_x", "seconds"]
+XG_CHAIN_COLUMNS = ["player_id", "player_name", "chains", "shot_chains", "xg_chain",
+                    "buildup_chains", "xg_buildup"]
+
+
+class PossessionIndex:
+    """Events sorted by (match, event index) with possession-chain offsets.
+
+    Parameters
+    ----------
+    events : pandas.DataFrame
+        Flattened events of one or many matches with ``POSSESSION_COLUMNS``
+        (``load_events(match_ids, columns=POSSESSION_COLUMNS)``).
+
+    Attributes
+    ----------
+    frame : pandas.DataFrame
+        The sorted events (``RangeIndex``) with a ``chain`` column.
+    chains : pandas.DataFrame
+        ``CHAIN_COLUMNS``, one row per chain; ``chain`` is the row number.
+    members : pandas.DataFrame
+        One row per (player, chain) of the team in possession, sorted by
+        player, with ``shot`` / ``key_pass`` flags of that player in that chain.
+    """
+
+    @timer("possessions.build_index")
+    def __init__(self, events):
+        order = np.lexsort((events["index"].to_numpy(dtype=np.int64),
+                            events["match_id"].to_numpy(dtype=np.int64)))
+        frame = events.iloc[order].reset_index(drop=True)
+        match = frame["match_id"].to_numpy(dtype=np.int64)
+        possession = frame["possession"].to_numpy(dtype=np.int64)
+        starts, stops = _block_bounds(match, possession)
+        chain = np.repeat(np.arange(len(starts)), stops - starts)
+        frame["chain"] = chain
+        self.frame = frame
+
+        # Per-event values of the chain's team, summed per chain over the offsets
+        chain_team = frame["possession_team_id"].to_numpy()[starts]
+        own = frame["team_id"].to_numpy() == chain_team[chain]
+        is_pass = own & (frame["type_name"] == "Pass").to_numpy()
+        is_shot = own & (frame["type_name"] == "Shot").to_numpy()
+        xg = np.where(is_shot, pd.to_numeric(frame["shot_statsbomb_xg"], errors="coerce")
+                      .fillna(0.0).to_numpy(dtype=np.float64), 0.0)
+        goal = is_shot & (frame["outcome_name"] == "Goal").to_numpy()
+        x = np.where(own, frame["x"].to_numpy(dtype=np.float64), np.nan)
+        clock = (frame["minute"].to_numpy(dtype=np.float64) * 60
+                 + frame["second"].to_numpy(dtype=np.float64))
+
+        self._starts = starts
+        if len(starts):
+            first_x = pd.Series(x).groupby(chain).first().to_numpy()
+            max_x = np.fmax.reduceat(x, starts)
+            sums = {name: np.add.reduceat(values.astype(np.float64), starts)
+                    for name, values in (("passes", is_pass), ("shots", is_shot), ("xg", xg),
+                                         ("goal", goal))}
+            seconds = np.maximum.reduceat(clock, starts) - np.minimum.reduceat(clock, starts)
+        else:
+            first_x = max_x = seconds = np.zeros(0)
+            sums = {name: np.zeros(0) for name in ("passes", "shots", "xg", "goal")}
+        self.chains = pd.DataFrame({
+            "chain": np.arange(len(starts)),
+            "match_id": match[starts],
+            "possession": possession[starts],
+            "team_id": chain_team,
+            "team_name": frame["possession_team_name"].to_numpy()[starts],
+            "start": starts,
+            "stop": stops,
+            "events": stops - starts,
+            "passes": sums["passes"].astype(np.int64),
+            "shots": sums["shots"].astype(np.int64),
+            "xg": sums["xg"],
+            "goal": sums["goal"] > 0,
+            "start_x": first_x,
+            "max_x": max_x,
+            "seconds": seconds,
+        })[CHAIN_COLUMNS]
+
+        # Player -> chains of the team in possession, with the player's own shot / key pass
+        resolved = resolve_assists(frame)
+        involved = own & frame["player_id"].notna().to_numpy()
+        members = pd.DataFrame({
+            "player_id": frame["player_id"].to_numpy()[involved].astype(np.int64),
+            "player_name": frame["player_name"].to_numpy()[involved],
+            "chain": chain[involved],
+            "shot": is_shot[involved],
+            "key_pass": resolved["key_pass"].to_numpy()[involved],
+        })
+        self.members = (members.groupby(["player_id", "chain"], sort=True)
+                        .agg(player_name=("player_name", "first"), shot=("shot", "any"),
+                             key_pass=("key_pass", "any"))
+                        .reset_index())
+        player = self.members["player_id"].to_numpy()
+        first, last = _block_bounds(player)
+        self._player_rows = dict(zip(player[first].tolist(), zip(first.tolist(), last.tolist())))
+
+    @classmethod
+    def from_matches(cls, match_ids, parser=None, **loader_kwargs):
+        """Build the index straight from ``event_index.load_events``."""
+        return cls(load_events(match_ids, parser=parser, columns=POSSESSION_COLUMNS,
+                               **loader_kwargs))
+
+    def __len__(self):
+        return len(self.chains)
+
+    # ---------------------------
+    # Lookups
+    # ---------------------------
+    def chain_events(self, chain):
+        """Events of one chain (a slice of ``frame``)."""
+        start, stop = self._starts[chain], self.chains.at[chain, "stop"]
+        return self.frame.iloc[start:stop]
+
+    def player_chains(self, player_id):
+        """Membership rows of a player (chain, shot, key_pass), from the offsets."""
+        rows = self._player_rows.get(int(player_id))
+        if rows is None:
+            return self.members.iloc[0:0]
+        return self.members.iloc[rows[0]:rows[1]]
+
+    def chains_for(self, player_id=None, team_id=None, match_ids=None, shot=None, goal=None,
+                   min_passes=None):
+        """Chains matching every given condition.
+
+        Parameters
+        ----------
+        player_id : int, optional
+            Chains the player took part in (as a player of the team in possession).
+        team_id : int, optional
+            Team in possession.
+        match_ids : list of int, optional
+        shot, goal : bool, optional
+            Chains with (True) or without (False) a shot / goal of the team in possession.
+        min_passes : int, optional
+        """
+        chains = self.chains
+        if player_id is not None:
+            chains = chains.iloc[self.player_chains(player_id)["chain"].to_numpy()]
+        keep = np.ones(len(chains), dtype=bool)
+        if team_id is not None:
+            keep &= (chains["team_id"] == team_id).to_numpy()
+        if match_ids is not None:
+            keep &= chains["match_id"].isin(match_ids).to_numpy()
+        if shot is not None:
+            keep &= (chains["shots"] > 0).to_numpy() == shot
+        if goal is not None:
+            keep &= chains["goal"].to_numpy() == goal
+        if min_passes is not None:
+            keep &= (chains["passes"] >= min_passes).to_numpy()
+        return chains[keep]
+
+    def events_of(self, chains):
+        """Events of several chains in one ``take`` (chain order kept)."""
+        if len(chains) == 0:
+            return self.frame.iloc[0:0]
+        starts, lengths = chains["start"].to_numpy(), chains["events"].to_numpy()
+        before = np.cumsum(lengths) - lengths  # rows of the earlier chains in the result
+        rows = np.repeat(starts - before, lengths) + np.arange(lengths.sum())
+        return self.frame.take(rows)
+
+    # ---------------------------
+    # Tournament tables
+    # ---------------------------
+    @timer("possessions.xg_chain")
+    def xg_chain(self, minutes=None, match_ids=None):
+        """xGChain and xGBuildup per player, for all players in one groupby.
+
+        Parameters
+        ----------
+        minutes : pandas.DataFrame, optional
+            ``player_id`` and ``minutes_played`` rows (e.g. ``tournament_minutes``);
+            adds ``minutes_played`` and per-90 rates.
+        match_ids : list of int, optional
+            Limit to chains of these matches.
+
+        Returns
+        -------
+        pandas.DataFrame
+            ``XG_CHAIN_COLUMNS`` (plus per-90 columns), highest xGChain first.
+        """
+        members = self.members
+        if match_ids is not None:
+            in_matches = self.chains["match_id"].isin(match_ids).to_numpy()
+            members = members[in_matches[members["chain"].to_numpy()]]
+        chain = members["chain"].to_numpy()
+        chain_xg = self.chains["xg"].to_numpy()[chain]
+        buildup = ~(members["shot"].to_numpy() | members["key_pass"].to_numpy())
+        values = pd.DataFrame({
+            "chains": 1,
+            "shot_chains": (self.chains["shots"].to_numpy()[chain] > 0).astype(np.int64),
+            "xg_chain": chain_xg,
+            "buildup_chains": buildup.astype(np.int64),
+            "xg_buildup": np.where(buildup, chain_xg, 0.0),
+        })
+        grouped = values.groupby(members["player_id"].to_numpy())
+        table = grouped.sum()
+        table.insert(0, "player_name", members.groupby("player_id")["player_name"].first())
+        table = table.rename_axis("player_id").reset_index()[XG_CHAIN_COLUMNS]
+        if minutes is not None:
+            played = minutes.groupby("player_id")["minutes_played"].sum()
+            table["minutes_played"] = table["player_id"].map(played).fillna(0.0)
+            table["xg_chain_per90"] = per90(table["xg_chain"], table["minutes_played"])
+            table["xg_buildup_per90"] = per90(table["xg_buildup"], table["minutes_played"])
+        return table.sort_values("xg_chain", ascending=False, kind="stable").reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description="Possession chains, xGChain and xGBuildup per player.")
+    cli.add_argument("--competition", type=int, default=55)
+    cli.add_argument("--season", type=int, default=282)
+    cli.add_argument("--player", type=int, default=5204, help="player whose chains to summarise")
+    cli.add_argument("--out", default="xg_chain_per_player.csv")
+    args = cli.parse_args()
+
+    parser = CachedSbopen()
+    match_ids = parser.match(args.competition, args.season)["match_id"].tolist()
+    index = PossessionIndex.from_matches(match_ids, parser=parser)
+    table = index.xg_chain(minutes=tournament_minutes(match_ids, parser=parser))
+    table.to_csv(args.out, index=False)
+    print(table.head(20).round(3).to_string(index=False))
+
+    involved = index.chains_for(args.player)
+    with_shot = index.chains_for(args.player, shot=True)
+    print(f"{len(index)} chains; player {args.player} took part in {len(involved)}, "
+          f"{len(with_shot)} ended in a shot ({with_shot['xg'].sum():.2f} xG, "
+          f"{int(with_shot['goal'].sum())} goals)")
+    print(f"Saved {len(table)} players to '{args.out}'")
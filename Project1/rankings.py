@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+Percentile and peer-ranking service over precomputed distributions.
+
+The bar charts and ``scatter.py`` re-sort the whole peer table for every
+metric on every rerun. ``PeerRankings`` keeps, per position group, minutes
+threshold and metric, the peers' values as one sorted NumPy array. A query
+
+    rankings = PeerRankings.from_partials(load_metrics(match_ids))
+    rankings.percentile(5204, "xa_per90", group="midfielders", min_minutes=360)
+
+is then a dictionary lookup for the player's value and two ``np.searchsorted``
+calls (O(log n)) on the sorted peers. Distributions for the thresholds passed
+to ``precompute`` are built up front; any other threshold is built once on
+first use and cached. ``profile`` returns every metric for one player in one
+call, which ``render_pizza`` / ``render_radar`` draw without recomputing
+anything.
+
+Percentiles use the "mean" convention: the share of peers strictly below the
+value plus half the share of ties, so a group where everybody has zero puts
+every player at the 50th percentile.
+"""
+
+import argparse
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from mplsoccer import PyPizza, Radar
+
+from summary_store import POSITION_GROUPS
+
+MINUTES_COLUMN = "total_minutes_played"
+DEFAULT_THRESHOLDS = (0, 90, 180, 270, 360)
+PROFILE_COLUMNS = ["metric", "value", "percentile", "rank", "peers"]
+RADAR_RANGE = (5, 95)  # radar axes span these peer percentiles
+
+
+class PeerRankings:
+    """Sorted per-metric distributions for several peer groups.
+
+    Parameters
+    ----------
+    tables : dict
+        Group name -> player table with ``player_id``, ``player_name``,
+        ``total_minutes_played`` and one column per metric (the layout of
+        ``metrics.metric_summary`` and the summary CSVs), one row per player.
+    metrics : list of str, optional
+        Metric columns to rank (default: every numeric column except ids and minutes).
+    thresholds : iterable of float
+        Minimum-minutes levels whose distributions are built immediately.
+    """
+
+    def __init__(self, tables, metrics=None, thresholds=DEFAULT_THRESHOLDS):
+        self.groups = {}
+        for group, table in tables.items():
+            table = table.drop_duplicates("player_id").reset_index(drop=True)
+            self.groups[group] = {
+                "table": table,
+                "row": dict(zip(table["player_id"].tolist(), range(len(table)))),
+                "minutes": table[MINUTES_COLUMN].to_numpy(dtype=np.float64),
+            }
+        if metrics is None:
+            first = next(iter(tables.values()))
+            skip = {"player_id", "matches_played", MINUTES_COLUMN, "competition_id", "season_id"}
+            metrics = [column for column in first.columns
+                       if column not in skip and pd.api.types.is_numeric_dtype(first[column])]
+        self.metrics = list(metrics)
+        self._values = {(group, metric): data["table"][metric].to_numpy(dtype=np.float64)
+                        for group, data in self.groups.items() for metric in self.metrics}
+        self._sorted = {}
+        self.precompute(thresholds)
+
+    # ---------------------------
+    # Construction
+    # ---------------------------
+    @classmethod
+    def from_partials(cls, partials, groups=None, metrics=None, thresholds=DEFAULT_THRESHOLDS):
+        """Rankings per position group from ``metrics.load_metrics`` partials."""
+        from metrics import metric_summary
+
+        groups = POSITION_GROUPS if groups is None else groups
+        tables = {group: metric_summary(partials, positions=positions)
+                  for group, positions in groups.items()}
+        if metrics is None:
+            metrics = [column for column in next(iter(tables.values())).columns
+                       if column.endswith("_per90")]
+        return cls(tables, metrics, thresholds)
+
+    @classmethod
+    def from_store(cls, store, groups=None, thresholds=DEFAULT_THRESHOLDS):
+        """Rankings per position group from a ``summary_store.SummaryStore``."""
+        summaries = store.summaries(thresholds=(None,), groups=groups)
+        tables = {group: summary for (group, _), summary in summaries.items()}
+        return cls(tables, thresholds=thresholds)
+
+    @classmethod
+    def from_table(cls, table, group="peers", metrics=None, thresholds=DEFAULT_THRESHOLDS):
+        """Rankings for a single peer table, e.g. a summary CSV."""
+        return cls({group: table}, metrics, thresholds)
+
+    def precompute(self, thresholds):
+        """Build the sorted distributions of every group and metric for ``thresholds``."""
+        for group in self.groups:
+            for min_minutes in thresholds:
+                for metric in self.metrics:
+                    self.distribution(metric, group, min_minutes)
+        return self
+
+    # ---------------------------
+    # Queries
+    # ---------------------------
+    def _group(self, group):
+        if group is None:
+            if len(self.groups) != 1:
+                raise ValueError(f"pass one of the groups {sorted(self.groups)}")
+            group = next(iter(self.groups))
+        if group not in self.groups:
+            raise KeyError(f"unknown group {group!r}; known: {sorted(self.groups)}")
+        return group
+
+    def distribution(self, metric, group=None, min_minutes=0):
+        """Sorted values of ``metric`` among the group's players with at least ``min_minutes``."""
+        group = self._group(group)
+        key = (group, metric, float(min_minutes))
+        values = self._sorted.get(key)
+        if values is None:
+            if metric not in self.metrics:
+                raise KeyError(f"unknown metric {metric!r}; ranked: {self.metrics}")
+            peers = self.groups[group]["minutes"] >= min_minutes
+            values = np.sort(self._values[(group, metric)][peers])
+            self._sorted[key] = values
+        return values
+
+    def value(self, player_id, metric, group=None):
+        """The player's value of ``metric`` in ``group`` (NaN when not in the group)."""
+        group = self._group(group)
+        row = self.groups[group]["row"].get(player_id)
+        return np.nan if row is None else self._values[(group, metric)][row]
+
+    def percentile_of(self, value, metric, group=None, min_minutes=0):
+        """Percentile (0-100) of ``value`` among the peers; NaN without peers."""
+        peers = self.distribution(metric, group, min_minutes)
+        if len(peers) == 0 or np.isnan(value):
+            return np.nan
+        below = np.searchsorted(peers, value, side="left")
+        ties = np.searchsorted(peers, value, side="right") - below
+        return 100.0 * (below + 0.5 * ties) / len(peers)
+
+    def percentile(self, player_id, metric, group=None, min_minutes=0):
+        """Percentile of a player on ``metric`` among peers with at least ``min_minutes``.
+
+        The player does not need to meet the threshold; their value is
+        placed in the threshold's distribution.
+        """
+        return self.percentile_of(self.value(player_id, metric, group), metric, group, min_minutes)
+
+    def rank(self, player_id, metric, group=None, min_minutes=0):
+        """1 + number of peers with a strictly higher value (NaN when not in the group)."""
+        value = self.value(player_id, metric, group)
+        if np.isnan(value):
+            return np.nan
+        peers = self.distribution(metric, group, min_minutes)
+        return int(len(peers) - np.searchsorted(peers, value, side="right") + 1)
+
+    def quantile(self, metric, q, group=None, min_minutes=0):
+        """Value at percentile ``q`` (0-100) of the peers, linear interpolation."""
+        peers = self.distribution(metric, group, min_minutes)
+        return np.percentile(peers, q) if len(peers) else np.nan
+
+    def profile(self, player_id, metrics=None, group=None, min_minutes=0):
+        """One row per metric: the player's value, percentile, rank and number of peers."""
+        metrics = self.metrics if metrics is None else metrics
+        rows = []
+        for metric in metrics:
+            rows.append((metric, self.value(player_id, metric, group),
+                         self.percentile(player_id, metric, group, min_minutes),
+                         self.rank(player_id, metric, group, min_minutes),
+                         len(self.distribution(metric, group, min_minutes))))
+        return pd.DataFrame(rows, columns=PROFILE_COLUMNS)
+
+    def leaderboard(self, metric, group=None, min_minutes=0, top=10):
+        """The ``top`` players of the group on ``metric`` (ties keep table order)."""
+        group = self._group(group)
+        data = self.groups[group]
+        values = self._values[(group, metric)]
+        peers = np.flatnonzero(data["minutes"] >= min_minutes)
+        order = peers[np.argsort(-values[peers], kind="stable")[:top]]
+        table = data["table"].iloc[order][["player_id", "player_name", MINUTES_COLUMN, metric]]
+        return table.reset_index(drop=True)
+
+    def player_name(self, player_id, group=None):
+        group = self._group(group)
+        row = self.groups[group]["row"].get(player_id)
+        return None if row is None else self.groups[group]["table"].at[row, "player_name"]
+
+
+# ---------------------------
+# Charts
+# ---------------------------
+def _label(metric):
+    return metric.replace("_per90", " p90").replace("_", " ").capitalize()
+
+
+def render_pizza(rankings, player_id, metrics=None, group=None, min_minutes=0,
+                 title=None, color="#1A78CF"):
+    """Percentile pizza of one player (slice length = percentile, label = value)."""
+    profile = rankings.profile(player_id, metrics, group, min_minutes).fillna(0)
+    pizza = PyPizza(params=[_label(m) for m in profile["metric"]], min_range=None,
+                    max_range=None, straight_line_color="#F2F2F2", last_circle_lw=1,
+                    other_circle_lw=1, other_circle_ls="-.")
+    fig, ax = pizza.make_pizza(
+        [int(round(p)) for p in profile["percentile"]], figsize=(8, 8.5), param_location=110,
+        slice_colors=[color] * len(profile), value_colors=["white"] * len(profile),
+        value_bck_colors=[color] * len(profile),
+        kwargs_slices=dict(edgecolor="#F2F2F2", zorder=2, linewidth=1),
+        kwargs_params=dict(fontsize=11, va="center"),
+        kwargs_values=dict(fontsize=11, zorder=3,
+                           bbox=dict(edgecolor="#000000", boxstyle="round,pad=0.2", lw=1)))
+    name = rankings.player_name(player_id, group) or str(player_id)
+    if title is None:
+        title = f"{name}: percentile vs peers" + (f" ({min_minutes:g}+ minutes)" if min_minutes else "")
+    fig.text(0.5, 0.97, title,
+             size=15, ha="center", weight="bold")
+    return fig
+
+
+def render_radar(rankings, player_id, metrics=None, group=None, min_minutes=0,
+                 compare_id=None, title=None):
+    """Radar of raw values on axes spanning the peers' 5th-95th percentiles."""
+    profile = rankings.profile(player_id, metrics, group, min_minutes)
+    metrics = profile["metric"].tolist()
+    low = [rankings.quantile(m, RADAR_RANGE[0], group, min_minutes) for m in metrics]
+    high = [rankings.quantile(m, RADAR_RANGE[1], group, min_minutes) for m in metrics]
+    # Radar needs a non-empty range on every axis
+    high = [h if h > lo else lo + 1e-6 for lo, h in zip(low, high)]
+    radar = Radar([_label(m) for m in metrics], low, high, num_rings=4, ring_width=1,
+                  center_circle_radius=1)
+    fig, ax = radar.setup_axis(figsize=(8, 8))
+    radar.draw_circles(ax=ax, facecolor="#f4f4f4", edgecolor="#d0d0d0")
+    values = profile["value"].fillna(0).tolist()
+    if compare_id is None:
+        radar.draw_radar(values, ax=ax, kwargs_radar={"facecolor": "#1A78CF", "alpha": 0.6},
+                         kwargs_rings={"facecolor": "#1A78CF", "alpha": 0.3})
+    else:
+        other = [np.nan_to_num(rankings.value(compare_id, m, group)) for m in metrics]
+        radar.draw_radar_compare(values, other, ax=ax,
+                                 kwargs_radar={"facecolor": "#1A78CF", "alpha": 0.6},
+                                 kwargs_compare={"facecolor": "#D7263D", "alpha": 0.6})
+    radar.draw_range_labels(ax=ax, fontsize=9)
+    radar.draw_param_labels(ax=ax, fontsize=11)
+    names = [rankings.player_name(p, group) or str(p) for p in (player_id, compare_id) if p]
+    ax.set_title(title or " vs ".join(names), fontsize=15, weight="bold")
+    return fig
+
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description="Percentile profile and pizza chart of a player.")
+    cli.add_argument("player_id", type=int)
+    cli.add_argument("--csv", default="euro2024_midfielders_summary_all_minutes.csv",
+                     help="peer table in the summary CSV layout")
+    cli.add_argument("--metrics", nargs="+",
+                     default=["passes_per90", "shot_assists_per90", "goal_assists_per90"])
+    cli.add_argument("--min-minutes", type=float, default=360)
+    cli.add_argument("--compare", type=int, help="second player for the radar chart")
+    cli.add_argument("--out", help="save the pizza (and radar) chart with this file prefix")
+    args = cli.parse_args()
+
+    rankings = PeerRankings.from_table(pd.read_csv(args.csv), metrics=args.metrics)
+    print(rankings.profile(args.player_id, min_minutes=args.min_minutes).round(2)
+          .to_string(index=False))
+    if args.out:
+        fig = render_pizza(rankings, args.player_id, min_minutes=args.min_minutes)
+        fig.savefig(f"{args.out}_pizza.png", dpi=150, bbox_inches="tight")
+        fig = render_radar(rankings, args.player_id, min_minutes=args.min_minutes,
+                           compare_id=args.compare)
+        fig.savefig(f"{args.out}_radar.png", dpi=150, bbox_inches="tight")
+        plt.close("all")
+        print(f"Saved '{args.out}_pizza.png' and '{args.out}_radar.png'")
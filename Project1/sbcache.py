@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""
+On-disk cache in front of the StatsBomb open-data parser.
+
+``CachedSbopen`` is a drop-in replacement for ``Sbopen(dataframe=True)``:
+``parser.match(55, 282)`` and ``parser.event(match_id)`` return the same
+frames, but each match is only downloaded and flattened once. The four event
+frames (events, related, freeze, tactics) are stored as Parquet files under
+
+    <cache_dir>/<competition_id>/<season_id>/<match_id>/
+
+next to a small ``manifest.json`` holding the SHA-256 of the source JSON.
+Tables computed from a match (``parser.derived(match_id, name, build)``, e.g.
+the lineup table) are stored in the same directory and rebuilt only when the
+source hash changes.
+
+Passing ``data_dir`` reads a local copy of the open-data repository
+(``events/<match_id>.json``, ``matches/<competition_id>/<season_id>.json``)
+instead of GitHub, so everything works offline against fixture files.
+
+Invalidation:
+- local files are re-parsed when their size/mtime change *and* their content
+  hash differs from the one stored in the manifest,
+- remote matches are re-fetched when ``last_updated`` in the match listing
+  differs from the value recorded when they were cached
+  (call ``parser.match(..., refresh=True)`` to re-download the listing),
+- everything is rebuilt when ``CACHE_VERSION`` or the mplsoccer version changes.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+import mplsoccer
+import pandas as pd
+import requests
+
+from instrument import count, timer
+
+try:
+    from mplsoccer.soccer.statsbomb import flatten_event, flatten_match
+except ImportError:  # older mplsoccer releases keep the parser at the top level
+    from mplsoccer.statsbomb import flatten_event, flatten_match
+
+# ---------------------------
+# Constants
+# ---------------------------
+OPEN_DATA_URL = "https://raw.githubusercontent.com/statsbomb/open-data/master/data/"
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sbcache")
+CACHE_VERSION = 1
+EVENT_FRAMES = ("events", "related", "freeze", "tactics")
+UNKNOWN_PARTITION = "_"
+# Guards read-modify-write of index.json when one parser is shared by threads
+_INDEX_LOCK = threading.Lock()
+
+
+# ---------------------------
+# Helpers
+# ---------------------------
+def content_hash(raw):
+    """SHA-256 hex digest of the raw source bytes."""
+    return hashlib.sha256(raw).hexdigest()
+
+
+def _tmp_path(path):
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def read_json(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def atomic_write_json(path, data):
+    tmp = _tmp_path(path)
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp, path)
+
+
+def atomic_write_parquet(df, path):
+    # Write to a temporary file first so a crashed or concurrent run never
+    # leaves a half-written frame behind
+    tmp = _tmp_path(path)
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+class CachedSbopen:
+    """Caching wrapper around the StatsBomb open-data parser.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory that holds the Parquet cache.
+    data_dir : str, optional
+        Root of a local open-data checkout. When given, no network is used.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, data_dir=None):
+        self.cache_dir = cache_dir
+        self.data_dir = data_dir
+        self._stamp = {"cache_version": CACHE_VERSION, "mplsoccer": mplsoccer.__version__}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # ---------------------------
+    # Paths and source access
+    # ---------------------------
+    def _partition_dir(self, competition_id, season_id):
+        return os.path.join(self.cache_dir, str(competition_id), str(season_id))
+
+    def _match_dir(self, match_id):
+        competition_id, season_id = self._lookup_partition(match_id)
+        return os.path.join(self._partition_dir(competition_id, season_id), str(match_id))
+
+    def _index_path(self):
+        return os.path.join(self.cache_dir, "index.json")
+
+    def _lookup_partition(self, match_id):
+        index = read_json(self._index_path()) or {}
+        return index.get(str(match_id), (UNKNOWN_PARTITION, UNKNOWN_PARTITION))
+
+    def _record_partition(self, match_ids, competition_id, season_id):
+        new = {str(m_id): [competition_id, season_id] for m_id in match_ids}
+        with _INDEX_LOCK:
+            index = read_json(self._index_path()) or {}
+            if any(index.get(k) != v for k, v in new.items()):
+                index.update(new)
+                atomic_write_json(self._index_path(), index)
+
+    def _source(self, relative):
+        """Return (location, is_local) for a file in the open-data layout."""
+        if self.data_dir is not None:
+            return os.path.join(self.data_dir, *relative.split("/")), True
+        return OPEN_DATA_URL + relative, False
+
+    @staticmethod
+    def _fetch(location, is_local):
+        with timer("sbcache.fetch", local=is_local):
+            if is_local:
+                with open(location, "rb") as f:
+                    raw = f.read()
+            else:
+                resp = requests.get(location)
+                resp.raise_for_status()
+                raw = resp.content
+        count("bytes.read", len(raw))
+        return raw
+
+    # ---------------------------
+    # Matches
+    # ---------------------------
+    @timer("sbcache.match")
+    def match(self, competition_id, season_id, refresh=False):
+        """Match listing for a competition/season (same frame as ``Sbopen.match``)."""
+        part_dir = self._partition_dir(competition_id, season_id)
+        frame_path = os.path.join(part_dir, "matches.parquet")
+        manifest_path = os.path.join(part_dir, "matches.json")
+        location, is_local = self._source(f"matches/{competition_id}/{season_id}.json")
+
+        manifest = read_json(manifest_path)
+        if not refresh and self._is_fresh(manifest, location, is_local, manifest_path):
+            count("cache.hits")
+            return pd.read_parquet(frame_path)
+
+        count("cache.misses")
+        raw = self._fetch(location, is_local)
+        matches = flatten_match(json.loads(raw), dataframe=True)
+        os.makedirs(part_dir, exist_ok=True)
+        atomic_write_parquet(matches, frame_path)
+        atomic_write_json(manifest_path, self._manifest(raw, location, is_local))
+        self._record_partition(matches["match_id"].tolist(), competition_id, season_id)
+        return matches
+
+    def _listing_version(self, match_id):
+        """``last_updated`` of a match according to the cached listing, if any."""
+        competition_id, season_id = self._lookup_partition(match_id)
+        frame_path = os.path.join(self._partition_dir(competition_id, season_id), "matches.parquet")
+        if not os.path.exists(frame_path):
+            return None
+        matches = pd.read_parquet(frame_path, columns=["match_id", "last_updated"])
+        row = matches[matches["match_id"] == match_id]
+        return None if row.empty else str(row["last_updated"].iloc[0])
+
+    # ---------------------------
+    # Events
+    # ---------------------------
+    @timer("sbcache.event")
+    def event(self, match_id, competition_id=None, season_id=None):
+        """Events, related, freeze and tactics frames for one match."""
+        if competition_id is not None and season_id is not None:
+            self._record_partition([match_id], competition_id, season_id)
+        match_dir = self._match_dir(match_id)
+        manifest_path = os.path.join(match_dir, "manifest.json")
+        location, is_local = self._source(f"events/{match_id}.json")
+
+        manifest = read_json(manifest_path)
+        version = None if is_local else self._listing_version(match_id)
+        if self._is_fresh(manifest, location, is_local, manifest_path, version):
+            count("cache.hits")
+            with timer("sbcache.read_parquet", match_id=match_id):
+                frames = tuple(
+                    pd.read_parquet(os.path.join(match_dir, f"{name}.parquet"))
+                    if name in manifest["frames"] else None
+                    for name in EVENT_FRAMES
+                )
+            count("rows.events", len(frames[0]))
+            return frames
+
+        count("cache.misses")
+        raw = self._fetch(location, is_local)
+        if manifest is not None and manifest.get("sha256") == content_hash(raw) \
+                and manifest.get("stamp") == self._stamp:
+            # Listing said the match changed but the content did not
+            manifest["version"] = version
+            atomic_write_json(manifest_path, manifest)
+            return self.event(match_id)
+
+        with timer("sbcache.parse", match_id=match_id):
+            frames = flatten_event(json.loads(raw), match_id, dataframe=True)
+        count("rows.events", len(frames[0]))
+        os.makedirs(match_dir, exist_ok=True)
+        stored = []
+        with timer("sbcache.write_parquet", match_id=match_id):
+            for name, df in zip(EVENT_FRAMES, frames):
+                if df is not None:
+                    atomic_write_parquet(df, os.path.join(match_dir, f"{name}.parquet"))
+                    stored.append(name)
+        new_manifest = self._manifest(raw, location, is_local)
+        new_manifest.update({"frames": stored, "version": version})
+        atomic_write_json(manifest_path, new_manifest)
+        return frames
+
+    def fingerprint(self, match_id):
+        """Content hash of the source JSON a match was cached from (None if not cached)."""
+        manifest = read_json(os.path.join(self._match_dir(match_id), "manifest.json"))
+        return None if manifest is None else manifest["sha256"]
+
+    def is_fresh(self, match_id):
+        """True when the cached frames of a match are up to date (cheap: no parsing)."""
+        match_dir = self._match_dir(match_id)
+        manifest_path = os.path.join(match_dir, "manifest.json")
+        location, is_local = self._source(f"events/{match_id}.json")
+        version = None if is_local else self._listing_version(match_id)
+        return self._is_fresh(read_json(manifest_path), location, is_local, manifest_path, version)
+
+    def derived(self, match_id, name, build, version=1):
+        """A frame computed from a match's events, cached next to them.
+
+        ``build(match_id, df, related, freeze, tactics)`` (a ``load_matches``
+        reducer) runs only when the events changed, the cache stamp changed or
+        ``version`` was bumped; otherwise ``<name>.parquet`` is read back.
+        """
+        frames = None if self.is_fresh(match_id) else self.event(match_id)
+        match_dir = self._match_dir(match_id)
+        frame_path = os.path.join(match_dir, f"{name}.parquet")
+        meta_path = os.path.join(match_dir, f"{name}.json")
+        key = {"sha256": self.fingerprint(match_id), "stamp": self._stamp, "version": version}
+        if read_json(meta_path) == key and os.path.exists(frame_path):
+            count("derived.hits")
+            return pd.read_parquet(frame_path)
+
+        count("derived.misses")
+        frames = self.event(match_id) if frames is None else frames
+        with timer("sbcache.derived", table=name, match_id=match_id):
+            result = build(match_id, *frames)
+        atomic_write_parquet(result, frame_path)
+        atomic_write_json(meta_path, key)
+        return result
+
+    def invalidate(self, match_id):
+        """Drop the cached frames of one match so the next call re-parses it."""
+        manifest_path = os.path.join(self._match_dir(match_id), "manifest.json")
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+
+    # ---------------------------
+    # Manifests
+    # ---------------------------
+    def _manifest(self, raw, location, is_local):
+        manifest = {"sha256": content_hash(raw), "source": location, "stamp": self._stamp}
+        if is_local:
+            stat = os.stat(location)
+            manifest.update({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns})
+        return manifest
+
+    def _is_fresh(self, manifest, location, is_local, manifest_path, version=None):
+        if manifest is None or manifest.get("stamp") != self._stamp:
+            return False
+        if not is_local:
+            # Remote data is only re-fetched when the listing reports a new version
+            return version is None or manifest.get("version") in (None, version)
+        if not os.path.exists(location):
+            # Fixture removed: keep serving what we have
+            return True
+        stat = os.stat(location)
+        if (stat.st_size, stat.st_mtime_ns) == (manifest.get("size"), manifest.get("mtime_ns")):
+            return True
+        with open(location, "rb") as f:
+            if content_hash(f.read()) != manifest["sha256"]:
+                return False
+        # Touched but unchanged: refresh the stat so the fast path hits next time
+        manifest.update({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns})
+        atomic_write_json(manifest_path, manifest)
+        return True
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+Position-spell timeline and interval join.
+
+``target_positions_appearances.csv`` and the ``position_id`` filters in the
+comparison scripts only know a player's position on entry (or the position
+stamped on a single event). A spell is one uninterrupted stretch of a player
+in one position:
+
+    (match, team, player, position, start_minute, end_minute)
+
+Spells start at the player's entry (``lineups.compute_appearances``), change
+at every Tactical Shift that moves the player, and end at the next change or
+at the player's exit. Minutes are on the elapsed match clock
+(``minutes.match_clock``), so spell minutes add up to ``minutes_played``.
+
+``assign_spells`` attributes events to spells with one ``np.searchsorted``
+over sorted (match, player, start) keys instead of a per-player filter, and
+``position_per90`` turns that into per-position totals, minutes and per-90
+rates for a whole tournament in one groupby:
+
+    spells, passes = load_spells(match_ids, type_names=["Pass"])
+    table = position_per90(passes, spells)
+"""
+
+import argparse
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from assists import with_assists
+from instrument import timer
+from lineups import TACTICAL_SHIFT, compute_appearances, lineup_entries
+from match_loader import load_matches
+from minutes import match_clock
+from sbcache import CachedSbopen
+from summary_store import TARGET_POSITIONS, per90
+
+SPELL_COLUMNS = ["match_id", "team_id", "player_id", "player_name", "position_id",
+                 "position_name", "start_minute", "end_minute", "minutes"]
+SPELL_EVENT_COLUMNS = ["match_id", "clock", "player_id", "type_name", "position_id",
+                       "shot_assist", "goal_assist", "assisted_xg"]
+PLAYER_KEY_SPAN = 1 << 32  # StatsBomb player ids stay far below this
+
+# Per-position counts: output column -> boolean mask over the events
+DEFAULT_STATS = {
+    "passes": lambda events: events["type_name"] == "Pass",
+    "shot_assists": lambda events: events["shot_assist"].eq(True),
+    "goal_assists": lambda events: events["goal_assist"].eq(True),
+}
+
+
+# ---------------------------
+# Spells
+# ---------------------------
+@timer("spells.compute_spells")
+def compute_spells(events, tactics, appearances=None):
+    """Position spells of every player in one match, with ``SPELL_COLUMNS``.
+
+    Parameters
+    ----------
+    events, tactics : pandas.DataFrame
+        The first and last frame returned by ``parser.event(match_id)``.
+    appearances : pandas.DataFrame, optional
+        The match's ``lineups.compute_appearances`` table, if already built.
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per spell, ordered by player and start minute.
+    """
+    clock, _ = match_clock(events)
+    if appearances is None:
+        appearances = compute_appearances(events, tactics)
+    players = appearances[["match_id", "team_id", "player_id", "player_name",
+                           "entry_minute", "exit_minute"]]
+
+    # Position changes: the position on entry, then every Tactical Shift lineup
+    # while the player is on the pitch
+    entry = appearances[["player_id", "position_id", "position_name", "entry_minute"]] \
+        .rename(columns={"entry_minute": "start_minute"})
+    entries = lineup_entries(events, tactics, clock)
+    shifts = (entries.loc[entries["type_name"] == TACTICAL_SHIFT,
+                          ["player_id", "position_id", "position_name", "minute"]]
+              .rename(columns={"minute": "start_minute"}))
+    changes = pd.concat([entry, shifts], ignore_index=True).astype(
+        {"player_id": "int64", "position_id": "Int64"})
+    changes = changes.merge(players, on="player_id")
+    on_pitch = ((changes["start_minute"] >= changes["entry_minute"])
+                & ((changes["start_minute"] < changes["exit_minute"])
+                   | (changes["start_minute"] == changes["entry_minute"])))
+    changes = changes[on_pitch]
+    changes = changes.sort_values(["player_id", "start_minute"], kind="stable")
+
+    # A shift that keeps the player in place does not start a new spell
+    same_player = changes["player_id"].eq(changes["player_id"].shift())
+    moved = changes["position_id"].ne(changes["position_id"].shift()).fillna(True)
+    spells = changes[~same_player | moved].copy()
+
+    following = spells["start_minute"].shift(-1)
+    last = spells["player_id"].ne(spells["player_id"].shift(-1))
+    spells["end_minute"] = following.where(~last, spells["exit_minute"])
+    spells["minutes"] = (spells["end_minute"] - spells["start_minute"]).clip(lower=0.0)
+    return spells[SPELL_COLUMNS].reset_index(drop=True)
+
+
+def _match_spells(columns, type_names, match_id, df, related, freeze, tactics):
+    """``load_matches`` reducer: (spells, projected events with their match clock).
+
+    Assists are resolved on the whole match before the event types are
+    filtered, so passes keep their assisted shot's outcome and xG.
+    """
+    if "match_id" not in df.columns:
+        df = df.assign(match_id=match_id)
+    clock, _ = match_clock(df)
+    keep = df["type_name"].isin(type_names) if type_names is not None else slice(None)
+    events = with_assists(df).assign(clock=clock).loc[keep].reindex(columns=columns)
+    return compute_spells(df, tactics), events.reset_index(drop=True)
+
+
+def load_spells(match_ids, parser=None, type_names=None, columns=None, **loader_kwargs):
+    """Spells and the events to attribute to them for many matches.
+
+    Parameters
+    ----------
+    match_ids : iterable of int
+        Matches to load (results keep this order).
+    parser : CachedSbopen, optional
+    type_names : list of str, optional
+        Keep only these event types (default: every event).
+    columns : list of str, optional
+        Event columns to keep, defaults to ``SPELL_EVENT_COLUMNS``; ``clock``
+        is the elapsed match minute needed by ``assign_spells``.
+
+    Returns
+    -------
+    spells, events : pandas.DataFrame
+    """
+    columns = SPELL_EVENT_COLUMNS if columns is None else list(columns)
+    reduce = partial(_match_spells, columns, type_names)
+    results, _ = load_matches(match_ids, reduce, parser=parser, **loader_kwargs)
+    if not results:
+        return pd.DataFrame(columns=SPELL_COLUMNS), pd.DataFrame(columns=columns)
+    spells, events = zip(*results)
+    return pd.concat(spells, ignore_index=True), pd.concat(events, ignore_index=True)
+
+
+# ---------------------------
+# Interval join
+# ---------------------------
+def _pair_keys(match_id, player_id):
+    """One int64 key per (match, player); -1 where the player is missing."""
+    player = pd.Series(player_id).to_numpy(dtype=np.float64, na_value=np.nan)
+    match = pd.Series(match_id).to_numpy(dtype=np.int64)
+    keys = match * PLAYER_KEY_SPAN + np.nan_to_num(player, nan=0).astype(np.int64)
+    return np.where(np.isnan(player), -1, keys)
+
+
+@timer("spells.assign_spells")
+def assign_spells(events, spells, clock="clock"):
+    """Row of ``spells`` each event falls in, or -1.
+
+    Spells are sorted once by (match, player, start minute); every event is
+    then located with a single ``np.searchsorted`` on the same composite key.
+    An event at the exact minute a new spell starts belongs to the new spell;
+    an event at a player's exit minute still belongs to the last spell.
+
+    Parameters
+    ----------
+    events : pandas.DataFrame
+        Needs ``match_id``, ``player_id`` and the elapsed match minute in
+        ``clock`` (see ``load_spells``).
+    spells : pandas.DataFrame
+        ``compute_spells`` / ``load_spells`` output.
+
+    Returns
+    -------
+    numpy.ndarray
+        int64 positional index into ``spells`` per event.
+    """
+    if len(spells) == 0 or len(events) == 0:
+        return np.full(len(events), -1, dtype=np.int64)
+    spell_pairs = _pair_keys(spells["match_id"], spells["player_id"])
+    starts = spells["start_minute"].to_numpy(dtype=np.float64)
+    ends = spells["end_minute"].to_numpy(dtype=np.float64)
+    order = np.lexsort((starts, spell_pairs))
+
+    # Rank the (match, player) pairs so that rank * span + minute is sortable
+    pairs = np.unique(spell_pairs)
+    spell_rank = np.searchsorted(pairs, spell_pairs[order])
+    minutes = events[clock].to_numpy(dtype=np.float64)
+    span = max(ends.max(), np.nanmax(minutes)) + 1.0
+    spell_keys = spell_rank * span + starts[order]
+
+    event_pairs = _pair_keys(events["match_id"], events["player_id"])
+    event_rank = np.minimum(np.searchsorted(pairs, event_pairs), len(pairs) - 1)
+    found = pairs[event_rank] == event_pairs
+    slot = np.searchsorted(spell_keys, event_rank * span + minutes, side="right") - 1
+    slot = np.maximum(slot, 0)
+    valid = (found & (spell_rank[slot] == event_rank)
+             & (minutes >= starts[order][slot]) & (minutes <= ends[order][slot]))
+    return np.where(valid, order[slot], -1)
+
+
+def join_spells(events, spells, clock="clock", columns=("position_id", "position_name")):
+    """``events`` with the spell row and the spell's ``columns`` (prefixed ``spell_``)."""
+    spell = assign_spells(events, spells, clock)
+    joined = events.assign(spell=spell)
+    hit = spell >= 0
+    for column in columns:
+        values = spells[column].to_numpy()
+        joined["spell_" + column] = pd.Series(values[spell[hit]], index=events.index[hit]) \
+            .reindex(events.index).astype(spells[column].dtype)
+    return joined
+
+
+# ---------------------------
+# Per-position stats
+# ---------------------------
+def position_per90(events, spells, stats=None, positions=None, clock="clock"):
+    """Totals, minutes and per-90 rates per (player, position spell position).
+
+    Parameters
+    ----------
+    events, spells : pandas.DataFrame
+        As returned by ``load_spells``.
+    stats : dict, optional
+        Output column -> function of ``events`` returning a boolean mask,
+        defaults to ``DEFAULT_STATS`` (passes, shot and goal assists).
+    positions : list of int, optional
+        Keep only these StatsBomb position ids.
+
+    Returns
+    -------
+    pandas.DataFrame
+        player_id, player_name, position_id, position_name, matches, minutes,
+        one total and one ``<stat>_per90`` column per stat.
+    """
+    stats = DEFAULT_STATS if stats is None else stats
+    spell = assign_spells(events, spells, clock)
+    hit = spell >= 0
+    counts = pd.DataFrame({name: np.asarray(mask(events), dtype=bool)[hit]
+                           for name, mask in stats.items()})
+    counts = counts.groupby(spell[hit]).sum().reindex(range(len(spells)), fill_value=0)
+
+    per_spell = pd.concat([spells.reset_index(drop=True), counts], axis=1)
+    if positions is not None:
+        per_spell = per_spell[per_spell["position_id"].isin(positions)]
+    grouped = per_spell.groupby(["player_id", "player_name", "position_id", "position_name"])
+    table = grouped.agg(matches=("match_id", "nunique"), minutes=("minutes", "sum"),
+                        **{name: (name, "sum") for name in stats}).reset_index()
+    for name in stats:
+        table[name] = table[name].astype("int64")
+        table[name + "_per90"] = per90(table[name], table["minutes"])
+    table["minutes"] = table["minutes"].round(2)
+    return table.sort_values("minutes", ascending=False, kind="stable").reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description="Per-position per-90 passing from position spells.")
+    cli.add_argument("--competition", type=int, default=55)
+    cli.add_argument("--season", type=int, default=282)
+    cli.add_argument("--positions", type=int, nargs="+", default=TARGET_POSITIONS)
+    cli.add_argument("--out", default="position_spells_per90.csv")
+    args = cli.parse_args()
+
+    parser = CachedSbopen()
+    matches = parser.match(args.competition, args.season)
+    spells, passes = load_spells(matches["match_id"].tolist(), parser=parser, type_names=["Pass"])
+    table = position_per90(passes, spells, positions=args.positions)
+    table.to_csv(args.out, index=False)
+    print(table.head(20).to_string(index=False))
+    print(f"Saved {len(table)} player/position rows to '{args.out}'")
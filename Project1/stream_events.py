@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming StatsBomb event parser with column projection and row filters.
+
+``Sbopen.event`` / ``CachedSbopen.event`` flatten every nested field of every
+event into four DataFrames, even when a script only needs a handful of
+columns of one player's passes. ``read_events`` instead
+
+- reads the event file in chunks and decodes one event object at a time
+  (``json.JSONDecoder.raw_decode``), so the whole JSON document and the full
+  list of event dicts never exist at once,
+- drops events that fail the row filters (player, event type, position or a
+  custom predicate) before anything is extracted,
+- writes the projected fields straight into preallocated typed numpy arrays
+  (grown by doubling), one slot per kept event.
+
+    passes = read_events("open-data/data/events/3942349.json",
+                         columns=["player_id", "x", "y", "end_x", "end_y", "pass_shot_assist"],
+                         player_ids=[5204], type_names=["Pass"])
+
+Column names and values follow the flattened ``Sbopen`` frames (ids as floats
+with NaN when missing, merged ``outcome_name`` / ``end_x`` / ``end_y``) except
+that coordinates and xG are ``float32`` and flags are ``bool`` (False when
+missing); see ``FIELDS`` for what can be projected.
+"""
+
+import io
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import requests
+
+from sbcache import OPEN_DATA_URL
+
+# Sub-event objects that carry an outcome / an end location
+OUTCOME_KEYS = ("pass", "shot", "dribble", "duel", "interception", "goalkeeper",
+                "ball_receipt", "50_50", "substitution")
+END_LOCATION_KEYS = ("pass", "carry", "shot", "goalkeeper")
+
+
+def _alternatives(keys, *path):
+    return tuple((key,) + path for key in keys)
+
+
+# column -> (dtype, paths tried in order)
+FIELDS = {
+    "id": (object, (("id",),)),
+    "index": (np.int32, (("index",),)),
+    "period": (np.int8, (("period",),)),
+    "timestamp": (object, (("timestamp",),)),
+    "minute": (np.int16, (("minute",),)),
+    "second": (np.int16, (("second",),)),
+    "possession": (np.int32, (("possession",),)),
+    "type_id": (np.int16, (("type", "id"),)),
+    "type_name": (object, (("type", "name"),)),
+    "possession_team_id": (np.int64, (("possession_team", "id"),)),
+    "team_id": (np.int64, (("team", "id"),)),
+    "team_name": (object, (("team", "name"),)),
+    "player_id": (np.float64, (("player", "id"),)),
+    "player_name": (object, (("player", "name"),)),
+    "position_id": (np.float64, (("position", "id"),)),
+    "position_name": (object, (("position", "name"),)),
+    "x": (np.float32, (("location", 0),)),
+    "y": (np.float32, (("location", 1),)),
+    "end_x": (np.float32, _alternatives(END_LOCATION_KEYS, "end_location", 0)),
+    "end_y": (np.float32, _alternatives(END_LOCATION_KEYS, "end_location", 1)),
+    "outcome_name": (object, _alternatives(OUTCOME_KEYS, "outcome", "name")),
+    "under_pressure": (np.bool_, (("under_pressure",),)),
+    "pass_recipient_id": (np.float64, (("pass", "recipient", "id"),)),
+    "pass_recipient_name": (object, (("pass", "recipient", "name"),)),
+    "pass_assisted_shot_id": (object, (("pass", "assisted_shot_id"),)),
+    "pass_shot_assist": (np.bool_, (("pass", "shot_assist"),)),
+    "pass_goal_assist": (np.bool_, (("pass", "goal_assist"),)),
+    "shot_statsbomb_xg": (np.float32, (("shot", "statsbomb_xg"),)),
+    "shot_key_pass_id": (object, (("shot", "key_pass_id"),)),
+    "substitution_replacement_id": (np.float64, (("substitution", "replacement", "id"),)),
+}
+DEFAULT_COLUMNS = ["id", "index", "period", "minute", "second", "type_name", "team_name",
+                   "player_id", "player_name", "position_id", "x", "y", "end_x", "end_y",
+                   "outcome_name"]
+CHUNK_SIZE = 1 << 18
+_SEPARATORS = re.compile(r"[\s,\[]*")
+
+
+# ---------------------------
+# Streaming
+# ---------------------------
+def iter_events(fp, chunk_size=CHUNK_SIZE):
+    """Yield the event dicts of a JSON array from a text file object, one at a time."""
+    decoder = json.JSONDecoder()
+    buf, pos = "", 0
+    for chunk in iter(lambda: fp.read(chunk_size), ""):
+        buf, pos = buf[pos:] + chunk, 0
+        while True:
+            pos = _SEPARATORS.match(buf, pos).end()
+            if pos >= len(buf) or buf[pos] == "]":
+                break
+            try:
+                event, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # object continues in the next chunk
+            yield event
+            pos = end
+    rest = buf[pos:].strip()
+    if rest not in ("", "]"):
+        raise ValueError(f"truncated or malformed event file near {rest[:40]!r}")
+
+
+def _get(event, paths):
+    for path in paths:
+        value = event
+        for key in path:
+            if isinstance(value, dict):
+                value = value.get(key)
+            elif isinstance(value, list) and isinstance(key, int) and key < len(value):
+                value = value[key]
+            else:
+                value = None
+            if value is None:
+                break
+        if value is not None:
+            return value
+    return None
+
+
+def _empty(dtype, size):
+    if dtype is object:
+        return np.full(size, None, dtype=object)
+    if np.dtype(dtype).kind == "f":
+        return np.full(size, np.nan, dtype=dtype)
+    return np.zeros(size, dtype=dtype)
+
+
+def _filter(player_ids=None, type_names=None, position_ids=None, where=None):
+    """Row predicate on the raw event dict, or None when nothing is filtered."""
+    checks = []
+    if player_ids is not None:
+        players = set(int(pid) for pid in player_ids)
+        checks.append(lambda e: (e.get("player") or {}).get("id") in players)
+    if type_names is not None:
+        types = set(type_names)
+        checks.append(lambda e: e["type"]["name"].rstrip("*") in types)
+    if position_ids is not None:
+        positions = set(int(pos) for pos in position_ids)
+        checks.append(lambda e: (e.get("position") or {}).get("id") in positions)
+    if where is not None:
+        checks.append(where)
+    if not checks:
+        return None
+    return lambda e: all(check(e) for check in checks)
+
+
+def parse_events(fp, columns=None, player_ids=None, type_names=None, position_ids=None,
+                 where=None, capacity=1024, chunk_size=CHUNK_SIZE):
+    """Typed column arrays of the events in ``fp`` that pass the filters.
+
+    Parameters
+    ----------
+    fp : file object
+        Text-mode StatsBomb event file (a JSON array of events).
+    columns : list of str, optional
+        Keys of ``FIELDS`` to extract, defaults to ``DEFAULT_COLUMNS``.
+    player_ids, type_names, position_ids : iterable, optional
+        Keep only events of these players / event types / positions.
+    where : callable, optional
+        Extra predicate on the raw event dict.
+    capacity : int
+        Initial array length; arrays double when full.
+
+    Returns
+    -------
+    dict
+        Column name -> numpy array, all of the same length.
+    """
+    columns = DEFAULT_COLUMNS if columns is None else list(columns)
+    unknown = [c for c in columns if c not in FIELDS]
+    if unknown:
+        raise ValueError(f"unknown columns {unknown}, expected some of {list(FIELDS)}")
+    specs = [(column, FIELDS[column][0], FIELDS[column][1]) for column in columns]
+    keep = _filter(player_ids, type_names, position_ids, where)
+
+    arrays = {column: _empty(dtype, capacity) for column, dtype, _ in specs}
+    n = 0
+    for event in iter_events(fp, chunk_size):
+        if keep is not None and not keep(event):
+            continue
+        if n == capacity:
+            capacity *= 2
+            for column, dtype, _ in specs:
+                grown = _empty(dtype, capacity)
+                grown[:n] = arrays[column]
+                arrays[column] = grown
+        for column, _, paths in specs:
+            value = _get(event, paths)
+            if value is not None:
+                arrays[column][n] = value
+        n += 1
+    return {column: array[:n] for column, array in arrays.items()}
+
+
+def read_events(source, columns=None, player_ids=None, type_names=None, position_ids=None,
+                where=None, match_id=None):
+    """Projected, filtered events of one match as a DataFrame.
+
+    ``source`` is a local event file path or an open text file object. The
+    initial array size is estimated from the file size. ``match_id`` adds a
+    constant ``match_id`` column.
+    """
+    filters = dict(player_ids=player_ids, type_names=type_names,
+                   position_ids=position_ids, where=where)
+    if isinstance(source, (str, os.PathLike)):
+        # Typical StatsBomb events take 600-1000 bytes of JSON
+        capacity = max(64, os.path.getsize(source) // 600)
+        if any(value is not None for value in filters.values()):
+            capacity = max(64, capacity // 16)
+        with open(source, encoding="utf-8") as fp:
+            arrays = parse_events(fp, columns, capacity=capacity, **filters)
+    else:
+        arrays = parse_events(source, columns, **filters)
+    events = pd.DataFrame(arrays)
+    if "type_name" in events.columns:
+        events["type_name"] = events["type_name"].str.rstrip("*")  # "Ball Receipt*" as in Sbopen
+    if "timestamp" in events.columns:
+        # Same datetime.time values as the flattened Sbopen frames
+        events["timestamp"] = pd.to_datetime(events["timestamp"], format="%H:%M:%S.%f").dt.time
+    if match_id is not None:
+        events["match_id"] = match_id
+    return events
+
+
+def read_match_events(match_id, columns=None, data_dir=None, **filters):
+    """``read_events`` for a match id, from a local open-data checkout or the open-data URL."""
+    if data_dir is not None:
+        return read_events(os.path.join(data_dir, "events", f"{match_id}.json"), columns,
+                           match_id=match_id, **filters)
+    resp = requests.get(f"{OPEN_DATA_URL}events/{match_id}.json")
+    resp.raise_for_status()
+    return read_events(io.StringIO(resp.content.decode("utf-8")), columns,
+                       match_id=match_id, **filters)
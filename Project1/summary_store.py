@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental per-(player, match) store behind the midfielder summary CSVs.
+
+Every ingested match is reduced once to partial stats per player (minutes,
+passes, shot assists, goal assists) plus the positions the player appeared in.
+The partials live as Parquet next to the event cache, together with the
+content hash of each match they were built from. ``update`` only loads matches
+that are new or whose source changed, so during a tournament a rebuild after a
+matchday is a small delta, and any minutes threshold / position filter /
+per-90 table is computed from the stored partials without touching events.
+"""
+
+import os
+
+import pandas as pd
+
+from assists import resolve_assists
+from instrument import timer
+from match_loader import load_matches
+from minutes import compute_minutes_played
+from sbcache import DEFAULT_CACHE_DIR, atomic_write_json, atomic_write_parquet, read_json
+
+DEFAULT_STORE_DIR = os.path.join(DEFAULT_CACHE_DIR, "summary")
+TARGET_POSITIONS = [9, 11, 19]  # Right/left defensive midfield, centre attacking midfield
+
+# StatsBomb position ids per peer group
+POSITION_GROUPS = {
+    "midfielders": TARGET_POSITIONS,
+    "defensive_midfielders": [9, 10, 11],
+    "central_midfielders": [13, 14, 15],
+    "attacking_midfielders": [18, 19, 20],
+    "wide_midfielders": [12, 16],
+    "wingers": [17, 21],
+    "forwards": [22, 23, 24, 25],
+    "full_backs": [2, 6, 7, 8],
+    "centre_backs": [3, 4, 5],
+}
+
+# Bump when ``match_partials`` changes what it stores; the store then re-ingests every match
+PARTIALS_VERSION = 2
+PARTIAL_DTYPES = {"match_id": "int64", "player_id": "int64", "player_name": "str",
+                  "team_name": "str", "minutes_played": "float64", "passes": "int64",
+                  "shot_assists": "int64", "goal_assists": "int64"}
+POSITION_DTYPES = {"match_id": "int64", "player_id": "int64", "position_id": "int64"}
+PARTIAL_COLUMNS = list(PARTIAL_DTYPES)
+POSITION_COLUMNS = list(POSITION_DTYPES)
+SUMMARY_COLUMNS = ["player_id", "player_name", "matches_played", "total_minutes_played",
+                   "total_passes", "passes_per90", "total_shot_assists", "total_goal_assists",
+                   "shot_assists_per90", "goal_assists_per90"]
+
+
+# ---------------------------
+# Per-match reduction
+# ---------------------------
+@timer("summary_store.match_partials")
+def match_partials(match_id, df, related, freeze, tactics):
+    """``load_matches`` reducer: (partials, positions) frames for one match."""
+    minutes = compute_minutes_played(df, tactics).set_index("player_id")
+    on_ball = df[df["player_id"].notna()]
+    passes = on_ball[on_ball["type_name"] == "Pass"]
+    assists = resolve_assists(on_ball).loc[passes.index]
+
+    names = on_ball.groupby("player_id")[["player_name", "team_name"]].first()
+    partials = pd.DataFrame({
+        "player_name": names["player_name"].combine_first(minutes["player_name"]),
+        "team_name": names["team_name"].combine_first(minutes["team_name"]),
+        "minutes_played": minutes["minutes_played"],
+        "passes": passes.groupby("player_id").size(),
+        "shot_assists": assists["shot_assist"].groupby(passes["player_id"]).sum(),
+        "goal_assists": assists["goal_assist"].groupby(passes["player_id"]).sum(),
+    })
+    counts = ["minutes_played", "passes", "shot_assists", "goal_assists"]
+    partials[counts] = partials[counts].fillna(0)
+    partials = partials.rename_axis("player_id").reset_index()
+    partials["player_id"] = partials["player_id"].astype("int64")
+    partials["match_id"] = match_id
+
+    positions = (on_ball[["player_id", "position_id"]].dropna()
+                 .drop_duplicates().astype("int64"))
+    positions["match_id"] = match_id
+    return partials[PARTIAL_COLUMNS].astype(PARTIAL_DTYPES), positions[POSITION_COLUMNS]
+
+
+# ---------------------------
+# Summary tables
+# ---------------------------
+def per90(total, minutes):
+    """Per-90 rate rounded like the published CSVs (0 when no minutes)."""
+    return (total / minutes * 90).where(minutes > 0, 0).round(2)
+
+
+def _aggregate(partials):
+    """Totals and per-90 rates per player; ``total_minutes`` is kept unrounded for filtering."""
+    grouped = partials.groupby("player_id", sort=False)
+    summary = pd.DataFrame({
+        "player_name": grouped["player_name"].first(),
+        "matches_played": grouped.size(),
+        "total_minutes": grouped["minutes_played"].sum(),
+        "total_passes": grouped["passes"].sum().astype("int64"),
+        "total_shot_assists": grouped["shot_assists"].sum().astype("int64"),
+        "total_goal_assists": grouped["goal_assists"].sum().astype("int64"),
+    }).reset_index()
+    summary["total_minutes_played"] = summary["total_minutes"].round(2)
+    summary["passes_per90"] = per90(summary["total_passes"], summary["total_minutes"])
+    summary["shot_assists_per90"] = per90(summary["total_shot_assists"], summary["total_minutes"])
+    summary["goal_assists_per90"] = per90(summary["total_goal_assists"], summary["total_minutes"])
+    return summary
+
+
+def _threshold(aggregated, min_minutes):
+    if min_minutes is not None:
+        aggregated = aggregated[aggregated["total_minutes"] > min_minutes]
+    return aggregated[SUMMARY_COLUMNS].reset_index(drop=True)
+
+
+@timer("summary_store.summarise")
+def summarise(partials, min_minutes=360):
+    """Player summary (the CSV layout) from partial rows.
+
+    Keeps players with more than ``min_minutes`` in total; ``None`` keeps everyone.
+    """
+    return _threshold(_aggregate(partials), min_minutes)
+
+
+def threshold_suffix(min_minutes):
+    """File-name suffix used for a minutes threshold (``360plus``, ``all_minutes``)."""
+    return "all_minutes" if min_minutes is None else f"{min_minutes}plus"
+
+
+def write_summaries(summaries, out_dir=".", template="euro2024_{group}_summary_{suffix}.csv"):
+    """Write every (group, threshold) table from ``build_summaries``; returns the paths."""
+    paths = []
+    for (group, min_minutes), summary in summaries.items():
+        path = os.path.join(out_dir, template.format(group=group,
+                                                     suffix=threshold_suffix(min_minutes)))
+        summary.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+class SummaryStore:
+    """Partial stats per (player, match), updated incrementally.
+
+    Parameters
+    ----------
+    path : str
+        Directory holding ``partials.parquet``, ``positions.parquet`` and
+        ``ingested.json`` (``PARTIALS_VERSION`` and match id -> content hash).
+        A store written by another ``PARTIALS_VERSION`` is treated as empty,
+        so the next ``update`` re-ingests every match.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_DIR):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        state = read_json(self._file("ingested.json")) or {}
+        current = state.get("version") == PARTIALS_VERSION
+        self.ingested = state.get("matches", {}) if current else {}
+        self.partials = self._read("partials.parquet", PARTIAL_DTYPES, current)
+        self.positions = self._read("positions.parquet", POSITION_DTYPES, current)
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _read(self, name, dtypes, current=True):
+        # Empty frames keep the column dtypes, so concatenating new partials stays numeric
+        path = self._file(name)
+        if current and os.path.exists(path):
+            return pd.read_parquet(path).astype(dtypes)
+        return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in dtypes.items()})
+
+    def pending(self, parser, match_ids):
+        """Matches that are not ingested yet or whose source changed since."""
+        return [
+            m_id for m_id in match_ids
+            if str(m_id) not in self.ingested
+            or not parser.is_fresh(m_id)
+            or parser.fingerprint(m_id) != self.ingested[str(m_id)]
+        ]
+
+    def update(self, parser, match_ids, **loader_kwargs):
+        """Fold new or changed matches into the store.
+
+        Returns ``(pending, done)``: the ids that needed ingesting (see
+        ``pending``) and, of those, the ones that loaded successfully.
+        """
+        todo = self.pending(parser, match_ids)
+        if not todo:
+            return todo, []
+        results, report = load_matches(todo, match_partials, parser=parser, **loader_kwargs)
+        done = report.loc[report["ok"], "match_id"].tolist()
+
+        keep_partials = ~self.partials["match_id"].isin(done)
+        keep_positions = ~self.positions["match_id"].isin(done)
+        self.partials = pd.concat(
+            [self.partials[keep_partials]] + [partials for partials, _ in results],
+            ignore_index=True)
+        self.positions = pd.concat(
+            [self.positions[keep_positions]] + [positions for _, positions in results],
+            ignore_index=True)
+        for m_id in done:
+            self.ingested[str(m_id)] = parser.fingerprint(m_id)
+
+        atomic_write_parquet(self.partials, self._file("partials.parquet"))
+        atomic_write_parquet(self.positions, self._file("positions.parquet"))
+        atomic_write_json(self._file("ingested.json"),
+                          {"version": PARTIALS_VERSION, "matches": self.ingested})
+        return todo, done
+
+    def partials_for(self, positions=None, match_ids=None):
+        """Partial rows, optionally limited to matches where the player appeared in ``positions``."""
+        partials = self.partials
+        if match_ids is not None:
+            partials = partials[partials["match_id"].isin(match_ids)]
+        if positions is not None:
+            played = self.positions[self.positions["position_id"].isin(positions)]
+            pairs = played[["match_id", "player_id"]].drop_duplicates()
+            partials = partials.merge(pairs, on=["match_id", "player_id"])
+        return partials
+
+    def summary(self, min_minutes=360, positions=TARGET_POSITIONS, match_ids=None):
+        """Summary table (CSV layout) straight from the stored partials."""
+        return summarise(self.partials_for(positions, match_ids), min_minutes)
+
+    def summaries(self, thresholds=(360,), groups=None, match_ids=None):
+        """Every requested (group, threshold) table from one aggregation per group.
+
+        Parameters
+        ----------
+        thresholds : list of int or None
+            Minimum total minutes (exclusive); ``None`` keeps every player.
+        groups : dict, optional
+            Group name -> StatsBomb position ids, defaults to ``POSITION_GROUPS``.
+
+        Returns
+        -------
+        dict
+            ``(group, threshold) -> summary DataFrame``.
+        """
+        groups = POSITION_GROUPS if groups is None else groups
+        summaries = {}
+        for group, positions in groups.items():
+            aggregated = _aggregate(self.partials_for(positions, match_ids))
+            for min_minutes in thresholds:
+                summaries[(group, min_minutes)] = _threshold(aggregated, min_minutes)
+        return summaries
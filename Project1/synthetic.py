@@ -0,0 +1,547 @@
+# -*- coding: utf-8 -*-
+"""
+Seedable synthetic tournaments in the StatsBomb open-data layout.
+
+The project only has one real 51-match tournament. This module generates any
+number of matches with the structure and the rough statistics of real
+StatsBomb data, so every pipeline can be measured offline at scale:
+
+- formations (4-3-3, 4-2-3-1, 4-4-2, 3-5-2, 3-4-3) with StatsBomb position ids,
+- possessions of Pass -> Ball Receipt* -> Carry chains that move up the pitch,
+  with position-weighted involvement, forward-biased pass angles, gamma pass
+  lengths and a completion rate that drops in the final third,
+- shots from the final third with a distance- and angle-based xG, goals drawn
+  from the xG, key passes flagged as shot / goal assists (shots after a carry
+  are unassisted),
+- 3-5 substitutions per team in the second half, occasional tactical shifts
+  and red cards, and lineup files with each player's position history.
+
+``write_tournament`` writes the same three folders as the open-data repository
+(``matches/``, ``events/``, ``lineups/``), in parallel when asked, so
+``CachedSbopen(data_dir=...)``, ``stream_events`` and ``async_loader`` read it
+like a checkout. ``SyntheticSbopen`` skips the files: it is a ``CachedSbopen``
+whose source is the generator, so ``load_matches``, ``derived`` tables and the
+cache layout work unchanged. The same seed always gives the same data; a
+match only depends on the seed, its match id and its two teams.
+
+    python synthetic.py ../synthetic --matches 5000 --workers 8
+    python synthetic.py ../synthetic --events 10000000
+
+    parser = SyntheticSbopen(n_matches=500, seed=1)
+    match_ids = parser.match(COMPETITION_ID, SEASON_ID)["match_id"].tolist()
+    partials, report = load_matches(match_ids, match_partials, parser=parser)
+"""
+
+import argparse
+import datetime
+import json
+import math
+import os
+import random
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from sbcache import DEFAULT_CACHE_DIR, CachedSbopen, read_json
+
+GENERATOR_VERSION = 3
+COMPETITION_ID = 55
+SEASON_ID = 282
+FIRST_MATCH_ID = 3_900_000
+FIRST_TEAM_ID = 900
+FIRST_PLAYER_ID = 100_000
+FIRST_MATCH_DATE = datetime.date(2024, 6, 14)
+SQUAD_SIZE = 26
+EVENTS_PER_MATCH = 2050  # average of generated matches, used to size by events
+
+TYPE_IDS = {"Pass": 30, "Ball Receipt*": 42, "Carry": 43, "Shot": 16, "Foul Committed": 22,
+            "Starting XI": 35, "Substitution": 19, "Half Start": 18, "Half End": 34,
+            "Tactical Shift": 36}
+POSITIONS = {1: "Goalkeeper", 2: "Right Back", 3: "Right Center Back", 4: "Center Back",
+             5: "Left Center Back", 6: "Left Back", 7: "Right Wing Back", 8: "Left Wing Back",
+             9: "Right Defensive Midfield", 10: "Center Defensive Midfield",
+             11: "Left Defensive Midfield", 12: "Right Midfield", 13: "Right Center Midfield",
+             14: "Center Midfield", 15: "Left Center Midfield", 16: "Left Midfield",
+             17: "Right Wing", 18: "Right Attacking Midfield", 19: "Center Attacking Midfield",
+             20: "Left Attacking Midfield", 21: "Left Wing", 22: "Right Center Forward",
+             23: "Center Forward", 24: "Left Center Forward", 25: "Secondary Striker"}
+FORMATIONS = {
+    433: [1, 2, 3, 5, 6, 10, 13, 15, 17, 21, 23],
+    4231: [1, 2, 3, 5, 6, 9, 11, 17, 19, 21, 23],
+    442: [1, 2, 3, 5, 6, 12, 13, 15, 16, 22, 24],
+    352: [1, 3, 4, 5, 7, 13, 10, 15, 8, 22, 24],
+    343: [1, 3, 4, 5, 12, 13, 15, 16, 17, 23, 21],
+}
+BENCH = [1, 1, 3, 5, 2, 6, 13, 15, 19, 17, 21, 23, 23, 14, 10]
+# Relative share of a team's passes by position
+INVOLVEMENT = {1: 0.5, 2: 1.0, 3: 1.3, 4: 1.3, 5: 1.3, 6: 1.0, 7: 1.0, 8: 1.0, 9: 1.4, 10: 1.5,
+               11: 1.4, 12: 0.9, 13: 1.4, 14: 1.4, 15: 1.4, 16: 0.9, 17: 0.8, 18: 1.1, 19: 1.1,
+               20: 1.1, 21: 0.8, 22: 0.6, 23: 0.6, 24: 0.6, 25: 0.7}
+PLAY_PATTERNS = [((1, "Regular Play"), 0.55), ((4, "From Throw In"), 0.17),
+                 ((3, "From Free Kick"), 0.1), ((7, "From Goal Kick"), 0.07),
+                 ((2, "From Corner"), 0.05), ((5, "Other"), 0.04), ((9, "From Kick Off"), 0.02)]
+PERIOD_SECONDS = 2700.0
+PASS_SECONDS = (1.5, 4.5)
+POSSESSION_GAP = (2.0, 14.0)
+
+
+def _timestamp(seconds):
+    millis = int(round(seconds * 1000))
+    seconds, millis = divmod(millis, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}.{millis:03d}"
+
+
+def _ref(id_, name):
+    return {"id": id_, "name": name}
+
+
+def _clip(value, low, high):
+    return min(high, max(low, value))
+
+
+def expected_goals(x, y):
+    """Distance- and angle-based xG of a shot from (x, y) at the goal on x = 120."""
+    distance = math.hypot(120.0 - x, 40.0 - y)
+    # Angle between the posts (y = 36 and 44) as seen from the shot
+    angle = abs(math.atan2(44.0 - y, 120.0 - x) - math.atan2(36.0 - y, 120.0 - x))
+    return _clip(1.0 / (1.0 + math.exp(1.1 + 0.11 * distance - 1.6 * angle)), 0.01, 0.95)
+
+
+# ---------------------------
+# Teams and fixtures
+# ---------------------------
+def make_teams(n_teams, seed=0):
+    """``n_teams`` squads: (team_id, team_name, formation, [(player_id, name, position_id), ...]).
+
+    The first eleven of a squad start, in the positions of the formation.
+    """
+    rng = random.Random(f"{seed}/teams")
+    teams = []
+    for t in range(n_teams):
+        team_id = FIRST_TEAM_ID + t
+        formation = rng.choice(sorted(FORMATIONS))
+        positions = FORMATIONS[formation] + BENCH[:SQUAD_SIZE - 11]
+        squad = [(FIRST_PLAYER_ID + t * 100 + k, f"Player {team_id}-{k + 1}", position)
+                 for k, position in enumerate(positions)]
+        teams.append((team_id, f"Team {t + 1}", formation, squad))
+    return teams
+
+
+def fixtures(n_matches, n_teams, seed=0):
+    """(home, away) team indices: round-robin cycles in a seeded order.
+
+    Pairs are generated in order, so the first k fixtures do not depend on
+    ``n_matches``.
+    """
+    rng = random.Random(f"{seed}/fixtures")
+    order = list(range(n_teams))
+    pairs = []
+    while len(pairs) < n_matches:
+        rng.shuffle(order)
+        # Circle method: every team meets every other team once per cycle
+        ring = order[:]
+        for _ in range(n_teams - 1):
+            for i in range(n_teams // 2):
+                a, b = ring[i], ring[-1 - i]
+                pairs.append((a, b) if rng.random() < 0.5 else (b, a))
+            ring = [ring[0], ring[-1]] + ring[1:-1]
+    return pairs[:n_matches]
+
+
+# ---------------------------
+# One match
+# ---------------------------
+class _MatchWriter:
+    """Builds the events and the lineup position histories of one match."""
+
+    def __init__(self, rng, home, away):
+        self.rng = rng
+        self.teams = (home, away)
+        self.events = []
+        self.possession = 0
+        self.possession_team = home  # team in control of the current possession
+        self.on_pitch = {}      # team id -> {player id: (player, position id)}
+        self.used = set()       # substitutes who came on
+        self.history = {}       # player id -> position spells for the lineup file
+        self.jersey = {}
+        self.goals = {home[0]: 0, away[0]: 0}
+
+    def add(self, period, seconds, type_name, team, player=None, position_id=None,
+            location=None, play_pattern=(1, "Regular Play"), **extra):
+        event = {
+            "id": str(uuid.UUID(int=self.rng.getrandbits(128))),
+            "index": len(self.events) + 1,
+            "period": period,
+            "timestamp": _timestamp(seconds),
+            "minute": int(seconds // 60) + 45 * (period - 1),
+            "second": int(seconds % 60),
+            "type": _ref(TYPE_IDS[type_name], type_name),
+            "possession": max(self.possession, 1),
+            "possession_team": _ref(self.possession_team[0], self.possession_team[1]),
+            "play_pattern": _ref(*play_pattern),
+            "team": _ref(team[0], team[1]),
+        }
+        if player is not None:
+            event["player"] = _ref(player[0], player[1])
+            event["position"] = _ref(position_id, POSITIONS[position_id])
+        if location is not None:
+            event["location"] = [round(v, 1) for v in location]
+        event.update(extra)
+        self.events.append(event)
+        return event
+
+    def lineup(self, team):
+        return {"formation": team[2], "lineup": [
+            {"player": _ref(p[0], p[1]), "position": _ref(pos, POSITIONS[pos]),
+             "jersey_number": self.jersey[p[0]]}
+            for p, pos in self.on_pitch[team[0]].values()]}
+
+    # Lineup position histories ("MM:SS" on the match clock, like the open data)
+    @staticmethod
+    def _clock(period, seconds):
+        minute, second = divmod(int(seconds) + int(PERIOD_SECONDS) * (period - 1), 60)
+        return f"{minute:02d}:{second:02d}"
+
+    def open_spell(self, player_id, position, period, seconds, reason):
+        self.history.setdefault(player_id, []).append({
+            "position_id": position, "position": POSITIONS[position],
+            "from": self._clock(period, seconds), "to": None, "from_period": period,
+            "to_period": None, "start_reason": reason, "end_reason": None})
+
+    def close_spell(self, player_id, period, seconds, reason):
+        self.history[player_id][-1].update({"to": self._clock(period, seconds),
+                                            "to_period": period, "end_reason": reason})
+
+    # Match phases
+    def kick_off(self):
+        self.possession_team = self.teams[0]
+        for team in self.teams:
+            squad = team[3]
+            self.jersey.update({p[0]: number for number, p in enumerate(squad, start=1)})
+            self.on_pitch[team[0]] = {p[0]: (p, p[2]) for p in squad[:11]}
+            for p in squad[:11]:
+                self.open_spell(p[0], p[2], 1, 0.0, "Starting XI")
+            self.add(1, 0.0, "Starting XI", team, tactics=self.lineup(team))
+
+    def _pick(self, players, exclude=None):
+        candidates = [(p, pos) for p, pos in players if p[0] != exclude]
+        weights = [INVOLVEMENT[pos] for _, pos in candidates]
+        return self.rng.choices(candidates, weights)[0]
+
+    def possession_chain(self, period, seconds, team):
+        """One possession: passes and carries up the pitch, ending in a turnover or a shot."""
+        rng = self.rng
+        self.possession += 1
+        self.possession_team = team
+        pattern = rng.choices([p for p, _ in PLAY_PATTERNS], [w for _, w in PLAY_PATTERNS])[0]
+        players = list(self.on_pitch[team[0]].values())
+        carrier, position = self._pick(players)
+        x, y = _clip(rng.gauss(45, 22), 1, 110), rng.uniform(2, 78)
+        key_pass = None
+        for _ in range(rng.randint(1, 14)):
+            seconds += rng.uniform(*PASS_SECONDS)
+            # Shoot from the final third, the more likely the closer to goal
+            if x > 96 and rng.random() < (x - 96) / 90:
+                self.shot(period, seconds, team, carrier, position, x, y, key_pass, pattern)
+                return seconds
+            receiver, receiver_position = self._pick(players, exclude=carrier[0])
+            length = _clip(rng.gammavariate(2.2, 8.0), 3, 70)
+            angle = rng.vonmisesvariate(0.0, 1.3)
+            end_x = _clip(x + length * math.cos(angle), 0, 120)
+            end_y = _clip(y + length * math.sin(angle), 0, 80)
+            complete = rng.random() < 0.9 - 0.3 * max(0.0, end_x - 80) / 40
+            pass_ = {"recipient": _ref(receiver[0], receiver[1]), "length": round(length, 1),
+                     "angle": round(angle, 3), "end_location": [round(end_x, 1), round(end_y, 1)]}
+            if not complete:
+                pass_["outcome"] = _ref(9, "Incomplete")
+            key_pass = self.add(period, seconds, "Pass", team, carrier, position, (x, y),
+                                pattern, **{"pass": pass_})
+            if not complete:
+                return seconds
+            seconds += 0.8
+            self.add(period, seconds, "Ball Receipt*", team, receiver, receiver_position,
+                     (end_x, end_y), pattern)
+            carrier, position, x, y = receiver, receiver_position, end_x, end_y
+            if rng.random() < 0.6:
+                carry_x = _clip(x + rng.gammavariate(1.5, 3.0), 0, 120)
+                carry_y = _clip(y + rng.gauss(0, 3), 0, 80)
+                seconds += rng.uniform(0.5, 3.0)
+                self.add(period, seconds, "Carry", team, carrier, position, (x, y), pattern,
+                         carry={"end_location": [round(carry_x, 1), round(carry_y, 1)]})
+                x, y = carry_x, carry_y
+                key_pass = None  # a shot straight after a carry is unassisted
+        return seconds
+
+    def shot(self, period, seconds, team, player, position, x, y, key_pass, pattern):
+        rng = self.rng
+        xg = expected_goals(x, y)
+        goal = rng.random() < xg
+        outcome = _ref(97, "Goal") if goal else rng.choice(
+            [_ref(100, "Saved"), _ref(98, "Off T"), _ref(96, "Blocked")])
+        shot = {"statsbomb_xg": round(xg, 4), "outcome": outcome,
+                "end_location": [120.0, round(rng.uniform(36, 44), 1), 1.0]}
+        if key_pass is not None:
+            shot["key_pass_id"] = key_pass["id"]
+        event = self.add(period, seconds, "Shot", team, player, position, (x, y), pattern, shot=shot)
+        if key_pass is not None:
+            key_pass["pass"]["assisted_shot_id"] = event["id"]
+            key_pass["pass"]["goal_assist" if goal else "shot_assist"] = True
+        if goal:
+            self.goals[team[0]] += 1
+
+    def substitution(self, period, seconds, team):
+        on_pitch = self.on_pitch[team[0]]
+        outfield = [pid for pid, (_, pos) in on_pitch.items() if pos != 1]
+        bench = [p for p in team[3][11:]
+                 if p[0] not in on_pitch and p[0] not in self.used and p[2] != 1]
+        if not outfield or not bench:
+            return
+        off = self.rng.choice(outfield)
+        player_in = self.rng.choice(bench)
+        self.used.add(player_in[0])
+        player_off, position = on_pitch.pop(off)
+        self.add(period, seconds, "Substitution", team, player_off, position,
+                 substitution={"replacement": _ref(player_in[0], player_in[1]),
+                               "outcome": _ref(103, "Tactical")})
+        self.close_spell(off, period, seconds, "Substitution - Off (Tactical)")
+        on_pitch[player_in[0]] = (player_in, position)
+        self.open_spell(player_in[0], position, period, seconds, "Substitution - On (Tactical)")
+
+    def tactical_shift(self, period, seconds, team):
+        """Two outfield players swap positions."""
+        on_pitch = self.on_pitch[team[0]]
+        outfield = [pid for pid, (_, pos) in on_pitch.items() if pos != 1]
+        if len(outfield) < 2:
+            return
+        a, b = self.rng.sample(outfield, 2)
+        (pa, pos_a), (pb, pos_b) = on_pitch[a], on_pitch[b]
+        on_pitch[a], on_pitch[b] = (pa, pos_b), (pb, pos_a)
+        for pid, position in ((a, pos_b), (b, pos_a)):
+            self.close_spell(pid, period, seconds, "Tactical Shift")
+            self.open_spell(pid, position, period, seconds, "Tactical Shift")
+        self.add(period, seconds, "Tactical Shift", team, tactics=self.lineup(team))
+
+    def red_card(self, period, seconds, team):
+        on_pitch = self.on_pitch[team[0]]
+        off = self.rng.choice([pid for pid, (_, pos) in on_pitch.items() if pos != 1])
+        player, position = on_pitch.pop(off)
+        self.add(period, seconds, "Foul Committed", team, player, position,
+                 foul_committed={"card": _ref(5, "Red Card")})
+        self.close_spell(off, period, seconds, "Red Card")
+
+    def _second_half_plan(self):
+        """(seconds into the second half, action) per team: subs, shifts, red cards."""
+        rng = self.rng
+        plans = {}
+        for team in self.teams:
+            subs = [_clip(rng.gauss(1150, 600), 60, 2600)
+                    for _ in range(rng.choice((3, 4, 4, 5, 5)))]
+            shifts = [rng.uniform(120, 2500) for _ in range(rng.choice((0, 1, 1, 2)))]
+            reds = [rng.uniform(60, 2600)] if rng.random() < 0.05 else []
+            plans[team[0]] = sorted([(s, "substitution") for s in subs]
+                                    + [(s, "tactical_shift") for s in shifts]
+                                    + [(s, "red_card") for s in reds])
+        return plans
+
+    def play(self):
+        rng = self.rng
+        self.kick_off()
+        plans = self._second_half_plan()
+        for period in (1, 2):
+            length = PERIOD_SECONDS + rng.uniform(60, 330)  # stoppage time
+            for team in self.teams:
+                self.add(period, 0.0, "Half Start", team)
+            seconds = 0.0
+            while seconds < length - 15:
+                # The first possession (numbered 1, like the line-up events) is the kick-off team's
+                team = self.possession_team if self.possession == 0 else rng.choice(self.teams)
+                seconds = self.possession_chain(period, seconds, team)
+                seconds += rng.uniform(*POSSESSION_GAP)
+                if period == 2:
+                    for team in self.teams:
+                        plan = plans[team[0]]
+                        while plan and plan[0][0] < seconds:
+                            getattr(self, plan.pop(0)[1])(period, seconds, team)
+            for team in self.teams:
+                self.add(period, length, "Half End", team)
+        for team in self.teams:
+            for pid in self.on_pitch[team[0]]:
+                self.close_spell(pid, 2, length, "Final Whistle")
+        return self.events
+
+    def lineup_file(self):
+        def cards(player_id):
+            spells = self.history.get(player_id)
+            if not spells or spells[-1]["end_reason"] != "Red Card":
+                return []
+            return [{"time": spells[-1]["to"], "card_type": "Red Card",
+                     "reason": "Violent Conduct", "period": spells[-1]["to_period"]}]
+
+        return [{"team_id": team[0], "team_name": team[1], "lineup": [
+            {"player_id": p[0], "player_name": p[1], "player_nickname": None,
+             "jersey_number": self.jersey[p[0]], "country": _ref(0, "Synthetic"),
+             "cards": cards(p[0]), "positions": self.history.get(p[0], [])}
+            for p in team[3]]} for team in self.teams]
+
+
+def generate_match(match_id, home, away, seed=0):
+    """(events, lineups, (home goals, away goals)) of one match."""
+    writer = _MatchWriter(random.Random(f"{seed}/{match_id}"), home, away)
+    events = writer.play()
+    return events, writer.lineup_file(), (writer.goals[home[0]], writer.goals[away[0]])
+
+
+# ---------------------------
+# Tournament
+# ---------------------------
+class Tournament:
+    """Teams and fixtures of a synthetic tournament; matches are generated on demand."""
+
+    def __init__(self, n_matches, seed=0, n_teams=24, competition_id=COMPETITION_ID,
+                 season_id=SEASON_ID, first_match_id=FIRST_MATCH_ID):
+        self.seed = seed
+        self.competition_id = competition_id
+        self.season_id = season_id
+        self.teams = make_teams(n_teams, seed)
+        self.match_ids = list(range(first_match_id, first_match_id + n_matches))
+        self.pairs = dict(zip(self.match_ids, fixtures(n_matches, n_teams, seed)))
+
+    def teams_of(self, match_id):
+        home, away = self.pairs[match_id]
+        return self.teams[home], self.teams[away]
+
+    def match(self, match_id):
+        return generate_match(match_id, *self.teams_of(match_id), seed=self.seed)
+
+    def listing(self, scores=None):
+        """Match listing entries (``matches/<competition>/<season>.json``)."""
+        scores = scores or {}
+        per_day = max(1, len(self.teams) // 2)
+        entries = []
+        for k, match_id in enumerate(self.match_ids):
+            home, away = self.teams_of(match_id)
+            score = scores.get(match_id, (None, None))
+            entries.append({
+                "match_id": match_id,
+                "match_date": str(FIRST_MATCH_DATE + datetime.timedelta(days=k // per_day)),
+                "kick_off": "21:00:00.000",
+                "competition": {"competition_id": self.competition_id,
+                                "competition_name": "Synthetic League"},
+                "season": {"season_id": self.season_id, "season_name": f"Synthetic {self.seed}"},
+                "home_team": {"home_team_id": home[0], "home_team_name": home[1]},
+                "away_team": {"away_team_id": away[0], "away_team_name": away[1]},
+                "home_score": score[0], "away_score": score[1],
+                "match_status": "available",
+                "last_updated": f"2024-07-15T00:00:00.{GENERATOR_VERSION:03d}",
+            })
+        return entries
+
+
+def matches_for_events(n_events):
+    """Number of matches that gives about ``n_events`` events."""
+    return max(1, round(n_events / EVENTS_PER_MATCH))
+
+
+def _write_json(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def _write_match(out_dir, tournament, match_id):
+    """Write one match's event and lineup files; returns its score."""
+    events, lineups, score = tournament.match(match_id)
+    _write_json(os.path.join(out_dir, "events", f"{match_id}.json"), events)
+    _write_json(os.path.join(out_dir, "lineups", f"{match_id}.json"), lineups)
+    return score
+
+
+def write_tournament(out_dir, n_matches, seed=0, n_teams=24, competition_id=COMPETITION_ID,
+                     season_id=SEASON_ID, first_match_id=FIRST_MATCH_ID, workers=None):
+    """Write ``n_matches`` synthetic matches in the open-data layout under ``out_dir``.
+
+    Matches already written by the same generator version, seed and team
+    count (recorded in ``synthetic.json``) are kept, so growing a fixture only
+    generates the new matches. ``workers`` > 1 generates in a process pool.
+    Returns the match ids.
+    """
+    tournament = Tournament(n_matches, seed, n_teams, competition_id, season_id, first_match_id)
+    for folder in ("events", "lineups", os.path.join("matches", str(competition_id))):
+        os.makedirs(os.path.join(out_dir, folder), exist_ok=True)
+    marker_path = os.path.join(out_dir, "synthetic.json")
+    marker = {"generator": GENERATOR_VERSION, "seed": seed, "n_teams": n_teams}
+    previous = read_json(marker_path) or {}
+    scores = {}
+    if all(previous.get(key) == value for key, value in marker.items()):
+        scores = {int(m_id): tuple(score) for m_id, score in previous.get("scores", {}).items()}
+
+    todo = [m_id for m_id in tournament.match_ids
+            if m_id not in scores
+            or not os.path.exists(os.path.join(out_dir, "events", f"{m_id}.json"))]
+    if workers is not None and workers > 1 and len(todo) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            written = pool.map(_write_match, [out_dir] * len(todo), [tournament] * len(todo),
+                               todo, chunksize=max(1, len(todo) // (4 * workers)))
+            scores.update(zip(todo, written))
+    else:
+        scores.update((m_id, _write_match(out_dir, tournament, m_id)) for m_id in todo)
+
+    _write_json(os.path.join(out_dir, "matches", str(competition_id), f"{season_id}.json"),
+                tournament.listing(scores))
+    _write_json(marker_path, dict(marker, scores={str(m_id): score
+                                                  for m_id, score in sorted(scores.items())}))
+    return tournament.match_ids
+
+
+# ---------------------------
+# Direct feed into the cache / loader layers
+# ---------------------------
+class SyntheticSbopen(CachedSbopen):
+    """``CachedSbopen`` whose source is the generator instead of files or GitHub.
+
+    ``match(competition_id, season_id)`` lists the synthetic tournament
+    (whatever ids are passed) and ``event(match_id)`` generates, flattens and
+    caches a match on first use, so ``load_matches``, ``derived`` tables and
+    every script that takes a parser run on synthetic data without any JSON
+    on disk. Listing scores are left empty.
+    """
+
+    def __init__(self, n_matches, seed=0, n_teams=24, cache_dir=None, **tournament_kwargs):
+        self.tournament = Tournament(n_matches, seed, n_teams, **tournament_kwargs)
+        if cache_dir is None:
+            cache_dir = os.path.join(DEFAULT_CACHE_DIR, f"synthetic-{seed}-{n_teams}")
+        super().__init__(cache_dir=cache_dir)
+
+    def _source(self, relative):
+        # Treated like remote data: freshness follows ``last_updated`` in the listing
+        return f"synthetic://{relative}", False
+
+    def _fetch(self, location, is_local):
+        folder, name = location[len("synthetic://"):].split("/", 1)
+        if folder == "matches":
+            return json.dumps(self.tournament.listing()).encode("utf-8")
+        events, lineups, _ = self.tournament.match(int(os.path.splitext(name)[0]))
+        return json.dumps(events if folder == "events" else lineups).encode("utf-8")
+
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description="Write a synthetic StatsBomb-style tournament.")
+    cli.add_argument("out_dir")
+    size = cli.add_mutually_exclusive_group(required=True)
+    size.add_argument("--matches", type=int)
+    size.add_argument("--events", type=int, help="approximate total number of events")
+    cli.add_argument("--seed", type=int, default=0)
+    cli.add_argument("--teams", type=int, default=24)
+    cli.add_argument("--competition", type=int, default=COMPETITION_ID)
+    cli.add_argument("--season", type=int, default=SEASON_ID)
+    cli.add_argument("--workers", type=int, default=os.cpu_count())
+    args = cli.parse_args()
+
+    n_matches = args.matches if args.matches is not None else matches_for_events(args.events)
+    match_ids = write_tournament(args.out_dir, n_matches, args.seed, args.teams, args.competition,
+                                 args.season, workers=args.workers)
+    print(f"Wrote {len(match_ids)} matches ({match_ids[0]}-{match_ids[-1]}) to "
+          f"{os.path.abspath(args.out_dir)}; read them with "
+          f"CachedSbopen(data_dir={args.out_dir!r}).match({args.competition}, {args.season})")
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized zone binning and pass aggregation.
+
+``zone_aggregate(passes, nx, ny, by=[...])`` splits the pitch into an
+``nx`` x ``ny`` grid and computes, for every group in ``by`` (match, player,
+...) and every zone, the pass count, the mean start point and the mean pass
+vector. All groups and zones are reduced together with ``np.bincount`` on a
+flat (group, x_zone, y_zone) index, so a 12x8 grid over a whole tournament
+costs about the same as a 3x2 grid for one player and one match.
+
+Zone edges follow ``pd.cut(..., include_lowest=True)``: a pass starting exactly
+on a boundary belongs to the lower zone; passes starting off the pitch are
+dropped.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from instrument import timer
+
+PITCH_LENGTH = 120  # StatsBomb pitch
+PITCH_WIDTH = 80
+
+ZoneGrid = namedtuple("ZoneGrid", ["groups", "x_edges", "y_edges",
+                                   "count", "start_x", "start_y", "dx", "dy"])
+ZoneGrid.__doc__ = """Dense zone statistics.
+
+``groups`` is a DataFrame with one row per group (the ``by`` values, in order
+of first appearance); ``count``, ``start_x``, ``start_y``, ``dx`` and ``dy``
+are arrays of shape (n_groups, nx, ny); means are NaN for empty zones.
+"""
+
+
+def zone_edges(n, extent):
+    """``n + 1`` equally spaced zone edges from 0 to ``extent``."""
+    return np.linspace(0, extent, n + 1)
+
+
+def zone_index(values, edges):
+    """Zone of every value (``pd.cut`` semantics with ``include_lowest``), -1 off the grid."""
+    values = np.asarray(values, dtype=float)
+    zones = np.searchsorted(edges, values, side="left") - 1
+    zones[values == edges[0]] = 0
+    zones[(values < edges[0]) | (values > edges[-1]) | np.isnan(values)] = -1
+    return zones
+
+
+def zone_number(x_zone, y_zone, nx):
+    """1-based zone label, row by row: top-left is 1, then left to right."""
+    return y_zone * nx + x_zone + 1
+
+
+@timer("zones.zone_aggregate")
+def zone_aggregate(passes, nx=3, ny=2, by=None,
+                   pitch_length=PITCH_LENGTH, pitch_width=PITCH_WIDTH):
+    """Counts, mean start points and mean vectors per group and zone in one pass.
+
+    Parameters
+    ----------
+    passes : pandas.DataFrame
+        Needs ``x``, ``y``, ``end_x``, ``end_y`` and the ``by`` columns.
+    nx, ny : int
+        Number of zones along the length and the width of the pitch.
+    by : list of str, optional
+        Grouping columns, e.g. ``["match_id"]`` or ``["player_id", "match_id"]``.
+
+    Returns
+    -------
+    grid : ZoneGrid
+        Dense (n_groups, nx, ny) arrays.
+    table : pandas.DataFrame
+        Tidy frame with the ``by`` columns, ``x_zone``, ``y_zone``, ``zone``,
+        ``count``, ``start_x``, ``start_y``, ``dx`` and ``dy`` for non-empty zones.
+    """
+    by = list(by or [])
+    x_edges = zone_edges(nx, pitch_length)
+    y_edges = zone_edges(ny, pitch_width)
+
+    x = passes["x"].to_numpy(dtype=float)
+    y = passes["y"].to_numpy(dtype=float)
+    dx = passes["end_x"].to_numpy(dtype=float) - x
+    dy = passes["end_y"].to_numpy(dtype=float) - y
+    x_zone = zone_index(x, x_edges)
+    y_zone = zone_index(y, y_edges)
+
+    if by:
+        # Group codes in order of first appearance, -1 for missing keys
+        codes = passes.groupby(by, sort=False).ngroup().fillna(-1).to_numpy(dtype=np.intp)
+        groups = passes[by].dropna().drop_duplicates().reset_index(drop=True)
+    else:
+        codes, groups = np.zeros(len(passes), dtype=np.intp), pd.DataFrame(index=[0])
+    n_groups = len(groups)
+
+    valid = (x_zone >= 0) & (y_zone >= 0) & (codes >= 0)
+    flat = (codes[valid] * nx + x_zone[valid]) * ny + y_zone[valid]
+    size = n_groups * nx * ny
+    shape = (n_groups, nx, ny)
+
+    count = np.bincount(flat, minlength=size).reshape(shape)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = [
+            (np.bincount(flat, weights=values[valid], minlength=size).reshape(shape) / count)
+            for values in (x, y, dx, dy)
+        ]
+    grid = ZoneGrid(groups, x_edges, y_edges, count, *means)
+
+    g, xz, yz = np.nonzero(count)
+    table = groups.iloc[g].reset_index(drop=True)
+    table["x_zone"] = xz
+    table["y_zone"] = yz
+    table["zone"] = zone_number(xz, yz, nx)
+    table["count"] = count[g, xz, yz]
+    for name, values in zip(("start_x", "start_y", "dx", "dy"), means):
+        table[name] = values[g, xz, yz]
+    return grid, table
+
+
+def zone_counts(grid):
+    """Counts per group as zone-number ordered lists (zone 1 first), e.g. for print tables."""
+    # (group, x, y) -> (group, y, x) so ravel follows zone_number
+    return grid.count.transpose(0, 2, 1).reshape(len(grid.groups), -1).tolist()
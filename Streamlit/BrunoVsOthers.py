@@ -1,50 +1,99 @@
-from mplsoccer import Sbopen, Pitch
+from mplsoccer import Pitch
 import matplotlib.pyplot as plt
 import streamlit as st
 import pandas as pd
 import numpy as np
 import os
+import sys
+import contextlib
+import json
 import matplotlib.lines as mlines
 import plotly.express as px
 
+# Shared data-access helpers live in Project1
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Project1"))
+from sbcache import CachedSbopen
+from zones import zone_aggregate, zone_counts
+from pitch_render import PitchCanvas
+import instrument
+from rankings import PeerRankings, render_pizza
+from dashboard_bundle import (BRUNO_ID, DEBRUYNE_ID, FOCUS_MATCH_IDS, MATCH_COLUMNS,
+                              bundle_version, highlight_column, load_bundle, player_passes)
+
 st.set_page_config(page_title="Bruno vs Other midfielders in the EURO 2024", layout="wide")
 
 # ---------------------------
-# Load Data from CSV
+# Debug panel: opt-in stage timings for this rerun
+# ---------------------------
+show_debug = st.sidebar.checkbox("Debug: stage timings and counters")
+page_trace = instrument.Trace() if show_debug else None
+
+
+@contextlib.contextmanager
+def page_stage(name):
+    # Records into this session's rerun trace only (other sessions and the
+    # process-wide trace are untouched); a plain block when debugging is off
+    if page_trace is None:
+        yield
+        return
+    with instrument.recording(page_trace), instrument.timer(name):
+        yield
+
+BASE_DIR = os.path.dirname(__file__)
+BUNDLE_DIR = os.path.join(BASE_DIR, "bundle")
+
+# ---------------------------
+# Prebuilt data bundle (built with Project1/dashboard_bundle.py)
+# ---------------------------
+@st.cache_resource
+def get_bundle(version):
+    # ``version`` is only the cache key: a rebuilt bundle gets a new entry.
+    # The frames are shared between sessions, so they must not be modified.
+    return load_bundle(BUNDLE_DIR)
+
+if st.sidebar.button("Reload data bundle"):
+    get_bundle.clear()
+
+with page_stage("page.load_bundle"):
+    bundle = get_bundle(bundle_version(BUNDLE_DIR))  # None when no bundle is built
+
+# ---------------------------
+# Load Data from CSV (fallback when there is no bundle)
 # ---------------------------
 @st.cache_data
 def load_data():
-    BASE_DIR = os.path.dirname(__file__)
     CSV_PATH = os.path.join(BASE_DIR, "euro2024_midfielders_summary_360plus.csv")
-    return pd.read_csv(CSV_PATH)
+    stats = pd.read_csv(CSV_PATH)
+    stats["highlight"] = highlight_column(stats["player_id"])
+    return stats
 
-full_stats = load_data()
+full_stats = bundle["summary"] if bundle is not None else load_data()
 
 # ---------------------------
 # Constants
 # ---------------------------
-BRUNO_ID = 5204
-DEBRUYNE_ID = 3089
 PLAYER_ID = BRUNO_ID
 PLAYER_NAME = "Bruno Fernandes"
 
 st.title("Bruno's passes in the matches he played in EURO 2024")
 
 # ---------------------------
-# StatsBomb parser
+# StatsBomb parser (only used for matches missing from the bundle)
 # ---------------------------
-parser = Sbopen(dataframe=True)
+parser = CachedSbopen()
 
 # ---------------------------
 # Match list
 # ---------------------------
-all_match_ids = [3942349, 3941020, 3930174, 3930166]
+all_match_ids = FOCUS_MATCH_IDS
 
 # Load match info
-matches = parser.match(55, 282)
-match_info = matches[matches['match_id'].isin(all_match_ids)][
-    ['match_id', 'home_team_name', 'away_team_name']
-]
+@st.cache_data
+def load_match_info(match_ids):
+    matches = parser.match(55, 282)
+    return matches[matches['match_id'].isin(match_ids)][MATCH_COLUMNS]
+
+match_info = bundle["matches"] if bundle is not None else load_match_info(all_match_ids)
 
 # Map match_id to name
 match_names = {
@@ -71,23 +120,36 @@ selected_match_ids = st.multiselect(
 )
 
 # ---------------------------
-# Load events
+# Load player passes per match
 # ---------------------------
-@st.cache_data
-def load_events(match_ids):
-    all_events = []
-    for m_id in match_ids:
-        df, _, _, _ = parser.event(m_id)
-        df["match_id"] = m_id
-        all_events.append(df)
-    return pd.concat(all_events, ignore_index=True)
+# One cache entry per (match, player): any selection is a union of cached
+# slices, and only the player's passes are kept in memory, not whole matches.
+# max_entries bounds the cache; the least recently used slice is evicted first.
+MATCH_CACHE_ENTRIES = 64
 
-if selected_match_ids:
-    events = load_events(selected_match_ids)
+@st.cache_data(max_entries=MATCH_CACHE_ENTRIES)
+def load_match_passes(match_id, player_id):
+    df, _, _, _ = parser.event(match_id)
+    return player_passes(df, [player_id])
 
-    # Player passes
-    player_events = events[events["player_id"] == PLAYER_ID].copy()
-    passes = player_events[player_events["type_name"] == "Pass"].copy()
+def load_passes(match_ids, player_id):
+    return pd.concat([load_match_passes(m_id, player_id) for m_id in match_ids],
+                     ignore_index=True)
+
+if selected_match_ids:
+    # Player passes: served from the bundle, live parsing only for what it lacks
+    with page_stage("page.load_passes"):
+        bundled_ids = bundle["manifest"]["match_ids"] if bundle is not None else []
+        missing_ids = [m_id for m_id in selected_match_ids if m_id not in bundled_ids]
+        pass_frames = []
+        if bundle is not None:
+            bundled = bundle["passes"]
+            pass_frames.append(bundled[bundled["match_id"].isin(selected_match_ids)
+                                       & (bundled["player_id"] == PLAYER_ID)])
+        if missing_ids:
+            pass_frames.append(load_passes(missing_ids, PLAYER_ID))
+        passes = pd.concat(pass_frames, ignore_index=True)
+        instrument.count("rows.passes", len(passes))
 
     # ---------------------------
     # Zone-based pitch map
@@ -100,58 +162,41 @@ if selected_match_ids:
     x_bins = [0, pitch_length/3, 2*pitch_length/3, pitch_length]
     y_bins = [0, pitch_width/2, pitch_width]
 
-    # Prepare figure
-    fig, ax = pitch.draw(figsize=(14, 10))
+    # Prepare figure: the pitch and zone lines are drawn once per session and kept
+    # as the canvas' cached background; a rerun only updates the layers on top
+    if "zone_canvas" not in st.session_state:
+        st.session_state["zone_canvas"] = PitchCanvas(pitch, figsize=(14, 10), x_edges=x_bins,
+                                                      y_edges=y_bins, pyplot=False)
+    canvas = st.session_state["zone_canvas"]
+    canvas.clear()
 
-    # Draw zone lines
-    for xb in x_bins[1:-1]:
-        ax.plot([xb, xb], [0, pitch_width], linestyle='--', color='gray')
-    for yb in y_bins[1:-1]:
-        ax.plot([0, pitch_length], [yb, yb], linestyle='--', color='gray')
+    # Count and average arrow for every selected match and zone in one vectorized pass
+    grid, zone_table = zone_aggregate(passes, nx=3, ny=2, by=["match_id"])
 
-    # Zone data dictionary
+    # Zone data dictionary (matches in selection order within each zone): one
+    # groupby splits the table, the groups are then read in selection order
     zone_data = {(xz, yz): {} for xz in range(3) for yz in range(2)}
-    summary_table = {m_id: [0]*6 for m_id in selected_match_ids}
-
-    # Process each selected match
+    match_zones = dict(tuple(zone_table.groupby("match_id", sort=False)))
     for m_id in selected_match_ids:
-        match_passes = passes[passes["match_id"] == m_id].copy()
-        if match_passes.empty:
+        if m_id not in match_zones:
             continue
-
-        # Assign zones
-        match_passes['x_zone'] = pd.cut(match_passes['x'], bins=x_bins, labels=False, include_lowest=True)
-        match_passes['y_zone'] = pd.cut(match_passes['y'], bins=y_bins, labels=False, include_lowest=True)
-        match_passes.dropna(subset=['x_zone', 'y_zone'], inplace=True)
-        match_passes['x_zone'] = match_passes['x_zone'].astype(int)
-        match_passes['y_zone'] = match_passes['y_zone'].astype(int)
-
-        # Group by zone
-        grouped = match_passes.groupby(['x_zone', 'y_zone'])
-        for (xz, yz), group in grouped:
-            if group.empty:
-                continue
-
-            # Count and average arrow
-            count = len(group)
-            avg_dx = (group['end_x'] - group['x']).mean()
-            avg_dy = (group['end_y'] - group['y']).mean()
-            avg_start_x = group['x'].mean()
-            avg_start_y = group['y'].mean()
-
-            zone_data[(xz, yz)][m_id] = {
-                'count': count,
-                'start_x': avg_start_x,
-                'start_y': avg_start_y,
-                'dx': avg_dx,
-                'dy': avg_dy
+        for row in match_zones[m_id].itertuples():
+            zone_data[(row.x_zone, row.y_zone)][m_id] = {
+                'count': row.count,
+                'start_x': row.start_x,
+                'start_y': row.start_y,
+                'dx': row.dx,
+                'dy': row.dy
             }
 
-            # Update summary table (zones 1–6)
-            zone_index = yz * 3 + xz
-            summary_table[m_id][zone_index] = count
+    # Summary table (zones 1–6)
+    summary_table = {m_id: [0]*6 for m_id in selected_match_ids}
+    summary_table.update(zip(grid.groups["match_id"], zone_counts(grid)))
 
-    # Plot counts and arrows
+    # Collect counts and arrows for each zone and match, then draw them as one
+    # arrow layer and one batch of labels
+    label_x, label_y, label_text, colors = [], [], [], []
+    arrow_start, arrow_end = [], []
     for (xz, yz), matches_info in zone_data.items():
         x0, x1 = x_bins[xz], x_bins[xz+1]
         y0, y1 = y_bins[yz], y_bins[yz+1]
@@ -159,23 +204,30 @@ if selected_match_ids:
 
         offsets = np.linspace(-8, 8, len(matches_info))
         for i, (m_id, data) in enumerate(matches_info.items()):
-            ax.text(xc + offsets[i], yc, str(data['count']),
-                    ha='center', va='center', fontsize=12, fontweight='bold',
-                    color=match_colors[m_id])
-            pitch.arrows(data['start_x'], data['start_y'],
-                         data['start_x'] + data['dx'], data['start_y'] + data['dy'],
-                         ax=ax, color=match_colors[m_id], width=2, headwidth=5, headlength=5)
+            label_x.append(xc + offsets[i])
+            label_y.append(yc)
+            label_text.append(data['count'])
+            colors.append(match_colors[m_id])
+            arrow_start.append((data['start_x'], data['start_y']))
+            arrow_end.append((data['start_x'] + data['dx'], data['start_y'] + data['dy']))
+
+    arrow_start, arrow_end = np.array(arrow_start).reshape(-1, 2), np.array(arrow_end).reshape(-1, 2)
+    canvas.labels(label_x, label_y, label_text, colors, fontsize=12, fontweight='bold')
+    canvas.arrows('zones', arrow_start[:, 0], arrow_start[:, 1], arrow_end[:, 0], arrow_end[:, 1],
+                  color=colors, width=2, headwidth=5, headlength=5)
 
     # Legend
     legend_handles = [mlines.Line2D([], [], color=match_colors[m_id], marker='o',
                                     linestyle='None', markersize=8, label=match_names[m_id])
                       for m_id in selected_match_ids]
-    ax.legend(handles=legend_handles, loc='upper center', bbox_to_anchor=(0.5, -0.05),
-              ncol=2, fontsize=12)
+    canvas.legend(legend_handles, loc='upper center', bbox_to_anchor=(0.5, -0.05),
+                  ncol=2, fontsize=12)
 
     # Title
-    plt.title(f"{PLAYER_NAME} – Pass Map with Zones (EURO 2024)", fontsize=16)
-    st.pyplot(fig, use_container_width=True)
+    canvas.title(f"{PLAYER_NAME} – Pass Map with Zones (EURO 2024)", fontsize=16)
+    with page_stage("page.pitch_map"):
+        # Blit the layers onto the cached background instead of redrawing the figure
+        st.image(canvas.render(), width="stretch")
 
     # ---------------------------
     # Metric selection for the bar chart (below pitch map)
@@ -192,16 +244,7 @@ if selected_match_ids:
     st.subheader("Bruno Fernandes vs Kevin De Bruyne vs Other midfielders in the EURO 2024")
     st.write("This comparison only includes players with above 360 total minutes played")
 
-    # Highlight Bruno and De Bruyne
-    def highlight_players(pid):
-        if pid == BRUNO_ID:
-            return "Bruno"
-        elif pid == DEBRUYNE_ID:
-            return "De Bruyne"
-        else:
-            return "Peer"
-
-    full_stats["highlight"] = full_stats["player_id"].apply(highlight_players)
+    # Bruno and De Bruyne are highlighted through the precomputed "highlight" column
 
     hover_cols = [
         "matches_played", "total_minutes_played",
@@ -243,7 +286,30 @@ if selected_match_ids:
 
 
 
-    st.plotly_chart(fig_bar, use_container_width=True)
+    with page_stage("page.bar_chart"):
+        st.plotly_chart(fig_bar, use_container_width=True)
+
+    # ---------------------------
+    # Percentile pizza
+    # ---------------------------
+    # Sorted peer distributions are built once per data bundle; every player's
+    # percentiles are then lookups, not a re-sort of the table.
+    PIZZA_METRICS = ["passes_per90", "shot_assists_per90", "goal_assists_per90"]
+
+    @st.cache_resource
+    def get_rankings(version):
+        return PeerRankings.from_table(full_stats, metrics=PIZZA_METRICS)
+
+    rankings = get_rankings(bundle_version(BUNDLE_DIR) if bundle is not None else None)
+    player_names = dict(zip(full_stats["player_id"], full_stats["player_name"]))
+    pizza_player = st.selectbox("Percentile ranks among these midfielders for",
+                                options=list(player_names), format_func=player_names.get,
+                                index=list(player_names).index(PLAYER_ID)
+                                if PLAYER_ID in player_names else 0)
+    with page_stage("page.pizza"):
+        fig_pizza = render_pizza(rankings, pizza_player)
+        st.pyplot(fig_pizza)
+        plt.close(fig_pizza)
 
     # ---------------------------
     # Player Table
@@ -263,3 +329,14 @@ if selected_match_ids:
 
 else:
     st.warning("Please select at least one match.")
+
+if page_trace is not None:
+    trace_data = page_trace.to_dict()
+    with st.sidebar.expander("Stage timings", expanded=True):
+        st.caption(f"Rerun took {trace_data['wall_seconds']:.3f}s; "
+                   "results served from st.cache_* do not show up as stages")
+        st.dataframe(page_trace.summary(), hide_index=True)
+        st.write("Counters")
+        st.json(trace_data["counters"])
+        st.download_button("Download JSON trace", json.dumps(trace_data, default=str),
+                           file_name="trace.json", mime="application/json")